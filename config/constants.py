@@ -36,6 +36,26 @@ TEMPLATES_DISPONIVEIS = {
     "16": { "nome": "Envio de Conta", "ancoras": ["conta digital da EGS Energia", "já está disponível", "o e-mail cadastrado"] }
 }
 
+# --- LIMITE DE ENVIOS (toda a frota de workers) ---
+# Token bucket: taxa média sustentada e quantos envios podem sair em sequência
+ENVIOS_POR_MINUTO = 12
+ENVIOS_RAJADA = 3
+
+# Ritmo adaptativo (AIMD): sobe devagar com o Zoho saudável, cai pela metade ao degradar
+AIMD_ENVIOS_MIN = 4                 # Piso em envios/min
+AIMD_ENVIOS_MAX = 40                # Teto em envios/min
+AIMD_INCREMENTO = 1                 # +envios/min a cada janela saudável
+AIMD_FATOR_REDUCAO = 0.5            # Multiplicador ao detectar degradação
+AIMD_JANELA = 5                     # Clientes observados por decisão (frota inteira)
+AIMD_LATENCIA_BUSCA_ALVO = 12.0     # Enter -> resultados (média por variação, s) acima disso é degradação
+
+# --- BUSCA ---
+# Palavras que não identificam um nome (variações da busca e índice do diretório local)
+STOPWORDS_NOME = {
+    "de","da","do","das","dos","e","d","jr","jr.","junior","júnior","filho","neto","sobrinho",
+    "me","epp","s/a","sa","s.a","s.a.","ltda","ltda.","holding","group","grupogera"
+}
+
 # --- CONFIGURAÇÕES ---
 retry_config = SimpleNamespace(tentativas=3, delay=1, backoff=2)
 CONFIG = SimpleNamespace(
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Crawler da lista de contatos do Zoho Desk - AutoZoho
+
+Percorre a grade de contatos (mesmos seletores de examples/exemplo_lista_contatos.py)
+com vários navegadores em paralelo e grava cada página no diretório local de
+contatos (utils/diretorio_contatos.py), que a busca usa para abrir clientes
+direto pela URL.
+
+- Cada página é extraída com um único execute_script (nome, e-mail,
+  telefones e URL de todos os cards de uma vez).
+- Os workers pegam blocos de PAGINAS_POR_BLOCO páginas de um contador
+  compartilhado; dentro do bloco avançam pelo botão "próxima".
+- O processo principal é o único que grava: diretório + checkpoint em
+  cache/crawler_contatos.json (páginas já feitas na rodada e hash de cada
+  página). Uma rodada interrompida é retomada de onde parou; numa rodada
+  nova, páginas com o mesmo hash da anterior não são regravadas.
+"""
+
+import os
+import json
+import time
+import queue
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from multiprocessing import Process, Manager, Value
+from typing import Dict, List, Optional
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from utils.selector_manager import SelectorManager
+from utils.diretorio_contatos import registrar_contatos
+from core.parallel import SessaoCompartilhada, _abrir_navegador_logado, _configurar_log_worker
+
+CACHE_DIR = Path(__file__).parent.parent / "cache"
+CHECKPOINT_PATH = CACHE_DIR / "crawler_contatos.json"
+
+PAGINAS_POR_BLOCO = 10            # Páginas seguidas por worker (avança pelo botão, sem recarregar)
+PARAMETRO_PAGINA = "page"         # Tentativa de ir direto para a página N pela URL
+ESPERA_PAGINA_SEGUNDOS = 15
+FIM_DESCONHECIDO = 10 ** 9
+
+sm = SelectorManager('config/lista_contatos_selectors.json')
+
+# Extrai todos os cards da página numa única chamada (o card é o ancestral do link do contato)
+_JS_EXTRAIR_PAGINA = """
+const porId = new Map();
+for (const a of document.querySelectorAll(arguments[0])) {
+    const m = (a.href || '').match(/details\\/(\\d+)/);
+    if (!m) continue;
+    const card = a.closest("tr, [role='row'], li, [class*='card'], [class*='Card']") || a.parentElement;
+    const nome = (a.getAttribute('data-title') || a.textContent || '').trim();
+    let c = porId.get(m[1]);
+    if (!c) {
+        c = {id: m[1], url: a.href.split('?')[0], nome: '', email: null, telefones: []};
+        porId.set(m[1], c);
+        for (const e of card.querySelectorAll("a[href^='mailto:']")) {
+            const email = e.getAttribute('href').slice(7).trim();
+            if (email && !c.email) c.email = email;
+        }
+        for (const t of card.querySelectorAll("a[href^='tel:']")) {
+            const tel = (t.textContent || t.getAttribute('href').slice(4)).trim();
+            if (tel && !c.telefones.includes(tel)) c.telefones.push(tel);
+        }
+    }
+    if (nome && !c.nome) c.nome = nome;
+}
+return Array.from(porId.values());
+"""
+
+# None = ainda não testado neste processo
+_url_pagina_funciona = None
+
+
+# --- Navegação na grade ---
+
+def _seletor_card() -> str:
+    return sm.get_selector('grade_contatos', 'card_contato', 'generico', 'css')
+
+
+def abrir_lista_contatos(driver) -> Optional[str]:
+    """Vai para a lista de contatos. Returns: URL da lista (sem query) ou None."""
+    if not sm.click_element(driver, 'navegacao', 'superior', 'clientes'):
+        return None
+    _aguardar_grade(driver)
+    return driver.current_url.split('?')[0]
+
+
+def _aguardar_grade(driver) -> bool:
+    try:
+        WebDriverWait(driver, ESPERA_PAGINA_SEGUNDOS).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, _seletor_card()))
+        )
+        return True
+    except Exception:
+        return False
+
+
+def _pagina_atual(driver) -> Optional[int]:
+    texto = sm.get_text(driver, 'paginacao', 'numero_pagina', wait_time=2)
+    return int(texto) if texto.isdigit() else None
+
+
+def proxima_pagina(driver) -> bool:
+    """Clica em "próxima" e espera a grade trocar. False = não há próxima."""
+    botao = sm.find_element_safe(driver, 'paginacao', 'proxima_pagina', wait_time=3, required=False)
+    if botao is None or not botao.is_enabled() or botao.get_attribute('aria-disabled') == 'true':
+        return False
+    cards = driver.find_elements(By.CSS_SELECTOR, _seletor_card())
+    botao.click()
+    try:
+        if cards:
+            WebDriverWait(driver, ESPERA_PAGINA_SEGUNDOS).until(EC.staleness_of(cards[0]))
+        _aguardar_grade(driver)
+    except Exception:
+        time.sleep(2)
+    return True
+
+
+def ir_para_pagina(driver, url_lista: str, destino: int, atual: Optional[int]) -> int:
+    """
+    Leva a grade até a página `destino`.
+
+    Returns:
+        destino se chegou; número menor = a lista termina nessa página;
+        0 = erro de navegação
+    """
+    global _url_pagina_funciona
+    if atual is not None and destino == atual + 1:
+        return destino if proxima_pagina(driver) else atual
+
+    # Direto pela URL (se a grade aceitar o parâmetro)
+    if _url_pagina_funciona is not False and destino > 1:
+        driver.get(f"{url_lista}?{PARAMETRO_PAGINA}={destino}")
+        _aguardar_grade(driver)
+        chegou = _pagina_atual(driver) == destino
+        if _url_pagina_funciona is None:
+            _url_pagina_funciona = chegou
+            if not chegou:
+                logging.info("Grade não aceita página pela URL: navegando pelo botão próxima")
+        if chegou:
+            return destino
+
+    # Do início, clicando em "próxima"
+    driver.get(url_lista)
+    if not _aguardar_grade(driver):
+        return 0
+    pagina = 1
+    while pagina < destino:
+        if not proxima_pagina(driver):
+            return pagina
+        pagina += 1
+    return destino
+
+
+def extrair_pagina(driver) -> List[Dict]:
+    """Todos os contatos da página atual (id, url, nome, email, telefones)."""
+    return driver.execute_script(_JS_EXTRAIR_PAGINA, _seletor_card()) or []
+
+
+def _hash_pagina(contatos: List[Dict]) -> str:
+    conteudo = json.dumps(sorted(contatos, key=lambda c: c['id']), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+# --- Worker ---
+
+def worker_crawler(worker_id: int, contador, fim, feitas: frozenset, resultado_queue,
+                   login_sync, perfil_dedicado: bool = True):
+    """
+    Processo do crawler: pega blocos de páginas do contador compartilhado,
+    extrai cada página e manda para o processo principal gravar.
+    `fim` (Value) é reduzido por quem encontra a última página.
+    """
+    logger = _configurar_log_worker(worker_id)
+    logger.info("Iniciando crawler da lista de contatos")
+    driver = None
+    try:
+        driver, _ = _abrir_navegador_logado(worker_id, login_sync, perfil_dedicado, logger)
+        if driver is None:
+            return
+        url_lista = abrir_lista_contatos(driver)
+        if not url_lista:
+            logger.error("Não foi possível abrir a lista de contatos")
+            return
+        atual = 1
+
+        while True:
+            with contador.get_lock():
+                inicio = contador.value
+                contador.value += PAGINAS_POR_BLOCO
+            if inicio > fim.value:
+                break
+
+            for pagina in range(inicio, inicio + PAGINAS_POR_BLOCO):
+                if pagina > fim.value:
+                    break
+                if pagina in feitas:
+                    continue
+
+                if pagina != atual:
+                    chegou = ir_para_pagina(driver, url_lista, pagina, atual)
+                    if chegou == 0:
+                        logger.error(f"Falha ao navegar até a página {pagina}")
+                        atual = None
+                        continue
+                    atual = chegou
+                    if chegou < pagina:
+                        with fim.get_lock():
+                            fim.value = min(fim.value, chegou)
+                        break
+
+                contatos = extrair_pagina(driver)
+                if not contatos:
+                    with fim.get_lock():
+                        fim.value = min(fim.value, pagina - 1)
+                    break
+                resultado_queue.put({'pagina': pagina, 'contatos': contatos,
+                                     'hash': _hash_pagina(contatos), 'worker_id': worker_id})
+                logger.info(f"Página {pagina}: {len(contatos)} contatos")
+    except Exception as e:
+        logger.error(f"Erro fatal no crawler: {e}")
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+# --- Checkpoint ---
+
+def _carregar_checkpoint() -> Dict:
+    try:
+        with open(CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Checkpoint do crawler ilegível, começando do zero: {e}")
+    return {}
+
+
+def _salvar_checkpoint(dados: Dict) -> None:
+    tmp_path = CHECKPOINT_PATH.with_name(f"{CHECKPOINT_PATH.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+        os.replace(tmp_path, CHECKPOINT_PATH)
+    except Exception as e:
+        logging.warning(f"Erro ao salvar checkpoint do crawler: {e}")
+
+
+def _sequencia_igual(paginas_iguais: set, pagina: int, tamanho: int) -> Optional[int]:
+    """Última página de uma sequência de `tamanho` páginas iguais que contém `pagina`."""
+    inicio = pagina
+    while inicio - 1 in paginas_iguais:
+        inicio -= 1
+    ultima = pagina
+    while ultima + 1 in paginas_iguais:
+        ultima += 1
+    return inicio + tamanho - 1 if ultima - inicio + 1 >= tamanho else None
+
+
+# --- Orquestração ---
+
+def executar_crawler(num_workers: int = 2, retomar: bool = True, parar_apos_iguais: int = 0,
+                     max_paginas: Optional[int] = None, perfil_dedicado: bool = True) -> Dict:
+    """
+    Atualiza o diretório local com a lista de contatos do Zoho.
+
+    Args:
+        num_workers: Navegadores em paralelo
+        retomar: Continua a rodada interrompida do checkpoint (False = rodada nova)
+        parar_apos_iguais: Com a lista ordenada por modificação, encerra depois de
+                           N páginas seguidas sem mudança desde a rodada anterior (0 = percorre tudo)
+        max_paginas: Limite de páginas (None = até o fim da lista)
+        perfil_dedicado: Usa os perfis persistentes profiles/worker_<n>
+
+    Returns:
+        Resumo (paginas, alteradas, iguais, contatos, fim, concluida)
+    """
+    checkpoint = _carregar_checkpoint()
+    hashes = checkpoint.get('paginas', {})
+    rodada = checkpoint.get('rodada')
+    if not retomar or not rodada or rodada.get('concluida'):
+        rodada = {'inicio': datetime.now().isoformat(), 'feitas': [], 'fim': None, 'concluida': False}
+    elif rodada.get('feitas'):
+        logging.info(f"Retomando rodada de {rodada['inicio']}: {len(rodada['feitas'])} páginas já feitas")
+
+    feitas = set(rodada['feitas'])
+    limite = min(rodada.get('fim') or FIM_DESCONHECIDO, max_paginas or FIM_DESCONHECIDO)
+    resumo = {'paginas': 0, 'alteradas': 0, 'iguais': 0, 'contatos': 0}
+    paginas_iguais = set()
+
+    contador = Value('i', 1)
+    fim = Value('q', limite)
+
+    with Manager() as manager:
+        login_sync = SessaoCompartilhada(manager)
+        resultado_queue = manager.Queue()
+        processos = [
+            Process(target=worker_crawler,
+                    args=(i + 1, contador, fim, frozenset(feitas), resultado_queue,
+                          login_sync, perfil_dedicado))
+            for i in range(num_workers)
+        ]
+        for p in processos:
+            p.start()
+
+        while True:
+            try:
+                msg = resultado_queue.get(timeout=2)
+            except queue.Empty:
+                if not any(p.is_alive() for p in processos):
+                    break
+                continue
+
+            pagina = msg['pagina']
+            if hashes.get(str(pagina)) == msg['hash']:
+                resumo['iguais'] += 1
+                paginas_iguais.add(pagina)
+                if parar_apos_iguais > 0:
+                    ultima = _sequencia_igual(paginas_iguais, pagina, parar_apos_iguais)
+                    if ultima is not None and ultima < fim.value:
+                        logging.info(f"{parar_apos_iguais} páginas seguidas sem mudança: encerrando na página {ultima}")
+                        with fim.get_lock():
+                            fim.value = ultima
+            else:
+                resumo['contatos'] += registrar_contatos(msg['contatos'])
+                resumo['alteradas'] += 1
+                hashes[str(pagina)] = msg['hash']
+            resumo['paginas'] += 1
+            feitas.add(pagina)
+            rodada['feitas'] = sorted(feitas)
+            _salvar_checkpoint({'rodada': rodada, 'paginas': hashes})
+
+        for p in processos:
+            p.join()
+
+    # Fim conhecido: a rodada está completa se todas as páginas até ele foram feitas
+    ultima = fim.value if fim.value < FIM_DESCONHECIDO else None
+    if ultima is not None:
+        rodada['fim'] = ultima
+        rodada['concluida'] = all(p in feitas for p in range(1, ultima + 1))
+        if rodada['concluida'] and not max_paginas and not parar_apos_iguais:
+            # Lista encolheu: hashes de páginas que não existem mais
+            hashes = {k: v for k, v in hashes.items() if int(k) <= ultima}
+    _salvar_checkpoint({'rodada': rodada, 'paginas': hashes})
+
+    resumo['fim'] = ultima
+    resumo['concluida'] = rodada['concluida']
+    return resumo
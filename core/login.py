@@ -2,10 +2,15 @@
 """
 Módulo de login do sistema de automação Zoho Desk.
 Gerencia a autenticação semi-automatizada.
+
+No modo paralelo só um navegador passa pelo login (com OTP): o estado da
+sessão dele (cookies via CDP + localStorage) é capturado e injetado nos
+demais, que assim começam já autenticados.
 """
 
 import time
 import logging
+from urllib.parse import urlsplit
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -30,6 +35,10 @@ SELETORES_LOGIN = {
     "btn_agora_nao": "button.trustdevice.notnowbtn" 
 }
 
+# Campos aceitos por Network.setCookies (o restante do getAllCookies é descartado)
+CAMPOS_COOKIE_CDP = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+TIMEOUT_VALIDAR_SESSAO_SEGUNDOS = 20
+
 def clicar_seguro(driver, wait, by, selector):
     try:
         el = wait.until(EC.element_to_be_clickable((by, selector)))
@@ -140,4 +149,107 @@ def fazer_login(driver):
 
     except Exception as e:
         logging.error(f"Erro fatal no login: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def capturar_estado_sessao(driver):
+    """
+    Captura o estado de um navegador já logado para reaproveitar em outros.
+
+    Returns:
+        dict {"cookies": [...], "origem": str, "local_storage": {chave: valor}}
+        ou None se não foi possível capturar
+    """
+    try:
+        try:
+            # CDP traz os cookies de todos os domínios (login.zoho.com, desk.zoho.com, ...)
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        except Exception:
+            cookies = driver.get_cookies()
+            for ck in cookies:
+                if "expiry" in ck:
+                    ck["expires"] = ck.pop("expiry")
+
+        partes = urlsplit(driver.current_url)
+        local_storage = driver.execute_script(
+            "var d = {}; for (var i = 0; i < localStorage.length; i++) {"
+            " var k = localStorage.key(i); d[k] = localStorage.getItem(k); } return d;"
+        ) or {}
+
+        logging.info(f"Estado da sessão capturado: {len(cookies)} cookies, "
+                     f"{len(local_storage)} itens de localStorage")
+        return {
+            "cookies": cookies,
+            "origem": f"{partes.scheme}://{partes.netloc}",
+            "local_storage": local_storage,
+        }
+    except Exception as e:
+        logging.warning(f"Não foi possível capturar o estado da sessão: {e}")
+        return None
+
+
+def aplicar_estado_sessao(driver, estado) -> bool:
+    """
+    Injeta num navegador novo o estado capturado por capturar_estado_sessao
+    e confirma que o Zoho Desk abre logado.
+
+    Returns:
+        True se o navegador ficou autenticado
+    """
+    if not estado or not estado.get("cookies"):
+        return False
+    try:
+        cookies = []
+        for ck in estado["cookies"]:
+            ck = {k: v for k, v in ck.items() if k in CAMPOS_COOKIE_CDP}
+            # Cookie de sessão vem com expires -1: sem o campo ele continua de sessão
+            if ck.get("expires") is None or ck["expires"] < 0:
+                ck.pop("expires", None)
+            cookies.append(ck)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+        driver.get(URL_ZOHO_DESK)
+        local_storage = estado.get("local_storage") or {}
+        if local_storage and driver.current_url.startswith(estado.get("origem", "")):
+            driver.execute_script(
+                "var d = arguments[0]; for (var k in d) { localStorage.setItem(k, d[k]); }",
+                local_storage
+            )
+            driver.refresh()
+
+        WebDriverWait(driver, TIMEOUT_VALIDAR_SESSAO_SEGUNDOS).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELETORES_LOGIN["icone_pesquisa"]))
+        )
+        logging.info(f"Sessão compartilhada aplicada ({len(cookies)} cookies).")
+        return True
+    except Exception as e:
+        logging.warning(f"Sessão compartilhada não funcionou: {e}")
+        return False
+
+
+def sessao_ativa(driver, timeout=5) -> bool:
+    """Abre o Zoho Desk e verifica se o navegador (ex.: perfil persistente) já está logado."""
+    try:
+        driver.get(URL_ZOHO_DESK)
+        if "login.zoho.com" in driver.current_url:
+            return False
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELETORES_LOGIN["icone_pesquisa"]))
+        )
+        return True
+    except Exception:
+        return False
+
+
+def login_com_estado(driver, estado=None) -> bool:
+    """
+    Autentica pelo caminho mais barato disponível:
+    sessão já ativa no perfil -> estado compartilhado -> login normal (OTP).
+    """
+    if sessao_ativa(driver):
+        logging.info("Sessão ativa detectada por perfil de navegador.")
+        return True
+    if estado and aplicar_estado_sessao(driver, estado):
+        return True
+    return fazer_login(driver)
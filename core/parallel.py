@@ -9,6 +9,9 @@ import sys
 import time
 import logging
 import csv
+import queue
+import threading
+from collections import deque
 from datetime import datetime
 from multiprocessing import Process, Queue, Manager, current_process
 from typing import List, Dict, Any, Optional
@@ -16,19 +19,103 @@ from selenium.common.exceptions import WebDriverException
 
 # Imports do projeto
 from utils.webdriver import iniciar_driver
-from utils.files import carregar_lista_clientes, dividir_lista_em_blocos
-from utils.session import salvar_progresso
+from utils.files import carregar_lista_clientes
+from utils.cliente import Cliente
+from utils.session import salvar_progresso, salvar_progresso_lote
 import utils.session as session
-from core.login import fazer_login
+from utils.historico_envios import registrar_envios
+from core.login import login_com_estado, capturar_estado_sessao, TIMEOUT_LOGIN_MANUAL_SEGUNDOS
 from core.departments import trocar_departamento_zoho
-from core.search import buscar_e_abrir_cliente
-from core.processing import processar_pagina_cliente, fechar_modal_robusto
+from core.search import (
+    buscar_e_abrir_cliente, iniciar_busca, descarregar_cache_decisoes, configurar_nao_encontrados
+)
+from core.processing import processar_pagina_cliente, fechar_modal_robusto, registrar_saude_zoho
 from core.messaging import fechar_ui_flutuante
-from config.constants import URL_ZOHO_DESK
+from config.constants import URL_ZOHO_DESK, ENVIOS_POR_MINUTO, ENVIOS_RAJADA
+from utils.rate_limiter import LimitadorEnvios, ControladorAIMD, aguardar_vez_de_enviar
+
+# Escritor de progresso: grava a cada N eventos ou T milissegundos
+PROGRESSO_LOTE_EVENTOS = 20
+PROGRESSO_LOTE_MS = 2000
+
+# Fila compartilhada de clientes (work-stealing)
+LEASE_CLIENTE_SEGUNDOS = 900      # Tempo máximo de um worker com um cliente em mãos
+MAX_REENFILEIRAMENTOS = 2         # Depois disso o cliente vai como ERRO
+FILA_ESPERA_SEGUNDOS = 2          # Espera por novo item antes de checar se acabou
+MONITOR_INTERVALO_SEGUNDOS = 5    # Frequência de checagem de workers mortos/leases vencidos
+
+# Reservas aquecidas: navegadores já logados e no departamento, esperando um worker cair
+RESERVAS_AQUECIDAS = 1            # Quantas reservas manter prontas
+MAX_RESERVAS_INICIADAS = 4        # Teto de reposições por execução (evita loop se o login falhar)
+
+# Abas por navegador: cada aba é um worker lógico (mesmo login, um só Edge/driver/processo)
+MAX_ABAS_POR_WORKER = 6
+
+# Troca de departamento (aba E-Mail + esperas fixas) custa tanto quanto ~3 clientes
+CUSTO_TROCA_DEPARTAMENTO_CLIENTES = 3
+
+def planejar_departamentos(carga: Dict[str, int], workers: List[int],
+                           departamento_atual: Optional[Dict[int, str]] = None) -> Dict[int, List[str]]:
+    """
+    Distribui departamentos entre workers com o mínimo de trocas de departamento.
+    
+    - departamentos <= workers: cada worker fica num único departamento; os
+      workers são divididos proporcionalmente aos clientes de cada um (mínimo 1),
+      começando por quem já está naquele departamento
+    - departamentos > workers: cada worker recebe uma sequência de departamentos
+      (maior carga primeiro, para o worker menos carregado contando
+      CUSTO_TROCA_DEPARTAMENTO_CLIENTES por troca), começando pelo atual dele
+    
+    Args:
+        carga: departamento -> quantidade de clientes
+        workers: ids dos workers disponíveis
+        departamento_atual: worker_id -> departamento em que o navegador está
+    
+    Returns:
+        worker_id -> departamentos na ordem em que ele deve atendê-los
+    """
+    atual = departamento_atual or {}
+    departamentos = sorted(carga, key=lambda d: -carga[d])
+    plano = {w: [] for w in workers}
+    if not departamentos or not workers:
+        return plano
+    
+    if len(departamentos) <= len(workers):
+        # Cotas proporcionais à carga (maior resto), mínimo de 1 worker por departamento
+        total = sum(carga.values()) or 1
+        extras = len(workers) - len(departamentos)
+        brutas = {d: carga[d] / total * extras for d in departamentos}
+        cotas = {d: 1 + int(brutas[d]) for d in departamentos}
+        sobra = len(workers) - sum(cotas.values())
+        for d in sorted(departamentos, key=lambda d: brutas[d] - int(brutas[d]), reverse=True)[:sobra]:
+            cotas[d] += 1
+        
+        livres = []
+        for w in workers:
+            d = atual.get(w)
+            if cotas.get(d, 0) > 0:
+                plano[w].append(d)
+                cotas[d] -= 1
+            else:
+                livres.append(w)
+        for d in departamentos:
+            for _ in range(cotas[d]):
+                plano[livres.pop(0)].append(d)
+    else:
+        ocupacao = {w: 0 for w in workers}
+        for d in departamentos:
+            w = min(workers, key=lambda w: (
+                ocupacao[w] + carga[d] + (0 if atual.get(w) == d else CUSTO_TROCA_DEPARTAMENTO_CLIENTES), w
+            ))
+            plano[w].append(d)
+            ocupacao[w] += carga[d] + (0 if atual.get(w) == d else CUSTO_TROCA_DEPARTAMENTO_CLIENTES)
+        for w, lista in plano.items():
+            if atual.get(w) in lista:
+                lista.remove(atual[w])
+                lista.insert(0, atual[w])
+    
+    return plano
 
-# Configurações de cooldown
-COOLDOWN_INTERVALO_CLIENTES = 20
-COOLDOWN_DURACAO_SEGUNDOS = 60
 
 def calcular_workers_ideais(total_clientes: int, max_workers: int = 4) -> int:
     """
@@ -51,23 +138,251 @@ def calcular_workers_ideais(total_clientes: int, max_workers: int = 4) -> int:
         return min(4, max_workers)
 
 
-def worker_process(
-    worker_id: int,
-    bloco_clientes: List[Dict],
-    config: Dict[str, Any],
-    resultado_queue: Queue,
-    login_sync_queue: Optional[Queue] = None
-):
+class EscritorProgresso(threading.Thread):
     """
-    Processo worker que executa o envio para um bloco de clientes.
+    Único ponto que grava em sessions/ e no relatório parcial durante a
+    execução paralela.
     
-    Args:
-        worker_id: Identificador do worker (1, 2, 3, 4)
-        bloco_clientes: Lista de clientes para este worker processar
-        config: Configurações (template, departamento, etc)
-        resultado_queue: Fila para enviar resultados ao processo principal
-        login_sync_queue: Fila para sincronizar logins sequenciais
+    Os workers enviam eventos (cliente, status, worker_id, tempos, fingerprint,
+    telefone) pela fila;
+    esta thread agrupa os eventos (último status por cliente vence) e grava em
+    lote a cada PROGRESSO_LOTE_EVENTOS eventos ou PROGRESSO_LOTE_MS ms.
+    Com `template` definido, os SUCESSOs também entram no histórico de envios.
+    """
+    
+    def __init__(self, fila, session_id: Optional[str], caminho_relatorio: str,
+                 lote_eventos: int = PROGRESSO_LOTE_EVENTOS,
+                 lote_ms: int = PROGRESSO_LOTE_MS,
+                 template: Optional[str] = None):
+        super().__init__(name="EscritorProgresso", daemon=True)
+        self.fila = fila
+        self.session_id = session_id
+        self.caminho_relatorio = caminho_relatorio
+        self.template = template
+        self.lote_eventos = lote_eventos
+        self.lote_segundos = lote_ms / 1000
+        self.pendentes = {}
+        self.total_gravado = 0
+    
+    def run(self):
+        ultimo_flush = time.monotonic()
+        while True:
+            espera = max(0.05, self.lote_segundos - (time.monotonic() - ultimo_flush))
+            try:
+                evento = self.fila.get(timeout=espera)
+            except queue.Empty:
+                evento = False
+            except (EOFError, OSError):
+                # Manager encerrado: grava o que tiver e sai
+                self._flush()
+                return
+            
+            if evento is None:
+                self._flush()
+                return
+            
+            if evento:
+                cliente, status, worker_id, tempos, fingerprint, telefone = evento
+                # Reinsere para manter a ordem cronológica do último evento
+                self.pendentes.pop(cliente, None)
+                self.pendentes[cliente] = (status, worker_id, tempos or {}, fingerprint, telefone)
+            
+            if (len(self.pendentes) >= self.lote_eventos or
+                    time.monotonic() - ultimo_flush >= self.lote_segundos):
+                self._flush()
+                ultimo_flush = time.monotonic()
+    
+    def _flush(self):
+        if not self.pendentes:
+            return
+        lote, self.pendentes = self.pendentes, {}
+        
+        if self.session_id:
+            salvar_progresso_lote(self.session_id, [(c, d[0], d[3]) for c, d in lote.items()])
+        
+        if self.template:
+            enviados = [(c, d[4]) for c, d in lote.items() if d[0] == "SUCESSO"]
+            if enviados:
+                registrar_envios(enviados, self.template, self.session_id)
+        
+        try:
+            novo = not os.path.exists(self.caminho_relatorio)
+            with open(self.caminho_relatorio, 'a', newline='', encoding='utf-8-sig' if novo else 'utf-8') as f:
+                writer = csv.writer(f, delimiter=';')
+                if novo:
+                    writer.writerow(["Status", "Cliente", "Worker", "Busca_s", "Envio_s", "Horario"])
+                agora = datetime.now().strftime('%H:%M:%S')
+                for cliente, (status, worker_id, tempos, _, _) in lote.items():
+                    writer.writerow([
+                        status, cliente, worker_id,
+                        f"{tempos.get('busca', 0):.1f}", f"{tempos.get('envio', 0):.1f}", agora
+                    ])
+        except Exception as e:
+            logging.error(f"Erro ao atualizar relatório parcial: {e}")
+        
+        self.total_gravado += len(lote)
+        logging.debug(f"Progresso gravado: {len(lote)} eventos (total {self.total_gravado})")
+    
+    def parar(self, timeout: float = 30):
+        """Sinaliza fim, aguarda o último flush."""
+        try:
+            self.fila.put(None)
+        except Exception:
+            pass
+        self.join(timeout)
+
+
+def _registrar_progresso(progresso_queue, session_id, cliente_dict, status, worker_id, tempos=None):
+    """Envia o evento ao escritor único (ou grava direto se não houver escritor)."""
+    cliente = cliente_dict.get('busca', 'Desconhecido')
+    fingerprint = session.gerar_fingerprint_cliente(cliente_dict)
+    if progresso_queue is not None:
+        progresso_queue.put((cliente, status, worker_id, tempos, fingerprint,
+                             cliente_dict.get('telefone_excel')))
+    elif session_id:
+        salvar_progresso(session_id, cliente, status, fingerprint)
+
+
+def _pegar_cliente(fila_clientes, leases) -> Optional[tuple]:
+    """
+    Retira o próximo (índice, cliente) da fila compartilhada.
+    Com a fila vazia, espera enquanto algum cliente ainda estiver com lease
+    (pode voltar para a fila se o worker dele morrer). None = acabou.
+    """
+    while True:
+        try:
+            return fila_clientes.get(timeout=FILA_ESPERA_SEGUNDOS)
+        except queue.Empty:
+            if len(leases) == 0:
+                return None
+        except (EOFError, OSError):
+            return None
+
+
+def _aguardar_ativacao(fila_ativacao, fila_clientes, leases) -> Optional[int]:
+    """
+    Reserva parada até algum worker ceder o lugar.
+    Returns: id do worker substituído, ou None se o trabalho acabou antes.
+    """
+    while True:
+        try:
+            return fila_ativacao.get(timeout=FILA_ESPERA_SEGUNDOS)
+        except queue.Empty:
+            if fila_clientes.empty() and len(leases) == 0:
+                return None
+        except (EOFError, OSError):
+            return None
+
+
+def _reserva_disponivel(reservas) -> bool:
+    """Existe reserva aquecida pronta para assumir agora?"""
+    try:
+        return reservas is not None and any(s == 'pronta' for s in reservas.values())
+    except (EOFError, OSError):
+        return False
+
+
+def _cliente_concluido(session_id: Optional[str], cliente_dict) -> bool:
+    """Já consta como concluído na sessão (e a linha não mudou desde então)?"""
+    if not session_id:
+        return False
+    # Um cliente por vez: lookup do registro dele, sem ler a sessão inteira
+    registro = session.obter_store(session_id).registro(cliente_dict.get('busca', ''))
+    return not session.registro_pendente(registro, cliente_dict, ("SUCESSO", "NAO_ENCONTRADO"),
+                                         por_fingerprint=True)
+
+
+def _abas_por_worker(config: Dict[str, Any]) -> int:
+    """Abas do navegador de cada worker (prefetch_aba equivale a 2)."""
+    abas = config.get('abas_por_worker') or (2 if config.get('prefetch_aba') else 1)
+    return max(1, min(int(abas), MAX_ABAS_POR_WORKER))
+
+
+def _abrir_abas_pipeline(driver, quantidade: int, logger) -> List[str]:
     """
+    Abre as abas extras do pipeline na mesma página (mesmo departamento).
+    As abas compartilham cookies: nenhuma precisa de login.
+    Returns: [aba atual, extras...], ou [] se não deu (segue com uma aba só)
+    """
+    abas = []
+    try:
+        principal = driver.current_window_handle
+        abas.append(principal)
+        url = driver.current_url
+        for _ in range(quantidade - 1):
+            driver.switch_to.new_window('tab')
+            driver.get(url if "desk.zoho.com/agent/" in url else URL_ZOHO_DESK)
+            abas.append(driver.current_window_handle)
+        driver.switch_to.window(principal)
+        logger.info(f"{len(abas)} abas no navegador (pipeline de buscas)")
+        return abas
+    except Exception as e:
+        logger.warning(f"Não foi possível abrir as abas do pipeline ({e}), seguindo com uma aba")
+        if len(abas) > 1:
+            _fechar_abas_pipeline(driver, abas)
+        return []
+
+
+def _fechar_abas_pipeline(driver, abas: List[str]) -> None:
+    """Fecha as abas que não estão em uso, deixando o navegador com uma aba só."""
+    try:
+        atual = driver.current_window_handle
+        if atual not in abas:
+            atual = abas[0]
+        for aba in abas:
+            if aba != atual:
+                driver.switch_to.window(aba)
+                driver.close()
+        driver.switch_to.window(atual)
+    except Exception:
+        pass
+
+
+def _pre_carregar_proximo(driver, aba_busca: str, fila_clientes, leases,
+                          worker_id: int, session_id: Optional[str], logger):
+    """
+    Pipeline de abas: tira da fila o próximo cliente e dispara a busca dele em
+    aba_busca, sem esperar. Os resultados carregam lá enquanto o envio do
+    cliente atual acontece nesta aba.
+    
+    Returns:
+        (indice, cliente, termo digitado ou None, aba da busca), ou None se a fila está vazia
+    """
+    while True:
+        try:
+            indice, cliente = fila_clientes.get_nowait()
+        except (queue.Empty, EOFError, OSError):
+            return None
+        leases[indice] = (worker_id, os.getpid(), time.time() + LEASE_CLIENTE_SEGUNDOS)
+        if not _cliente_concluido(session_id, cliente):
+            break
+        logger.info(f"[#{indice+1}] Pulando (já processado): {cliente.get('busca', 'Desconhecido')}")
+        leases.pop(indice, None)
+    
+    termo = None
+    atual = None
+    try:
+        atual = driver.current_window_handle
+        driver.switch_to.window(aba_busca)
+        if "desk.zoho.com/agent/" not in driver.current_url:
+            driver.get(URL_ZOHO_DESK)
+        termo = iniciar_busca(driver, cliente)
+    except Exception as e:
+        logger.warning(f"Pré-carregamento do cliente #{indice+1} falhou (segue sem ele): {e}")
+    finally:
+        if atual is not None:
+            try:
+                driver.switch_to.window(atual)
+            except Exception:
+                pass
+    
+    if termo:
+        logger.info(f"[#{indice+1}] Busca '{termo}' disparada em outra aba")
+    return indice, cliente, termo, aba_busca
+
+
+def _configurar_log_worker(worker_id: int) -> logging.Logger:
+    """Log do processo worker: arquivo próprio + console só com avisos."""
     # Cria pasta de logs se não existir
     os.makedirs('logging', exist_ok=True)
     
@@ -86,25 +401,62 @@ def worker_process(
     console_handler.setFormatter(logging.Formatter(f'[Worker {worker_id}] %(levelname)s - %(message)s'))
     logging.getLogger().addHandler(console_handler)
     
-    logger = logging.getLogger(f'Worker{worker_id}')
-    logger.info(f"Iniciando com {len(bloco_clientes)} clientes")
+    return logging.getLogger(f'Worker{worker_id}')
+
+
+class SessaoCompartilhada:
+    """
+    Estado da sessão logada publicado pelo worker 1 para os demais.
+    A leitura não consome o valor: quem abre o navegador depois (reabertura,
+    reserva) enxerga o mesmo estado, e uma falha (None) pode ser substituída
+    por uma sessão válida quando o worker 1 reabrir e logar.
+    """
     
-    # Resultados locais
-    resultados = {
-        'worker_id': worker_id,
-        'sucesso': [],
-        'nao_encontrados': [],
-        'erros': [],
-        'total': len(bloco_clientes)
-    }
+    def __init__(self, manager):
+        self._dados = manager.dict()
+        self._pronta = manager.Event()
+    
+    def publicada(self) -> bool:
+        """True depois que o worker 1 logou ou desistiu."""
+        return self._pronta.is_set()
     
+    def estado(self):
+        """Estado publicado (None se ainda não há ou se o login do worker 1 falhou)."""
+        return self._dados.get("estado")
+    
+    def publicar(self, estado) -> None:
+        """Publica (ou substitui) o estado e libera quem está aguardando."""
+        self._dados["estado"] = estado
+        self._pronta.set()
+    
+    def aguardar(self, timeout: float):
+        """Espera a publicação; devolve o estado ou None (falha ou timeout)."""
+        if not self._pronta.wait(timeout):
+            return None
+        return self.estado()
+
+
+def _abrir_navegador_logado(worker_id: int, login_sync: Optional[SessaoCompartilhada],
+                            perfil_dedicado: bool, logger):
+    """
+    Abre o Edge do worker e autentica (perfil, sessão compartilhada ou login).
+    O worker 1 publica a sessão em login_sync; se ele falhar, publica None
+    para os demais não ficarem esperando. Reaberto com uma sessão válida já
+    publicada, o worker 1 só a reaproveita; reaberto depois de uma falha, loga
+    de novo e substitui o None.
+    
+    Returns:
+        (driver, estado_login) — driver None em caso de falha
+    """
+    publicar_sessao = (login_sync is not None and worker_id == 1
+                       and (not login_sync.publicada() or login_sync.estado() is None))
+    estado_login = None
     try:
         # Inicia driver com posicionamento baseado no worker_id
-        driver = iniciar_driver(instance_id=worker_id)
+        driver = iniciar_driver(instance_id=worker_id, perfil_dedicado=perfil_dedicado)
         if not driver:
             logger.error("Falha ao iniciar driver")
-            resultado_queue.put(resultados)
-            return
+            return None, None
         
         # Garante que o driver está funcionando navegando para uma URL inicial
         try:
@@ -112,184 +464,364 @@ def worker_process(
             time.sleep(1)
         except Exception as e:
             logger.error(f"Driver não está respondendo: {e}")
-            resultado_queue.put(resultados)
-            return
+            return None, None
         
-        # Se temos sincronização de login, aguarda nossa vez
-        if login_sync_queue and worker_id > 1:
-            logger.info("Aguardando workers anteriores fazerem login...")
-            while True:
-                try:
-                    ultimo_logado = login_sync_queue.get(timeout=300)  # 5 min timeout
-                    if ultimo_logado >= worker_id - 1:
-                        login_sync_queue.put(ultimo_logado)  # Devolve para outros workers
-                        break
-                except:
-                    logger.warning("Timeout aguardando login anterior, tentando mesmo assim...")
-                    break
+        # Sessão do worker 1 (o navegador já abriu em paralelo enquanto ele loga)
+        if login_sync is not None and not publicar_sessao:
+            logger.info("Aguardando a sessão logada do worker 1...")
+            estado_login = login_sync.aguardar(TIMEOUT_LOGIN_MANUAL_SEGUNDOS + 60)
+            if estado_login is None:
+                logger.warning("Sem sessão compartilhada: login próprio (pode pedir OTP)")
         
         # Login
         logger.info("Iniciando login...")
-        if not fazer_login(driver):
+        if not login_com_estado(driver, estado_login):
             logger.critical("Falha no login!")
             driver.quit()
-            resultado_queue.put(resultados)
-            return
+            return None, None
         
-        # Sinaliza que este worker logou
-        if login_sync_queue:
-            try:
-                login_sync_queue.get_nowait()
-            except:
-                pass
-            login_sync_queue.put(worker_id)
-            logger.info(f"Login concluído, sinalizando worker {worker_id}")
+        # Publica a sessão para os outros workers
+        if publicar_sessao:
+            estado_login = capturar_estado_sessao(driver)
+            login_sync.publicar(estado_login)
+            publicar_sessao = False
+            logger.info("Login concluído, sessão publicada para os demais workers")
         
-        # Troca departamento
-        dept_nome = config.get('departamento', 'Era Verde Energia')
-        if not trocar_departamento_zoho(driver, dept_nome):
-            logger.error("Falha ao trocar departamento")
-            driver.quit()
-            resultado_queue.put(resultados)
-            return
+        return driver, estado_login
+    finally:
+        # Worker 1 caiu antes de logar: libera os outros para logarem sozinhos
+        if publicar_sessao and login_sync.estado() is None:
+            login_sync.publicar(None)
+
+
+def _processar_fila(driver, worker_id: int, config: Dict[str, Any],
+                    resultados: Dict, fila_clientes, leases, progresso_queue=None,
+                    limitador: Optional[LimitadorEnvios] = None,
+                    controlador: Optional[ControladorAIMD] = None,
+                    reservas=None, fila_ativacao=None, estado_login=None,
+                    perfil_dedicado: bool = True, logger=logging):
+    """
+    Loop de envio de um worker já logado e no departamento de config:
+    puxa clientes da fila até ela esvaziar, acumulando em `resultados`.
+    
+    Com config['abas_por_worker'] > 1 (ou prefetch_aba = 2 abas), o navegador
+    tem várias abas, cada uma um worker lógico atendido em rodízio: enquanto
+    o cliente de uma aba é enviado, as buscas dos próximos já carregam nas
+    outras, e cada ciclo só troca para a aba seguinte.
+    
+    Returns:
+        O driver em uso (pode ter sido recriado na recuperação), ou None se o
+        worker cedeu o lugar a uma reserva ou não conseguiu se recuperar
+    """
+    dept_nome = config.get('departamento', 'Era Verde Energia')
+    template_nome = config.get('template_nome')
+    ancoras = config.get('ancoras', [])
+    dry_run = config.get('dry_run', False)
+    session_id = config.get('session_id')  # Para salvar progresso
+    configurar_nao_encontrados(config.get('ttl_nao_encontrados_dias'), config.get('modo_nao_encontrados'))
+    
+    # Pipeline de abas: abas=None abre na próxima volta, [] = desativado
+    num_abas = _abas_por_worker(config)
+    abas = None
+    prefetch = deque()    # (indice, cliente, termo já digitado, aba) dos próximos, em ordem de rodízio
+    busca_iniciada = None
+    aba_busca = None
+    
+    # Loop de processamento: puxa o próximo cliente livre da fila
+    indice = None
+    while True:
+        if indice is None:
+            if prefetch:
+                indice, cliente_dict, busca_iniciada, aba_busca = prefetch.popleft()
+            else:
+                item = _pegar_cliente(fila_clientes, leases)
+                if item is None:
+                    break
+                indice, cliente_dict = item
+        termo_busca = cliente_dict.get('busca', 'Desconhecido')
+        
+        # Lease: se este processo morrer, o monitor devolve o cliente à fila
+        leases[indice] = (worker_id, os.getpid(), time.time() + LEASE_CLIENTE_SEGUNDOS)
         
-        template_nome = config.get('template_nome')
-        ancoras = config.get('ancoras', [])
-        dry_run = config.get('dry_run', False)
-        session_id = config.get('session_id')  # Para salvar progresso
+        # --- CHECK DE SESSÃO (linhas alteradas desde o envio continuam pendentes) ---
+        if _cliente_concluido(session_id, cliente_dict):
+            logger.info(f"[#{indice+1}] Pulando (já processado): {termo_busca}")
+            leases.pop(indice, None)
+            indice = None
+            continue
         
-        # Loop de processamento
-        i = 0
-        while i < len(bloco_clientes):
-            cliente_dict = bloco_clientes[i]
-            termo_busca = cliente_dict.get('busca', 'Desconhecido')
+        logger.info(f"[#{indice+1} | {resultados['total']+1}º deste worker] Processando: {termo_busca}")
+        
+        try:
+            # Recuperação do driver se necessário
+            if driver is None:
+                logger.warning("Driver nulo, tentando recuperar...")
+                raise WebDriverException("Driver nulo")
             
-            # --- CHECK DE SESSÃO ---
-            if session_id:
-                status_anterior = session.obter_status_cliente(session_id, termo_busca)
-                if status_anterior in ["SUCESSO", "NAO_ENCONTRADO"]:
-                    logger.info(f"[{i+1}/{len(bloco_clientes)}] Pulando (já processado): {termo_busca} ({status_anterior})")
-                    i += 1
-                    continue
+            if num_abas > 1 and abas is None:
+                abas = _abrir_abas_pipeline(driver, num_abas, logger)
             
-            logger.info(f"[{i+1}/{len(bloco_clientes)}] Processando: {termo_busca}")
+            # Cliente pré-carregado: continua na aba onde a busca dele já rodou
+            if aba_busca is not None:
+                driver.switch_to.window(aba_busca)
             
-            try:
-                # Recuperação do driver se necessário
-                if driver is None:
-                    logger.warning("Driver nulo, tentando recuperar...")
-                    raise WebDriverException("Driver nulo")
-
-                # Limpeza de segurança (somente se driver estiver ok)
+            # Limpeza de segurança (somente se driver estiver ok; com a busca
+            # pré-carregada ela já foi feita antes de digitar)
+            if not busca_iniciada:
                 try:
                     fechar_modal_robusto(driver, "limpeza", tentativas=2)
                     fechar_ui_flutuante(driver)
                     time.sleep(0.3)
                 except Exception as e:
                     logger.warning(f"Erro na limpeza prévia (ignorado): {e}")
-            
-                # Cooldown
-                if i > 0 and i % COOLDOWN_INTERVALO_CLIENTES == 0:
-                    logger.info(f"Pausa de {COOLDOWN_DURACAO_SEGUNDOS}s...")
-                    time.sleep(COOLDOWN_DURACAO_SEGUNDOS)
                 
                 # Garante home
                 if "desk.zoho.com/agent/" not in driver.current_url:
                     driver.get(URL_ZOHO_DESK)
                     time.sleep(2)
-                
-                # Busca
-                encontrado = buscar_e_abrir_cliente(driver, cliente_dict)
-                
-                if not encontrado:
-                    resultados['nao_encontrados'].append(termo_busca)
-                    if session_id:
-                        salvar_progresso(session_id, termo_busca, "NAO_ENCONTRADO")
-                    i += 1
-                    continue
-                
-                # Processamento
-                resultado = processar_pagina_cliente(
-                    driver=driver,
-                    nome_cliente=termo_busca,
-                    departamento=dept_nome,
-                    template_nome=template_nome,
-                    ancoras=ancoras,
-                    dry_run=dry_run
-                )
-                
-                if resultado['sucesso']:
-                    resultados['sucesso'].append(termo_busca)
-                    if session_id:
-                        salvar_progresso(session_id, termo_busca, "SUCESSO")
-                else:
-                    resultados['erros'].append({'cliente': termo_busca, 'erro': resultado['erro']})
-                    if session_id:
-                        salvar_progresso(session_id, termo_busca, "ERRO")
-                
-                # Sucesso! Avança para o próximo
-                i += 1
-                
-            except (WebDriverException, ConnectionError, Exception) as e:
-                # Verifica se é erro fatal de conexão/driver
-                msg_erro = str(e).lower()
-                eh_erro_conexao = "connection" in msg_erro or "refused" in msg_erro or "reset" in msg_erro or "closed" in msg_erro or "invalid session" in msg_erro
-                
-                if not eh_erro_conexao and not isinstance(e, (WebDriverException, ConnectionError)):
-                    # Erro genérico de lógica, loga e avança
-                    logger.error(f"Erro genérico no cliente {termo_busca}: {e}")
-                    if session_id:
-                        salvar_progresso(session_id, termo_busca, "ERRO_GENERICO")
-                    
-                    if isinstance(e, dict):
-                         resultados['erros'].append({'cliente': termo_busca, 'erro': str(e)})
-                    else:
-                         resultados['erros'].append({'cliente': termo_busca, 'erro': str(e)})
-                    i += 1
-                    continue
-                
-                # Se for erro de conexão/driver, TENTA RECUPERAR
-                logger.critical(f"ERRO DE CONEXÃO/DRIVER DETECTADO: {e}")
-                logger.info("Tentando reiniciar o navegador e recuperar o worker...")
-                
+            
+            # Busca
+            t_busca = time.monotonic()
+            encontrado = buscar_e_abrir_cliente(driver, cliente_dict, busca_iniciada)
+            tempos = {'busca': time.monotonic() - t_busca}
+            busca_iniciada = aba_busca = None
+            
+            # Próximos clientes já começam a carregar nas abas livres enquanto este é concluído
+            if abas:
+                ocupadas = {p[3] for p in prefetch}
+                ocupadas.add(driver.current_window_handle)
+                for aba in abas:
+                    if aba in ocupadas:
+                        continue
+                    proximo = _pre_carregar_proximo(driver, aba, fila_clientes, leases,
+                                                    worker_id, session_id, logger)
+                    if proximo is None:
+                        break
+                    prefetch.append(proximo)
+            
+            if not encontrado:
+                resultados['nao_encontrados'].append(termo_busca)
+                _registrar_progresso(progresso_queue, session_id, cliente_dict,
+                                     "NAO_ENCONTRADO", worker_id, tempos)
+                registrar_saude_zoho(controlador, houve_busca=True, logger=logger)
+                leases.pop(indice, None)
+                indice = None
+                resultados['total'] += 1
+                continue
+            
+            # Ritmo global de envios (substitui a pausa fixa por worker)
+            aguardar_vez_de_enviar(limitador, logger)
+            
+            # Processamento
+            t_envio = time.monotonic()
+            resultado = processar_pagina_cliente(
+                driver=driver,
+                nome_cliente=termo_busca,
+                departamento=dept_nome,
+                template_nome=template_nome,
+                ancoras=ancoras,
+                dry_run=dry_run
+            )
+            tempos['envio'] = time.monotonic() - t_envio
+            registrar_saude_zoho(controlador, houve_busca=True, houve_envio=True, logger=logger)
+            
+            # processar_pagina_cliente retorna bool; aceita também o formato dict
+            if isinstance(resultado, dict):
+                enviado, erro = resultado.get('sucesso'), resultado.get('erro')
+            else:
+                enviado, erro = bool(resultado), "Falha no envio"
+            
+            if enviado:
+                resultados['sucesso'].append(termo_busca)
+                _registrar_progresso(progresso_queue, session_id, cliente_dict,
+                                     "SUCESSO", worker_id, tempos)
+            else:
+                resultados['erros'].append({'cliente': termo_busca, 'erro': erro})
+                _registrar_progresso(progresso_queue, session_id, cliente_dict,
+                                     "ERRO", worker_id, tempos)
+            
+            # Sucesso! Libera o lease e avança para o próximo
+            leases.pop(indice, None)
+            indice = None
+            resultados['total'] += 1
+        
+        except (WebDriverException, ConnectionError, Exception) as e:
+            # Verifica se é erro fatal de conexão/driver
+            msg_erro = str(e).lower()
+            eh_erro_conexao = "connection" in msg_erro or "refused" in msg_erro or "reset" in msg_erro or "closed" in msg_erro or "invalid session" in msg_erro
+            
+            if not eh_erro_conexao and not isinstance(e, (WebDriverException, ConnectionError)):
+                # Erro genérico de lógica, loga e avança
+                logger.error(f"Erro genérico no cliente {termo_busca}: {e}")
+                _registrar_progresso(progresso_queue, session_id, cliente_dict,
+                                     "ERRO_GENERICO", worker_id)
+                resultados['erros'].append({'cliente': termo_busca, 'erro': str(e)})
+                leases.pop(indice, None)
+                indice = None
+                busca_iniciada = aba_busca = None
+                resultados['total'] += 1
+                continue
+            
+            # Se for erro de conexão/driver, TENTA RECUPERAR
+            logger.critical(f"ERRO DE CONEXÃO/DRIVER DETECTADO: {e}")
+            registrar_saude_zoho(controlador, falha_driver=True, logger=logger)
+            
+            # Pré-carregamentos morreram com o navegador: os clientes voltam para a fila
+            while prefetch:
+                pendente, cliente_pendente = prefetch.popleft()[:2]
+                leases.pop(pendente, None)
+                fila_clientes.put((pendente, cliente_pendente))
+            busca_iniciada = aba_busca = None
+            abas = None
+            
+            # Com reserva aquecida pronta, troca na hora em vez de reabrir o Edge
+            if _reserva_disponivel(reservas):
+                logger.warning("Cedendo lugar para uma reserva aquecida")
+                leases.pop(indice, None)
+                fila_clientes.put((indice, cliente_dict))  # Falha foi do driver, não do cliente
+                fila_ativacao.put(worker_id)
                 try:
-                    if driver:
-                        driver.quit()
-                except:
+                    driver.quit()
+                except Exception:
                     pass
-                
-                driver = None
-                time.sleep(5) 
-                
-                # Tenta reinicializar até 3 vezes
-                recuperado = False
-                for tentativa_rec in range(3):
-                    try:
-                        logger.info(f"Tentativa de recuperação {tentativa_rec + 1}/3...")
-                        driver = iniciar_driver(instance_id=worker_id)
-                        if driver:
-                            driver.get("about:blank")
-                            time.sleep(1)
-                            if fazer_login(driver):
-                                if trocar_departamento_zoho(driver, dept_nome):
-                                    recuperado = True
-                                    logger.info("WORKER RECUPERADO COM SUCESSO!")
-                                    break
-                    except Exception as ex_rec:
-                        logger.error(f"Falha na tentativa de recuperação {tentativa_rec + 1}: {ex_rec}")
-                        if driver:
-                            try: driver.quit() 
-                            except: pass
-                            driver = None
-                        time.sleep(5)
-                
-                if not recuperado:
-                    logger.critical("FALHA TOTAL NA RECUPERAÇÃO DO WORKER. Encerrando este worker.")
-                    resultados['erros'].append({'cliente': termo_busca, 'erro': "FALHA_FATAL_WORKER"})
-                    resultado_queue.put(resultados)
-                    return
-                
-                logger.info(f"Retomando processamento do cliente: {termo_busca}")
+                return None
+            
+            logger.info("Tentando reiniciar o navegador e recuperar o worker...")
+            
+            try:
+                if driver:
+                    driver.quit()
+            except:
+                pass
+            
+            driver = None
+            time.sleep(5) 
+            
+            # Tenta reinicializar até 3 vezes
+            recuperado = False
+            for tentativa_rec in range(3):
+                try:
+                    logger.info(f"Tentativa de recuperação {tentativa_rec + 1}/3...")
+                    driver = iniciar_driver(instance_id=worker_id, perfil_dedicado=perfil_dedicado)
+                    if driver:
+                        # Com perfil persistente o navegador já volta logado
+                        if login_com_estado(driver, estado_login):
+                            if trocar_departamento_zoho(driver, dept_nome):
+                                recuperado = True
+                                logger.info("WORKER RECUPERADO COM SUCESSO!")
+                                break
+                except Exception as ex_rec:
+                    logger.error(f"Falha na tentativa de recuperação {tentativa_rec + 1}: {ex_rec}")
+                    if driver:
+                        try: driver.quit() 
+                        except: pass
+                        driver = None
+                    time.sleep(5)
+            
+            if not recuperado:
+                # O lease fica: com o processo encerrado, o monitor devolve o cliente à fila
+                logger.critical("FALHA TOTAL NA RECUPERAÇÃO DO WORKER. Encerrando este worker.")
+                return None
+            
+            logger.info(f"Retomando processamento do cliente: {termo_busca}")
+    
+    if abas:
+        _fechar_abas_pipeline(driver, abas)
+    return driver
+
+
+def worker_process(
+    worker_id: int,
+    clientes: Optional[List[Cliente]],
+    config: Dict[str, Any],
+    resultado_queue: Queue,
+    login_sync: Optional[SessaoCompartilhada] = None,
+    progresso_queue: Optional[Queue] = None,
+    fila_clientes: Optional[Queue] = None,
+    leases=None,
+    limitador: Optional[LimitadorEnvios] = None,
+    controlador: Optional[ControladorAIMD] = None,
+    reservas=None,
+    fila_ativacao: Optional[Queue] = None
+):
+    """
+    Processo worker que executa o envio puxando clientes de uma fila compartilhada.
+    
+    Args:
+        worker_id: Identificador do worker (1, 2, 3, 4)
+        clientes: Lista de clientes, só quando não há fila compartilhada (com fila,
+                  cada cliente viaja dentro dela e o worker não recebe a lista)
+        config: Configurações (template, departamento, etc)
+        resultado_queue: Fila para enviar resultados ao processo principal
+        login_sync: SessaoCompartilhada onde o worker 1 publica o estado da sessão
+                    logada (os demais injetam esse estado em vez de logar de novo)
+        progresso_queue: Fila do EscritorProgresso (None = grava direto na sessão)
+        fila_clientes: Fila de (índice, cliente) pendentes (None = processa `clientes` inteira)
+        leases: Dict compartilhado índice -> (worker_id, pid, expira_em) dos clientes em mãos
+        limitador: Token bucket compartilhado pela frota (None = sem limite)
+        controlador: Ajuste adaptativo (AIMD) da taxa do limitador (None = taxa fixa)
+        reservas: Dict compartilhado worker_id -> estado das reservas aquecidas
+                  ('aquecendo', 'pronta', 'ativa'); este worker é reserva se estiver nele
+        fila_ativacao: Worker com driver quebrado publica aqui o seu id; uma reserva
+                       pronta pega e assume o lugar dele
+    """
+    if fila_clientes is None:
+        fila_clientes = queue.Queue()
+        for item in enumerate(clientes):
+            fila_clientes.put(item)
+    if leases is None:
+        leases = {}
+    
+    logger = _configurar_log_worker(worker_id)
+    logger.info(f"Iniciando (fila compartilhada de {_tamanho_fila(fila_clientes)} clientes)")
+    
+    # Perfil persistente profiles/worker_<n>: volta logado após reinício/recuperação
+    perfil_dedicado = config.get('perfil_por_worker', True)
+    
+    # Reserva só entra no relatório se chegar a ser ativada
+    reserva = reservas is not None and worker_id in reservas
+    reportar = not reserva
+    
+    # Resultados locais
+    resultados = {
+        'worker_id': worker_id,
+        'sucesso': [],
+        'nao_encontrados': [],
+        'erros': [],
+        'total': 0
+    }
+    
+    try:
+        # Worker 1 loga e publica a sessão; os outros esperam por ela
+        driver, estado_login = _abrir_navegador_logado(worker_id, login_sync, perfil_dedicado, logger)
+        if driver is None:
+            return
+        
+        # Troca departamento
+        dept_nome = config.get('departamento', 'Era Verde Energia')
+        if not trocar_departamento_zoho(driver, dept_nome):
+            logger.error("Falha ao trocar departamento")
+            driver.quit()
+            return
+        
+        # Reserva: fica logada e no departamento até um worker cair
+        if reserva:
+            reservas[worker_id] = 'pronta'
+            logger.info("Reserva aquecida pronta, aguardando ativação...")
+            substituido = _aguardar_ativacao(fila_ativacao, fila_clientes, leases)
+            if substituido is None:
+                logger.info("Trabalho concluído sem precisar da reserva")
+                driver.quit()
+                return
+            reservas[worker_id] = 'ativa'
+            reportar = True
+            logger.warning(f"Reserva ativada no lugar do worker {substituido}")
+        
+        driver = _processar_fila(driver, worker_id, config, resultados, fila_clientes, leases,
+                                 progresso_queue, limitador, controlador, reservas, fila_ativacao,
+                                 estado_login, perfil_dedicado, logger)
+        if driver is None:
+            return
         
         logger.info(f"Processamento concluído: {len(resultados['sucesso'])} sucesso, "
                    f"{len(resultados['nao_encontrados'])} não encontrados, "
@@ -298,36 +830,136 @@ def worker_process(
     except Exception as e:
         logger.error(f"Erro fatal no worker: {e}")
     finally:
+        # Processo sai sem atexit: grava já os contatos aprendidos e o catálogo de sessões
+        descarregar_cache_decisoes()
+        session.descarregar_catalogo()
+        
         # Envia resultados
-        resultado_queue.put(resultados)
-        logger.info("Resultados enviados ao processo principal")
+        if reportar:
+            resultado_queue.put(resultados)
+            logger.info("Resultados enviados ao processo principal")
 
 
-def consolidar_resultados(resultado_queue: Queue, num_workers: int) -> Dict:
+def worker_frota(
+    worker_id: int,
+    fila_tarefas: Queue,
+    login_sync: Optional[SessaoCompartilhada] = None,
+    limitador: Optional[LimitadorEnvios] = None,
+    controlador: Optional[ControladorAIMD] = None,
+    perfil_dedicado: bool = True
+):
     """
-    Coleta resultados de todos os workers e gera relatório unificado.
+    Worker persistente do modo serviço (ver Frota).
+    
+    Abre o Edge e autentica uma única vez; depois processa as campanhas que
+    chegam em fila_tarefas até receber None. O departamento só é trocado
+    quando a campanha pede um diferente do atual.
+    
+    Cada tarefa é um dict com config, fila_clientes, leases, progresso_queue
+    e resultado_queue (mesmo papel que em worker_process).
     """
-    resultados = {
+    logger = _configurar_log_worker(worker_id)
+    logger.info("Iniciando worker da frota")
+    
+    driver, estado_login = _abrir_navegador_logado(worker_id, login_sync, perfil_dedicado, logger)
+    if driver is None:
+        return
+    
+    departamento_atual = None
+    try:
+        while True:
+            tarefa = fila_tarefas.get()
+            if tarefa is None:
+                logger.info("Encerrando worker da frota")
+                break
+            
+            config = tarefa['config']
+            resultados = {
+                'worker_id': worker_id,
+                'pid': os.getpid(),
+                'sucesso': [],
+                'nao_encontrados': [],
+                'erros': [],
+                'total': 0
+            }
+            try:
+                dept_nome = config.get('departamento', 'Era Verde Energia')
+                if dept_nome != departamento_atual:
+                    departamento_atual = None
+                    if not trocar_departamento_zoho(driver, dept_nome):
+                        logger.error(f"Falha ao trocar para o departamento {dept_nome}")
+                        continue
+                    departamento_atual = dept_nome
+                else:
+                    logger.info(f"Já no departamento {dept_nome}, sem troca")
+                
+                logger.info(f"Campanha {config.get('template_nome')}: "
+                            f"fila compartilhada de {_tamanho_fila(tarefa['fila_clientes'])} clientes")
+                driver = _processar_fila(driver, worker_id, config, resultados,
+                                         tarefa['fila_clientes'], tarefa['leases'], tarefa['progresso_queue'],
+                                         limitador, controlador, estado_login=estado_login,
+                                         perfil_dedicado=perfil_dedicado, logger=logger)
+            except Exception as e:
+                logger.error(f"Erro na campanha: {e}")
+            finally:
+                resultados['departamento'] = departamento_atual
+                tarefa['resultado_queue'].put(resultados)
+            
+            if driver is None:
+                # A Frota reabre este worker
+                return
+    finally:
+        descarregar_cache_decisoes()
+        session.descarregar_catalogo()
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def _resultados_vazios() -> Dict:
+    return {
         'sucesso': [],
         'nao_encontrados': [],
         'erros': [],
         'por_worker': {},
         'total_processado': 0
     }
+
+
+def _acumular_resultado(resultados: Dict, resultado_worker: Dict):
+    """Soma o relatório de um worker ao consolidado. Retorna o worker_id."""
+    worker_id = resultado_worker.get('worker_id', 'unknown')
+    anterior = resultados['por_worker'].get(worker_id)
+    if anterior:
+        # Mesmo worker reaberto na mesma campanha (modo serviço): junta os dois relatórios
+        for chave in ('sucesso', 'nao_encontrados', 'erros'):
+            anterior[chave] = anterior.get(chave, []) + resultado_worker.get(chave, [])
+        anterior['total'] = anterior.get('total', 0) + resultado_worker.get('total', 0)
+    else:
+        resultados['por_worker'][worker_id] = resultado_worker
+    resultados['sucesso'].extend(resultado_worker.get('sucesso', []))
+    resultados['nao_encontrados'].extend(resultado_worker.get('nao_encontrados', []))
+    resultados['erros'].extend(resultado_worker.get('erros', []))
+    resultados['total_processado'] += resultado_worker.get('total', 0)
+    return worker_id
+
+
+def consolidar_resultados(resultado_queue: Queue, num_workers: int,
+                          timeout_por_worker: float = 7200) -> Dict:
+    """
+    Coleta resultados de todos os workers e gera relatório unificado.
+    Um worker morto sem enviar resultado só custa o timeout_por_worker.
+    """
+    resultados = _resultados_vazios()
     
     workers_finalizados = 0
-    timeout_por_worker = 7200  # 2 horas por worker
     
     while workers_finalizados < num_workers:
         try:
             resultado_worker = resultado_queue.get(timeout=timeout_por_worker)
-            worker_id = resultado_worker.get('worker_id', 'unknown')
-            
-            resultados['por_worker'][worker_id] = resultado_worker
-            resultados['sucesso'].extend(resultado_worker.get('sucesso', []))
-            resultados['nao_encontrados'].extend(resultado_worker.get('nao_encontrados', []))
-            resultados['erros'].extend(resultado_worker.get('erros', []))
-            resultados['total_processado'] += resultado_worker.get('total', 0)
+            worker_id = _acumular_resultado(resultados, resultado_worker)
             
             workers_finalizados += 1
             logging.info(f"Worker {worker_id} finalizado ({workers_finalizados}/{num_workers})")
@@ -339,13 +971,14 @@ def consolidar_resultados(resultado_queue: Queue, num_workers: int) -> Dict:
     return resultados
 
 
-def salvar_relatorio_consolidado(resultados: Dict, arquivo_origem: str):
+def salvar_relatorio_consolidado(resultados: Dict, arquivo_origem: str, sufixo: str = ""):
     """
     Salva relatório consolidado em CSV com detalhes por worker.
+    `sufixo` diferencia campanhas concluídas no mesmo minuto (modo serviço).
     """
     timestamp = datetime.now().strftime('%Y%m%d_%H%M')
     os.makedirs("reports", exist_ok=True)
-    nome_csv = os.path.join("reports", f"relatorio_paralelo_{timestamp}.csv")
+    nome_csv = os.path.join("reports", f"relatorio_paralelo_{timestamp}{sufixo}.csv")
     
     with open(nome_csv, 'w', newline='', encoding='utf-8-sig') as f:
         writer = csv.writer(f, delimiter=';')
@@ -358,18 +991,129 @@ def salvar_relatorio_consolidado(resultados: Dict, arquivo_origem: str):
                 writer.writerow(["NAO_ENCONTRADO", c, worker_id])
             for c in dados.get('erros', []):
                 writer.writerow(["ERRO", c, worker_id])
+        
+        # Clientes descartados pelo monitor (derrubaram workers repetidamente)
+        for c in resultados.get('erros_monitor', []):
+            writer.writerow(["ERRO", c, "-"])
     
     return nome_csv
 
 
+def _verificar_leases(processos: Dict[int, Process], leases, fila_clientes, clientes,
+                      reenfileirados: Dict[int, int], progresso_queue, session_id) -> List[Dict]:
+    """
+    Devolve à fila os clientes presos com workers mortos ou travados.
+    
+    - Worker morto: o cliente volta para a fila (outro worker pega)
+    - Lease de um processo que já foi substituído (mesmo worker_id, outro pid):
+      tratado como worker morto, sem culpar o processo novo
+    - Lease vencido com worker vivo: worker considerado travado, é encerrado
+    - Cliente devolvido mais de MAX_REENFILEIRAMENTOS vezes: registrado como ERRO
+    
+    Returns:
+        Erros gerados aqui (clientes descartados), no formato do relatório
+    """
+    erros = []
+    agora = time.time()
+    for indice, (worker_id, pid, expira_em) in list(leases.items()):
+        p = processos.get(worker_id)
+        if p is not None and p.pid == pid and p.is_alive():
+            if agora < expira_em:
+                continue
+            logging.error(f"Worker {worker_id} travado há mais de {LEASE_CLIENTE_SEGUNDOS}s "
+                          f"no cliente #{indice + 1}. Encerrando o processo.")
+            p.terminate()
+            p.join(10)
+        
+        leases.pop(indice, None)
+        cliente_dict = clientes[indice]
+        termo_busca = cliente_dict.get('busca', 'Desconhecido')
+        reenfileirados[indice] = reenfileirados.get(indice, 0) + 1
+        
+        if reenfileirados[indice] > MAX_REENFILEIRAMENTOS:
+            logging.error(f"Cliente '{termo_busca}' derrubou {reenfileirados[indice]} workers. Marcando como ERRO.")
+            _registrar_progresso(progresso_queue, session_id, cliente_dict, "ERRO", worker_id)
+            erros.append({'cliente': termo_busca, 'erro': "FALHA_FATAL_WORKER"})
+        else:
+            logging.warning(f"Devolvendo '{termo_busca}' à fila (worker {worker_id} caiu)")
+            fila_clientes.put((indice, cliente_dict))
+    return erros
+
+
+def _iniciar_escritor(manager, config: Dict[str, Any], sufixo: str = ""):
+    """Cria a fila de progresso e o EscritorProgresso da campanha (já iniciado)."""
+    progresso_queue = manager.Queue()
+    os.makedirs("reports", exist_ok=True)
+    caminho_parcial = os.path.join(
+        "reports", f"relatorio_paralelo_{datetime.now().strftime('%Y%m%d_%H%M')}{sufixo}_parcial.csv"
+    )
+    escritor = EscritorProgresso(
+        progresso_queue, config.get('session_id'), caminho_parcial,
+        template=None if config.get('dry_run') else config.get('template_nome')
+    )
+    escritor.start()
+    logging.info(f"Relatório parcial em tempo real: {caminho_parcial}")
+    return progresso_queue, escritor, caminho_parcial
+
+
+def _tamanho_fila(fila) -> int:
+    try:
+        return fila.qsize()
+    except (NotImplementedError, EOFError, OSError):
+        return 0
+
+
+def _esvaziar_fila(fila) -> int:
+    """Descarta o que sobrou na fila de clientes. Retorna quantos eram."""
+    sobras = 0
+    try:
+        while True:
+            fila.get_nowait()
+            sobras += 1
+    except queue.Empty:
+        pass
+    return sobras
+
+
+def _repor_reservas(processos: Dict[int, Process], reservas, fila_ativacao, fila_clientes, leases,
+                    mortos_tratados: set, qtd_reservas: int, iniciar_worker) -> None:
+    """
+    Mantém o pool de reservas aquecidas:
+    - worker ativo que morreu de forma anormal (crash/terminate) -> ativa uma reserva
+    - reservas prontas/aquecendo abaixo de qtd_reservas -> abre outra em segundo plano
+    """
+    for worker_id, p in processos.items():
+        if p.is_alive() or worker_id in mortos_tratados:
+            continue
+        mortos_tratados.add(worker_id)
+        if p.exitcode not in (0, None) and reservas.get(worker_id) in (None, 'ativa'):
+            logging.warning(f"Worker {worker_id} caiu (exitcode {p.exitcode}); acionando reserva")
+            fila_ativacao.put(worker_id)
+    
+    ha_trabalho = not fila_clientes.empty() or len(leases) > 0
+    if not ha_trabalho or len(reservas) >= qtd_reservas + MAX_RESERVAS_INICIADAS:
+        return
+    aquecidas = sum(1 for worker_id, s in reservas.items()
+                    if s in ('aquecendo', 'pronta') and processos[worker_id].is_alive())
+    for _ in range(qtd_reservas - aquecidas):
+        novo_id = max(processos) + 1
+        logging.info(f"Repondo reserva aquecida (worker {novo_id})")
+        iniciar_worker(novo_id, reserva=True)
+
+
 def executar_paralelo(
-    clientes: List[Dict],
+    clientes: List[Cliente],
     config: Dict[str, Any],
     num_workers: Optional[int] = None
 ) -> Dict:
     """
     Orquestra a execução paralela.
     
+    Os clientes ficam numa fila compartilhada: cada worker puxa o próximo
+    assim que termina o anterior (um worker lento não segura os outros).
+    Cada cliente em processamento tem um lease; se o worker morrer ou travar,
+    o cliente volta para a fila.
+    
     Args:
         clientes: Lista completa de clientes
         config: Configurações (template, departamento, etc)
@@ -384,51 +1128,327 @@ def executar_paralelo(
     if num_workers is None:
         num_workers = calcular_workers_ideais(total)
     
-    logging.info(f"Iniciando execução paralela: {total} clientes / {num_workers} workers")
-    
-    # Divide lista em blocos
-    blocos = dividir_lista_em_blocos(clientes, num_workers)
-    
-    # Mostra distribuição
-    for i, bloco in enumerate(blocos):
-        logging.info(f"  Worker {i+1}: {len(bloco)} clientes")
+    abas = _abas_por_worker(config)
+    logging.info(f"Iniciando execução paralela: {total} clientes / {num_workers} workers"
+                 + (f" x {abas} abas ({num_workers * abas} workers lógicos)" if abas > 1 else ""))
     
     # Manager para comunicação entre processos
     with Manager() as manager:
         resultado_queue = manager.Queue()
-        login_sync_queue = manager.Queue()
-        login_sync_queue.put(0)  # Inicializa com 0 (nenhum worker logado)
+        login_sync = SessaoCompartilhada(manager)  # Recebe o estado da sessão do worker 1
+        
+        # Reservas aquecidas (substituem na hora um worker com driver quebrado)
+        qtd_reservas = config.get('reservas_aquecidas', RESERVAS_AQUECIDAS)
+        reservas = manager.dict() if qtd_reservas > 0 else None
+        fila_ativacao = manager.Queue() if qtd_reservas > 0 else None
+        
+        # Fila compartilhada de clientes + leases dos que estão em processamento
+        # Cada cliente viaja uma vez, dentro da fila, para o worker que o pegar
+        # (os workers não recebem a lista inteira)
+        fila_clientes = manager.Queue()
+        for item in enumerate(clientes):
+            fila_clientes.put(item)
+        leases = manager.dict()
+        reenfileirados = {}
+        
+        # Ritmo de envios da frota inteira
+        limitador = LimitadorEnvios(config.get('envios_por_minuto', ENVIOS_POR_MINUTO), ENVIOS_RAJADA)
+        controlador = ControladorAIMD(limitador) if config.get('ritmo_adaptativo', True) else None
+        logging.info(f"Limite de envios: {limitador.envios_por_minuto:.0f}/min (rajada {ENVIOS_RAJADA}, "
+                     f"{'adaptativo' if controlador else 'fixo'})")
+        erros_monitor = []
+        
+        # Escritor único de progresso (sessão + relatório parcial)
+        progresso_queue, escritor, caminho_parcial = _iniciar_escritor(manager, config)
         
         processos = []
+        por_worker = {}
         
-        # Inicia workers
-        for i, bloco in enumerate(blocos):
+        def iniciar_worker(worker_id: int, reserva: bool = False):
+            if reserva:
+                reservas[worker_id] = 'aquecendo'
             p = Process(
                 target=worker_process,
-                args=(i + 1, bloco, config, resultado_queue, login_sync_queue)
+                args=(worker_id, None, config, resultado_queue, login_sync, progresso_queue,
+                      fila_clientes, leases, limitador, controlador, reservas, fila_ativacao)
             )
             processos.append(p)
-            
-            # Worker 1 inicia primeiro e faz login
-            if i == 0:
-                p.start()
-                # Aguarda um pouco para o primeiro login começar
-                time.sleep(3)
-            else:
-                # Outros workers iniciam com pequeno delay
-                time.sleep(1)
-                p.start()
+            por_worker[worker_id] = p
+            p.start()
+        
+        # Todos abrem o navegador juntos: só o worker 1 passa pelo login/OTP
+        for i in range(num_workers):
+            iniciar_worker(i + 1)
+        for i in range(qtd_reservas):
+            iniciar_worker(num_workers + i + 1, reserva=True)
+        if qtd_reservas:
+            logging.info(f"{qtd_reservas} reserva(s) aquecida(s) para substituir workers com falha")
+        
+        # Aguarda todos finalizarem, devolvendo à fila o que ficar com workers caídos
+        mortos_tratados = set()
+        while any(p.is_alive() for p in processos):
+            for p in list(processos):
+                p.join(MONITOR_INTERVALO_SEGUNDOS / len(processos))
+            erros_monitor += _verificar_leases(por_worker, leases, fila_clientes, clientes,
+                                               reenfileirados, progresso_queue, config.get('session_id'))
+            if reservas is not None:
+                _repor_reservas(por_worker, reservas, fila_ativacao, fila_clientes, leases,
+                                mortos_tratados, qtd_reservas, iniciar_worker)
+        erros_monitor += _verificar_leases(por_worker, leases, fila_clientes, clientes,
+                                           reenfileirados, progresso_queue, config.get('session_id'))
         
-        # Aguarda todos finalizarem
-        for p in processos:
-            p.join()
+        # Sobras: todos os workers caíram antes de esvaziar a fila (ficam pendentes na sessão)
+        nao_processados = _esvaziar_fila(fila_clientes)
+        if nao_processados:
+            logging.error(f"{nao_processados} clientes não foram processados (todos os workers caíram). "
+                          f"Use --resume para continuar.")
         
-        # Consolida resultados
-        resultados = consolidar_resultados(resultado_queue, num_workers)
+        # Último flush do progresso antes de derrubar o Manager
+        escritor.parar()
+        
+        # Consolida resultados (todos já terminaram: não há o que esperar)
+        ativadas = sum(1 for s in reservas.values() if s == 'ativa') if reservas is not None else 0
+        resultados = consolidar_resultados(resultado_queue, num_workers + ativadas, timeout_por_worker=5)
+        resultados['erros'].extend(erros_monitor)
+        resultados['erros_monitor'] = erros_monitor
+        resultados['nao_processados'] = nao_processados
+        resultados['relatorio_parcial'] = caminho_parcial
     
     return resultados
 
 
+class Frota:
+    """
+    Frota persistente de workers logados, usada pelo modo serviço (main_daemon.py).
+    
+    Ao contrário de executar_paralelo, processos e navegadores sobrevivem entre
+    campanhas: cada campanha vira uma tarefa para os workers, que reaproveitam
+    login e departamento. Worker que cai é reaberto e entra pela sessão
+    compartilhada (ou pelo perfil persistente).
+    
+    A Frota lembra o departamento de cada navegador para agrupar campanhas
+    por departamento (executar_campanhas / planejar_departamentos).
+    """
+    
+    def __init__(self, num_workers: int = 4, config: Optional[Dict[str, Any]] = None):
+        self.num_workers = num_workers
+        self.config = config or {}
+        self.manager = None
+        self.processos: Dict[int, Process] = {}
+        self.filas = {}
+        self.departamentos: Dict[int, Optional[str]] = {}  # Departamento atual de cada navegador
+    
+    def iniciar(self):
+        """Sobe o Manager e abre todos os navegadores (só o worker 1 faz login/OTP)."""
+        self.manager = Manager()
+        self.login_sync = SessaoCompartilhada(self.manager)
+        self.limitador = LimitadorEnvios(self.config.get('envios_por_minuto', ENVIOS_POR_MINUTO), ENVIOS_RAJADA)
+        self.controlador = ControladorAIMD(self.limitador) if self.config.get('ritmo_adaptativo', True) else None
+        for worker_id in range(1, self.num_workers + 1):
+            self._iniciar_worker(worker_id)
+        logging.info(f"Frota iniciada com {self.num_workers} workers")
+    
+    def _iniciar_worker(self, worker_id: int) -> None:
+        fila = self.manager.Queue()
+        p = Process(
+            target=worker_frota,
+            args=(worker_id, fila, self.login_sync, self.limitador, self.controlador,
+                  self.config.get('perfil_por_worker', True))
+        )
+        p.start()
+        self.filas[worker_id] = fila
+        self.processos[worker_id] = p
+    
+    def executar_campanha(self, clientes: List[Cliente], config: Dict[str, Any],
+                          num_workers: Optional[int] = None) -> Dict:
+        """
+        Processa uma campanha com a frota já aberta (mesma fila compartilhada,
+        leases e escritor de progresso de executar_paralelo).
+        
+        Args:
+            clientes: Clientes pendentes da campanha
+            config: Configurações (template, departamento, session_id, etc)
+            num_workers: Quantos workers da frota usar (None = todos)
+        
+        Returns:
+            Dicionário com resultados consolidados (formato de executar_paralelo)
+        """
+        return self.executar_campanhas([(clientes, config)], num_workers)[0]
+    
+    def executar_campanhas(self, campanhas: List[tuple], num_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Processa várias campanhas de uma vez, agrupadas por departamento.
+        
+        planejar_departamentos decide quais workers atendem cada departamento
+        (preferindo quem já está nele); cada worker recebe, em ordem, todas as
+        campanhas dos seus departamentos, então só troca de departamento entre
+        grupos. Campanhas do mesmo departamento dividem os mesmos workers.
+        
+        Args:
+            campanhas: Lista de (clientes, config)
+            num_workers: Quantos workers da frota usar (None = todos)
+        
+        Returns:
+            Resultados consolidados de cada campanha, na ordem recebida
+        """
+        ids = sorted(self.processos)[:num_workers or None]
+        for worker_id in ids:
+            if not self.processos[worker_id].is_alive():
+                logging.warning(f"Worker {worker_id} da frota estava parado, reabrindo...")
+                self._reabrir_worker(worker_id)
+        
+        carga = {}
+        for clientes, config in campanhas:
+            dept = config.get('departamento')
+            carga[dept] = carga.get(dept, 0) + len(clientes)
+        plano = planejar_departamentos(carga, ids, self.departamentos)
+        for worker_id in ids:
+            if plano[worker_id]:
+                logging.info(f"Worker {worker_id}: {' -> '.join(plano[worker_id])} "
+                             f"(atual: {self.departamentos.get(worker_id) or '-'})")
+        
+        # O limitador é da frota inteira: a taxa base (e o que o AIMD aprendeu) só
+        # muda se algum job pediu uma taxa própria; no lote vale a mais conservadora
+        taxas = [config['envios_por_minuto'] for _, config in campanhas
+                 if config.get('envios_por_minuto') is not None]
+        if taxas:
+            logging.info(f"Ritmo pedido pelo lote: {min(taxas):.0f} envios/min")
+            self.limitador.ajustar_taxa(min(taxas))
+        
+        sufixos = len(campanhas) > 1
+        execucoes = [self._preparar_execucao(clientes, config, f"_{i + 1}" if sufixos else "")
+                     for i, (clientes, config) in enumerate(campanhas)]
+        
+        # Cada worker recebe as campanhas dos seus departamentos, agrupadas
+        for worker_id in ids:
+            for dept in plano[worker_id]:
+                for ex in execucoes:
+                    if ex['tarefa']['config'].get('departamento') == dept:
+                        self.filas[worker_id].put(ex['tarefa'])
+                        ex['pendentes'][worker_id] = self.processos[worker_id].pid
+            if plano[worker_id]:
+                self.departamentos[worker_id] = plano[worker_id][-1]
+        
+        while any(ex['pendentes'] for ex in execucoes):
+            for ex in execucoes:
+                if ex['pendentes']:
+                    self._acompanhar_execucao(ex)
+            
+            # Worker caído: reabre e devolve as campanhas que ele ainda devia
+            for worker_id in ids:
+                p = self.processos[worker_id]
+                devidas = [ex for ex in execucoes if ex['pendentes'].get(worker_id) == p.pid]
+                if p.is_alive() or not devidas:
+                    continue
+                logging.warning(f"Worker {worker_id} da frota caiu (exitcode {p.exitcode}), reabrindo...")
+                # Clientes em mãos do processo morto voltam à fila antes do novo assumir o worker_id
+                for ex in execucoes:
+                    self._acompanhar_execucao(ex)
+                self._reabrir_worker(worker_id)
+                for ex in devidas:
+                    if ex['fila_clientes'].empty() and len(ex['leases']) == 0:
+                        del ex['pendentes'][worker_id]
+                    else:
+                        self.filas[worker_id].put(ex['tarefa'])
+                        ex['pendentes'][worker_id] = self.processos[worker_id].pid
+                        self.departamentos[worker_id] = ex['tarefa']['config'].get('departamento')
+            
+            time.sleep(1)
+        
+        return [self._finalizar_execucao(ex) for ex in execucoes]
+    
+    def _reabrir_worker(self, worker_id: int) -> None:
+        self.departamentos[worker_id] = None
+        self._iniciar_worker(worker_id)
+    
+    def _preparar_execucao(self, clientes: List[Cliente], config: Dict[str, Any], sufixo: str) -> Dict:
+        """Fila, leases, escritor e tarefa de uma campanha."""
+        logging.info(f"Campanha na frota: {len(clientes)} clientes "
+                     f"({config.get('template_nome')} | {config.get('departamento')})")
+
+        
+        fila_clientes = self.manager.Queue()
+        for item in enumerate(clientes):
+            fila_clientes.put(item)
+        leases = self.manager.dict()
+        resultado_queue = self.manager.Queue()
+        progresso_queue, escritor, caminho_parcial = _iniciar_escritor(self.manager, config, sufixo)
+        
+        return {
+            'tarefa': {
+                'config': config,
+                'fila_clientes': fila_clientes,
+                'leases': leases,
+                'progresso_queue': progresso_queue,
+                'resultado_queue': resultado_queue,
+            },
+            'clientes': clientes,
+            'fila_clientes': fila_clientes,
+            'leases': leases,
+            'resultado_queue': resultado_queue,
+            'progresso_queue': progresso_queue,
+            'escritor': escritor,
+            'caminho_parcial': caminho_parcial,
+            'reenfileirados': {},
+            'erros_monitor': [],
+            # worker_id -> pid do processo que ainda deve o relatório desta campanha
+            'pendentes': {},
+            'resultados': _resultados_vazios(),
+        }
+    
+    def _acompanhar_execucao(self, ex: Dict) -> None:
+        """Recolhe relatórios já entregues e devolve à fila clientes de workers caídos."""
+        while True:
+            try:
+                resultado_worker = ex['resultado_queue'].get_nowait()
+            except queue.Empty:
+                break
+            worker_id = _acumular_resultado(ex['resultados'], resultado_worker)
+            if ex['pendentes'].get(worker_id) == resultado_worker.get('pid'):
+                del ex['pendentes'][worker_id]
+                # Departamento em que o navegador ficou (None se a troca falhou)
+                if 'departamento' in resultado_worker:
+                    self.departamentos[worker_id] = resultado_worker['departamento']
+        
+        ex['erros_monitor'] += _verificar_leases(
+            self.processos, ex['leases'], ex['fila_clientes'], ex['clientes'], ex['reenfileirados'],
+            ex['progresso_queue'], ex['tarefa']['config'].get('session_id')
+        )
+    
+    def _finalizar_execucao(self, ex: Dict) -> Dict:
+        self._acompanhar_execucao(ex)
+        nao_processados = _esvaziar_fila(ex['fila_clientes'])
+        if nao_processados:
+            logging.error(f"{nao_processados} clientes não foram processados nesta campanha "
+                          f"(ficam pendentes na sessão).")
+        ex['escritor'].parar()
+        
+        resultados = ex['resultados']
+        resultados['erros'].extend(ex['erros_monitor'])
+        resultados['erros_monitor'] = ex['erros_monitor']
+        resultados['nao_processados'] = nao_processados
+        resultados['relatorio_parcial'] = ex['caminho_parcial']
+        return resultados
+    
+    def encerrar(self, timeout: float = 30) -> None:
+        """Fecha os navegadores e o Manager."""
+        if self.manager is None:
+            return
+        for worker_id, p in self.processos.items():
+            if p.is_alive():
+                try:
+                    self.filas[worker_id].put(None)
+                except Exception:
+                    pass
+        for p in self.processos.values():
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self.manager.shutdown()
+        self.manager = None
+        logging.info("Frota encerrada")
+
+
 def imprimir_resumo_paralelo(resultados: Dict, arquivo: str, inicio: datetime):
     """
     Imprime resumo final da execução paralela.
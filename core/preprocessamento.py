@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Pré-processamento da lista de clientes - AutoZoho
+
+Calcula uma única vez, para a lista inteira, o que a busca usaria por cliente
+dentro do loop do navegador:
+- nome normalizado (normalizar_nome)
+- classificação PF/PJ
+- variações de busca (variacoes_para_cliente)
+- telefone normalizado (+55DD9XXXXXXXX)
+
+O resultado fica em cache/preprocessado_<hash do arquivo>.json.gz: rodar de
+novo a mesma planilha só lê o cache. No modo sessão por campanha o arquivo
+não é hasheado: o cache é o da lista (caminho) e cada linha é chaveada pelo
+seu fingerprint, então só as linhas novas/alteradas são recalculadas.
+A busca usa os campos prontos do Cliente e só recalcula quando eles não existem.
+"""
+import os
+import time
+import gzip
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+from core.search import normalizar_nome, classificar_pf_ou_pj, variacoes_para_cliente
+from utils.session import gerar_hash_arquivo, gerar_fingerprint_cliente, caminho_lista_normalizado
+from utils.telefone import normalizar_numero
+
+CACHE_DIR = Path(__file__).parent.parent / "cache"
+
+# Incrementar quando mudar a lógica de normalização/variações (invalida caches antigos)
+PREPROCESSAMENTO_VERSAO = 1
+
+# Caches de outras planilhas: apaga os sem uso há mais de N dias e, além
+# disso, mantém só os K usados mais recentemente
+CACHE_MAX_DIAS = 30
+CACHE_MAX_ARQUIVOS = 50
+
+
+def get_cache_path(hash_arquivo: str) -> Path:
+    """Retorna o caminho do cache de pré-processamento de um arquivo."""
+    return CACHE_DIR / f"preprocessado_{hash_arquivo}.json.gz"
+
+
+def get_cache_path_lista(caminho_arquivo: str) -> Path:
+    """Cache por lista (caminho do arquivo), usado no modo por fingerprint."""
+    chave = hashlib.md5(caminho_lista_normalizado(caminho_arquivo).encode("utf-8")).hexdigest()[:12]
+    return CACHE_DIR / f"preprocessado_lista_{chave}.json.gz"
+
+
+def preprocessar_cliente(cliente) -> list:
+    """
+    Calcula os campos derivados de um cliente.
+
+    Returns:
+        [nome_norm, tipo_pessoa, variacoes, telefone_norm]
+    """
+    busca = cliente.get('busca', '')
+    nome_norm = normalizar_nome(busca, remover_invalidos=True)
+    return [
+        nome_norm,
+        classificar_pf_ou_pj(nome_norm),
+        variacoes_para_cliente(busca, cliente.get('tipo_busca', 'auto')),
+        normalizar_numero(cliente.get('telefone_excel')),
+    ]
+
+
+def _carregar_cache(path: Path) -> dict:
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            dados = json.load(f)
+        if dados.get("versao") == PREPROCESSAMENTO_VERSAO:
+            return dados.get("clientes", {})
+        logging.info("Cache de pré-processamento de versão antiga, recalculando")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Cache de pré-processamento ilegível ({path.name}): {e}")
+    return {}
+
+
+def _podar_caches(atual: Path) -> None:
+    """Remove caches de pré-processamento velhos (o mtime marca o último uso)."""
+    try:
+        caches = []
+        for p in CACHE_DIR.glob("preprocessado_*.json.gz"):
+            if p != atual:
+                caches.append((p.stat().st_mtime, p))
+    except OSError as e:
+        logging.debug(f"Não foi possível listar caches de pré-processamento: {e}")
+        return
+    caches.sort(reverse=True)
+    limite = time.time() - CACHE_MAX_DIAS * 86400
+    removidos = 0
+    for i, (mtime, p) in enumerate(caches):
+        if mtime >= limite and i < CACHE_MAX_ARQUIVOS - 1:
+            continue
+        try:
+            p.unlink()
+            removidos += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.debug(f"Não foi possível remover {p.name}: {e}")
+    if removidos:
+        logging.info(f"{removidos} caches de pré-processamento antigos removidos")
+
+
+def _salvar_cache(path: Path, clientes: dict) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({"versao": PREPROCESSAMENTO_VERSAO, "clientes": clientes},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.warning(f"Erro ao salvar cache de pré-processamento: {e}")
+        try:
+            tmp_path.unlink()
+        except Exception:
+            pass
+        return
+    _podar_caches(path)
+
+
+def preprocessar_clientes(clientes: list, caminho_arquivo: str, hash_arquivo: str = None,
+                          por_fingerprint: bool = False) -> list:
+    """
+    Preenche nome_norm, tipo_pessoa, variacoes e telefone_norm de cada cliente,
+    reaproveitando o cache do arquivo quando existir.
+
+    Args:
+        clientes: Lista de Cliente (alterada no lugar)
+        caminho_arquivo: Planilha de origem
+        hash_arquivo: Hash já calculado do arquivo (opcional)
+        por_fingerprint: Cache da lista chaveado por linha, sem hashear o
+                         arquivo (modo sessão por campanha)
+
+    Returns:
+        A própria lista
+    """
+    if not clientes:
+        return clientes
+
+    if por_fingerprint:
+        path = get_cache_path_lista(caminho_arquivo)
+        chave = gerar_fingerprint_cliente
+    else:
+        path = get_cache_path(hash_arquivo or gerar_hash_arquivo(caminho_arquivo))
+        chave = lambda c: c['busca']  # noqa: E731
+    cache = _carregar_cache(path)
+
+    calculados = 0
+    usados = {}
+    for c in clientes:
+        k = chave(c)
+        campos = cache.get(k)
+        if campos is None:
+            campos = preprocessar_cliente(c)
+            calculados += 1
+        usados[k] = campos
+        c['nome_norm'], c['tipo_pessoa'], variacoes, c['telefone_norm'] = campos
+        c['variacoes'] = tuple(variacoes)
+
+    # No cache da lista ficam só as linhas atuais (ele não cresce a cada edição)
+    podar = por_fingerprint and len(usados) != len(cache)
+    if calculados or podar:
+        _salvar_cache(path, usados if por_fingerprint else {**cache, **usados})
+    if calculados:
+        logging.info(f"Pré-processamento: {calculados} clientes calculados, "
+                     f"{len(clientes) - calculados} do cache ({path.name})")
+    else:
+        logging.info(f"Pré-processamento carregado do cache ({path.name})")
+        # Marca o uso: a poda remove pelos mais antigos
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    return clientes
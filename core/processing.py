@@ -25,6 +25,32 @@ from utils.telefone import (
     validar_telefone_whatsapp
 )
 from utils.screenshots import take_screenshot
+from core.search import ESTATISTICAS_ULTIMA_BUSCA
+
+# Sinais de saúde do Zoho no último envio (lidos pelo controle de ritmo)
+ESTATISTICAS_ULTIMO_ENVIO = {"falhas_modal": 0}
+
+
+def registrar_saude_zoho(controlador, houve_busca=False, houve_envio=False,
+                         falha_driver=False, logger=logging):
+    """
+    Informa ao ControladorAIMD como foi o último cliente: tempo médio até os
+    resultados de cada variação digitada e sinais de degradação (timeouts da
+    busca, modal que não abriu, erro de driver/conexão).
+
+    A duração total de buscar_e_abrir_cliente não entra: cliente não encontrado
+    ou achado numa variação tardia demora mais sem o Zoho estar lento.
+    """
+    if controlador is None:
+        return
+    falhas = 1 if falha_driver else 0
+    latencia = None
+    if houve_busca:
+        latencia = ESTATISTICAS_ULTIMA_BUSCA["latencia_resultados"]
+        falhas += ESTATISTICAS_ULTIMA_BUSCA["instabilidade"]
+    if houve_envio:
+        falhas += ESTATISTICAS_ULTIMO_ENVIO["falhas_modal"]
+    controlador.registrar(latencia, falhas, logger)
 
 
 def fechar_modal_robusto(driver, nome_cliente="", tentativas=3):
@@ -165,6 +191,7 @@ def processar_pagina_cliente(driver, nome_cliente, departamento, template_nome,
     """
     logging.info(f"--- Processando: {nome_cliente} ---")
     wait = WebDriverWait(driver, 10)
+    ESTATISTICAS_ULTIMO_ENVIO["falhas_modal"] = 0
     
     # -----------------------------------------------------------
     # ETAPA 1: VERIFICAÇÃO E CORREÇÃO PRÉVIA (Auto-Healing)
@@ -258,6 +285,7 @@ def processar_pagina_cliente(driver, nome_cliente, departamento, template_nome,
         # A. Abrir Modal
         if not abrir_modal_whatsapp(driver, nome_cliente, dry_run):
             logging.error(f"[{nome_cliente}] Falha ao abrir modal.")
+            ESTATISTICAS_ULTIMO_ENVIO["falhas_modal"] += 1
             fechar_modal_robusto(driver, nome_cliente)
             continue
 
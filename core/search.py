@@ -9,8 +9,6 @@ import time
 import re
 import logging
 import unicodedata
-import json
-import os
 from difflib import SequenceMatcher
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -21,6 +19,10 @@ from selenium.common.exceptions import (
 )
 
 from core.messaging import clicar_seguro, fechar_ui_flutuante
+from utils.diretorio_contatos import consultar_diretorio, remover_contato
+from utils.telefone import normalizar_numero
+from utils.cache_json import CacheArquivoJSON
+from config.constants import STOPWORDS_NOME
 
 # --- CONSTANTES DO SCRIPT V3.1 ---
 
@@ -31,11 +33,6 @@ SELETORES = {
     "botao_whatsapp": 'span[data-title="Enviar mensagens via WhatsApp (canal de IM)"]'
 }
 
-STOPWORDS_NOME = {
-    "de","da","do","das","dos","e","d","jr","jr.","junior","júnior","filho","neto","sobrinho",
-    "me","epp","s/a","sa","s.a","s.a.","ltda","ltda.","holding","group","grupogera"
-}
-
 SOBRENOMES_COMUNS_IGNORAR = {
     "silva", "santos", "souza", "oliveira", "pereira", "lima", "ferreira",
     "costa", "rodrigues", "almeida", "nascimento", "gomes", "martins",
@@ -64,33 +61,147 @@ DELAY_DIGITACAO_CURTA = 0.02
 DELAY_DIGITACAO_MEDIA = 0.03
 DELAY_DIGITACAO_LONGA = 0.04
 
+# Sinais de saúde do Zoho na última busca (lidos pelo controle de ritmo)
+ESTATISTICAS_ULTIMA_BUSCA = {"instabilidade": 0, "latencia_resultados": None}
+
 # --- SISTEMA DE CACHE DE DECISÕES (APRENDIZADO) ---
+# Cada abertura com sucesso guarda a URL/ID do contato e os telefones da página:
+# no próximo encontro o cliente abre direto pela URL, sem pesquisar
 MAPEAMENTOS_JSON = 'mapeamentos_decisoes.json'
+CACHE_CONTATOS_TTL_DIAS = 30      # URL aprendida mais velha que isso é revalidada pela busca
+CACHE_CONTATOS_MAX_ITENS = 5000   # Acima disso saem os menos usados recentemente (LRU)
 
-def _carregar_cache_decisoes():
-    try:
-        if os.path.exists(MAPEAMENTOS_JSON):
-            with open(MAPEAMENTOS_JSON, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return {}
+# Lido uma vez por processo; gravações saem em segundo plano (merge entre workers)
+_cache_decisoes = CacheArquivoJSON(MAPEAMENTOS_JSON, max_itens=CACHE_CONTATOS_MAX_ITENS, campo_lru="usado_em")
 
-def _salvar_cache_decisoes(cache: dict):
-    try:
-        with open(MAPEAMENTOS_JSON, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logging.warning(f"Falha ao salvar cache de decisões: {e}")
+# --- CACHE NEGATIVO (CLIENTES NÃO ENCONTRADOS) ---
+# Cliente que terminou sem match, com o Zoho estável, fica registrado com as
+# variações tentadas: dentro do TTL a próxima campanha faz só uma sondagem
+# barata (primeira variação) ou pula o cliente, em vez de todas as variações
+NAO_ENCONTRADOS_JSON = 'nao_encontrados.json'
+NAO_ENCONTRADO_TTL_DIAS = 7       # Depois disso o cliente volta a ter a busca completa (0 = desativa)
+NAO_ENCONTRADO_MODO = "sondar"    # "sondar" = só a primeira variação | "pular" = nem pesquisa
+
+_cache_nao_encontrados = CacheArquivoJSON(NAO_ENCONTRADOS_JSON, max_itens=CACHE_CONTATOS_MAX_ITENS,
+                                          campo_lru="registrado_em")
+
+def _carregar_cache_decisoes():
+    return _cache_decisoes
+
+def descarregar_cache_decisoes():
+    """Grava agora o que foi aprendido e para a gravação em segundo plano (chamar ao fim de cada worker)."""
+    _cache_decisoes.encerrar()
+    _cache_nao_encontrados.encerrar()
+
+def configurar_nao_encontrados(ttl_dias: int = None, modo: str = None):
+    """Ajusta o cache negativo do processo (valores None mantêm o padrão)."""
+    global NAO_ENCONTRADO_TTL_DIAS, NAO_ENCONTRADO_MODO
+    if ttl_dias is not None:
+        NAO_ENCONTRADO_TTL_DIAS = max(0, int(ttl_dias))
+    if modo in ("sondar", "pular"):
+        NAO_ENCONTRADO_MODO = modo
+
+def consultar_nao_encontrado(entrada_norm: str, ttl_dias: int = None):
+    """
+    Registro do cliente no cache negativo, se ainda dentro do TTL
+    (ttl_dias=None usa NAO_ENCONTRADO_TTL_DIAS).
+    
+    Returns:
+        Dict com busca, variacoes, candidatos, registrado_em, tentativas e
+        sondagens, ou None
+    """
+    ttl_dias = NAO_ENCONTRADO_TTL_DIAS if ttl_dias is None else ttl_dias
+    if not entrada_norm or ttl_dias <= 0:
+        return None
+    item = _cache_nao_encontrados.get(entrada_norm)
+    if not item or time.time() - item.get("registrado_em", 0) > ttl_dias * 86400:
+        return None
+    return item
+
+def listar_nao_encontrados(clientes, ttl_dias: int = None) -> list:
+    """Clientes da lista com registro válido no cache negativo: [(cliente, registro)]."""
+    encontrados = []
+    for c in clientes:
+        entrada_norm = c.get('nome_norm') or normalizar_nome(c.get('busca', ''), remover_invalidos=True)
+        item = consultar_nao_encontrado(entrada_norm, ttl_dias)
+        if item:
+            encontrados.append((c, item))
+    return encontrados
+
+def _registrar_nao_encontrado(entrada_norm: str, busca: str, variacoes: list, candidatos: list = None):
+    """Busca completa sem match: (re)inicia o TTL com as variações tentadas."""
+    if not entrada_norm:
+        return
+    anterior = _cache_nao_encontrados.get(entrada_norm) or {}
+    _cache_nao_encontrados.definir(entrada_norm, {
+        "busca": busca,
+        "variacoes": list(variacoes),
+        "candidatos": list(candidatos or [])[:3],
+        "registrado_em": time.time(),
+        "tentativas": int(anterior.get("tentativas", 0)) + 1,
+        "sondagens": 0
+    })
+
+def _registrar_sondagem_falha(entrada_norm: str):
+    """Sondagem sem match: conta, mas não renova o TTL (a busca completa volta quando ele vencer)."""
+    item = _cache_nao_encontrados.get(entrada_norm)
+    if item is not None:
+        _cache_nao_encontrados.definir(entrada_norm, dict(item, sondagens=int(item.get("sondagens", 0)) + 1))
 
 def _registrar_decisao_manual(entrada_norm: str, via: str, nome_exibicao: str):
-    cache = _carregar_cache_decisoes()
-    item = cache.get(entrada_norm, {"via": via, "nome_exibicao": nome_exibicao, "contagem": 0})
-    item["via"] = via
-    item["nome_exibicao"] = nome_exibicao
+    _registrar_contato_aprendido(entrada_norm, via, nome_exibicao)
+
+def _registrar_contato_aprendido(entrada_norm: str, via: str = None, nome_exibicao: str = None,
+                                 url: str = None, contato_id: str = None, telefones: list = None):
+    if not entrada_norm:
+        return
+    item = dict(_cache_decisoes.get(entrada_norm) or {"via": via, "nome_exibicao": nome_exibicao, "contagem": 0})
+    if via:
+        item["via"] = via
+    if nome_exibicao:
+        item["nome_exibicao"] = nome_exibicao
+    if url:
+        item["url"] = url
+        item["contato_id"] = contato_id
+        item["telefones"] = telefones or []
+        item["atualizado_em"] = time.time()
     item["contagem"] = int(item.get("contagem", 0)) + 1
-    cache[entrada_norm] = item
-    _salvar_cache_decisoes(cache)
+    item["usado_em"] = time.time()
+    _cache_decisoes.definir(entrada_norm, item)
+
+def _marcar_uso_contato_aprendido(entrada_norm: str):
+    item = _cache_decisoes.get(entrada_norm)
+    if item is not None:
+        _cache_decisoes.definir(entrada_norm, dict(item, usado_em=time.time()))
+
+def _invalidar_url_aprendida(entrada_norm: str):
+    item = dict(_cache_decisoes.get(entrada_norm) or {})
+    if item.pop("url", None):
+        for campo in ("contato_id", "telefones", "atualizado_em"):
+            item.pop(campo, None)
+        _cache_decisoes.definir(entrada_norm, item)
+
+def _url_aprendida_valida(item: dict) -> bool:
+    """URL aprendida dentro do TTL."""
+    if not item.get("url"):
+        return False
+    return time.time() - item.get("atualizado_em", 0) <= CACHE_CONTATOS_TTL_DIAS * 86400
+
+def _telefone_diverge(item: dict, telefone_cliente: str = None) -> bool:
+    """O contato aprendido tem telefones e nenhum é o do cliente na planilha (é outra pessoa)."""
+    telefones = item.get("telefones") or []
+    return bool(telefone_cliente and telefones and telefone_cliente not in telefones)
+
+# --- DIRETÓRIO LOCAL DE CONTATOS (utils/diretorio_contatos.py) ---
+# Abrir a página errada manda mensagem para a pessoa errada: match pelo nome
+# só com similaridade alta e sem empate com outro contato
+DIRETORIO_LIMIAR_FUZZY = 0.92
+DIRETORIO_MARGEM_EMPATE = 0.05
+
+# Resultado da consulta ao diretório feita por iniciar_busca, reaproveitado
+# (uma vez) por buscar_e_abrir_cliente do mesmo cliente
+_DIRETORIO_JA_CONSULTADO = {}
+_DIRETORIO_JA_CONSULTADO_MAX = 16
 
 # --- FUNÇÕES AUXILIARES DE TEXTO (IDÊNTICAS AO V3.1) ---
 
@@ -132,6 +243,52 @@ def classificar_pf_ou_pj(nome_norm: str) -> str:
     corporativos = [t for t in toks if t in EMPRESA_PALAVRAS_DESCARTAR]
     return "PJ" if len(corporativos) >= 2 else "PF"
 
+# --- GERAÇÃO DE VARIAÇÕES DE BUSCA ---
+
+def gerar_variacoes_inteligentes(nome_original):
+    variacoes = []
+    nome_limpo_empresa = _limpa_sufixos_empresa(nome_original)
+    toks = _tokens_nome(nome_limpo_empresa)
+    
+    if not toks:
+        saneado = _sanear_termo_busca(normalizar_nome(nome_limpo_empresa, remover_invalidos=True))
+        return [saneado] if saneado else []
+
+    if len(toks) >= 2: variacoes.append(f"{toks[0]} {toks[1]}")
+    if len(toks) >= 2: variacoes.append(f"{toks[0]} {toks[-1]}")
+    
+    ultimo = toks[-1]
+    if len(ultimo) >= 3 and ultimo not in SOBRENOMES_COMUNS_IGNORAR:
+        variacoes.append(ultimo)
+        
+    if len(toks) >= 3: variacoes.append(" ".join(toks))
+    if len(toks[0]) >= 3: variacoes.append(toks[0])
+    if len(toks) >= 3: variacoes.append(f"{toks[-2]} {toks[-1]}")
+
+    saneado = _sanear_termo_busca(normalizar_nome(nome_limpo_empresa, remover_invalidos=True))
+    if saneado: variacoes.append(saneado)
+    
+    if len(ultimo) >= 3 and ultimo in SOBRENOMES_COMUNS_IGNORAR:
+        variacoes.append(ultimo)
+
+    uniq = list(dict.fromkeys(variacoes))
+    return [u for u in (_sanear_termo_busca(u) for u in uniq) if u and len(u) >= 3][:10]
+
+def variacoes_para_cliente(busca: str, tipo_busca: str) -> list:
+    """Termos a tentar na busca global, na ordem, conforme o tipo de busca."""
+    if tipo_busca == 'uc':
+        # Para UCs (ex: 10/123456-7), usamos o valor EXATO e preservamos a barra
+        if not busca:
+            return []
+        # Estratégia Dupla: 1. Exato, 2. Apenas Números (caso Zoho tenha cadastro sujo)
+        variacoes = [busca]
+        numeros_apenas = re.sub(r"[^0-9]", "", busca)
+        if numeros_apenas != busca:
+            variacoes.append(numeros_apenas)
+        return variacoes
+    # Busca padrão (Nome, Email, etc) com variações inteligentes
+    return gerar_variacoes_inteligentes(busca)
+
 # --- LÓGICA DE SCORES E FUZZY (V3.1) ---
 
 def _token_nuclear_pj(tokens: list) -> set:
@@ -183,193 +340,349 @@ def calcular_score_composto(nome_resultado_norm, nome_busca_norm):
     if not nome_resultado_norm or not nome_busca_norm: return 0.0
     return SequenceMatcher(None, nome_resultado_norm, nome_busca_norm).ratio()
 
+# --- ABERTURA DIRETA PELO DIRETÓRIO LOCAL ---
+
+def _chave_diretorio(dados_cliente):
+    return tuple(dados_cliente.get(campo) for campo in
+                 ('busca', 'tipo_busca', 'nome_excel', 'email_excel', 'telefone_excel', 'uc_excel'))
+
+def _contato_do_diretorio(dados_cliente, guardar=False):
+    """
+    Contato do diretório local que é, sem ambiguidade, este cliente (ou None).
+    
+    guardar: deixa o resultado para a próxima chamada com o mesmo cliente
+    (pré-carregamento: iniciar_busca consulta, buscar_e_abrir_cliente usa).
+    """
+    chave = _chave_diretorio(dados_cliente)
+    if chave in _DIRETORIO_JA_CONSULTADO:
+        return _DIRETORIO_JA_CONSULTADO.pop(chave)
+    contato = _avaliar_candidatos_diretorio(dados_cliente)
+    if guardar:
+        _DIRETORIO_JA_CONSULTADO[chave] = contato
+        while len(_DIRETORIO_JA_CONSULTADO) > _DIRETORIO_JA_CONSULTADO_MAX:
+            del _DIRETORIO_JA_CONSULTADO[next(iter(_DIRETORIO_JA_CONSULTADO))]
+    return contato
+
+def _avaliar_candidatos_diretorio(dados_cliente):
+    candidatos = consultar_diretorio(dados_cliente)
+    if not candidatos:
+        return None
+    if candidatos[0]['via'] == 'chave':
+        # E-mail/telefone/UC iguais: só vale se apontar para um único contato
+        return candidatos[0] if len(candidatos) == 1 else None
+
+    nome_ref = dados_cliente.get('nome_excel') or dados_cliente.get('busca', '')
+    nome_ref_norm = normalizar_nome(nome_ref, remover_invalidos=True)
+    avaliados = []
+    for c in candidatos:
+        nome_c = normalizar_nome(c['nome'] or '', remover_invalidos=True)
+        ratio = 1.0 if nome_c == nome_ref_norm else calcular_fuzzy_score(nome_c, nome_ref_norm)['ratio']
+        avaliados.append((ratio, c))
+    avaliados.sort(key=lambda x: x[0], reverse=True)
+    
+    melhor, contato = avaliados[0]
+    segundo = avaliados[1][0] if len(avaliados) > 1 else 0.0
+    if melhor >= DIRETORIO_LIMIAR_FUZZY and melhor - segundo >= DIRETORIO_MARGEM_EMPATE:
+        return contato
+    return None
+
+def _url_contato(driver, contato):
+    """URL salva no diretório ou montada com o portal/departamento da página atual."""
+    if contato.get('url'):
+        return contato['url']
+    m = re.match(r"(https://desk\.zoho\.[^/]+/agent/[^/]+/[^/]+)/", driver.current_url or "")
+    return f"{m.group(1)}/contato/details/{contato['id']}" if m else None
+
+def _abrir_pagina_contato(driver, url) -> bool:
+    """Abre a página de um contato pela URL e espera o botão do WhatsApp."""
+    try:
+        driver.get(url)
+        WebDriverWait(driver, 20).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, SELETORES["botao_whatsapp"]))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+def _aprender_contato(driver, entrada_norm, via=None, nome_exibicao=None) -> bool:
+    """
+    Depois de abrir um cliente: guarda no cache de decisões a URL/ID do
+    contato e os telefones da página, e tira o cliente do cache negativo.
+    Sempre retorna True (o cliente já abriu).
+    """
+    if entrada_norm:
+        _cache_nao_encontrados.remover(entrada_norm)
+    try:
+        url = (driver.current_url or "").split('?')[0]
+        m = re.search(r"/details/(\d+)", url)
+        if not m:
+            _registrar_contato_aprendido(entrada_norm, via, nome_exibicao)
+            return True
+        telefones = driver.execute_script(
+            "return Array.from(document.querySelectorAll(\"a[href^='tel:']\"))"
+            ".map(a => (a.textContent || a.getAttribute('href').slice(4)).trim());"
+        ) or []
+        normalizados = list(dict.fromkeys(t for t in (normalizar_numero(x) for x in telefones) if t))
+        _registrar_contato_aprendido(entrada_norm, via, nome_exibicao, url, m.group(1), normalizados)
+    except Exception as e:
+        logging.debug(f"Não foi possível aprender o contato aberto: {e}")
+    return True
+
+def _abrir_contato_direto(driver, contato) -> bool:
+    """Abre a página do contato pela URL, sem passar pela pesquisa global."""
+    url = _url_contato(driver, contato)
+    if not url:
+        return False
+    logging.info(f"📇 Diretório local: abrindo '{contato['nome']}' direto ({contato['via']})")
+    if _abrir_pagina_contato(driver, url):
+        return True
+    # Zoho redireciona registros apagados/mesclados: a entrada não serve mais
+    if str(contato['id']) not in (driver.current_url or ""):
+        logging.warning(f"⚠️ Contato '{contato['nome']}' não existe mais no Zoho, removido do diretório")
+        remover_contato(contato['id'])
+    else:
+        logging.warning(f"⚠️ Página de '{contato['nome']}' não carregou, usando a pesquisa")
+    return False
+
 # --- FUNÇÃO PRINCIPAL DE BUSCA (V3.1) ---
 
-def buscar_e_abrir_cliente(driver, cliente_input):
+def _digitar_busca(driver, wait, short_wait, nome_busca) -> bool:
+    """Abre/limpa a barra de pesquisa, digita o termo e envia (ENTER), sem esperar resultados."""
+    # 1. Interação com Barra de Pesquisa
+    barra = None
+    for tentativa_barra in range(3):
+        try:
+            barra = short_wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, SELETORES["barra_pesquisa"])))
+            # Tenta clicar para verificar se está acessível
+            barra.click()
+            break
+        except Exception as e:
+            err_str = str(e).lower()
+            if "intercepted" in err_str or "not clickable" in err_str:
+                # Overlay está bloqueando - tenta fechar
+                logging.warning(f"⚠️ Overlay detectado bloqueando busca. Tentando fechar...")
+                fechar_ui_flutuante(driver)
+                time.sleep(0.5)
+                # Tenta remover overlays específicos do Zoho
+                try:
+                    overlays = driver.find_elements(By.XPATH, 
+                        "//div[contains(@class, 'lookupheadercommon-title')] | "
+                        "//div[contains(@class, 'zd_v2-lookup-box')] | "
+                        "//div[contains(@class, 'modal') and contains(@style, 'display: block')]"
+                    )
+                    for overlay in overlays:
+                        try:
+                            driver.execute_script("arguments[0].style.display='none';", overlay)
+                        except:
+                            pass
+                except:
+                    pass
+                continue
+            else:
+                # Outro tipo de erro - tenta abrir a barra via ícone
+                if not clicar_seguro(driver, wait, By.CSS_SELECTOR, SELETORES["icone_pesquisa"]): 
+                    break
+                try:
+                    barra = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, SELETORES["barra_pesquisa"])))
+                except:
+                    break
+    
+    if not barra:
+        logging.error(f"❌ Não foi possível acessar a barra de busca. Pulando '{nome_busca}'.")
+        return False
+    
+    # --- LIMPEZA NUCLEAR DE CAMPO ---
+    # Garante que o campo esteja realmente vazio antes de digitar
+    campo_limpo = False
+    for tentativa_limpar in range(3): # Tenta até 3 vezes limpar se falhar
+        try:
+            # Só clica se não for a primeira tentativa (já clicamos acima)
+            if tentativa_limpar > 0:
+                try:
+                    barra.click()
+                except:
+                    fechar_ui_flutuante(driver)
+                    time.sleep(0.3)
+                    barra.click()
+            time.sleep(0.1)
+            
+            # 1. JS Force Clear + Event Dispatch (Crucial para React/Zoho)
+            driver.execute_script("""
+                arguments[0].value = '';
+                arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
+                arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
+            """, barra)
+            
+            # 2. Teclado Físico (Redundância)
+            barra.send_keys(Keys.CONTROL, "a")
+            barra.send_keys(Keys.DELETE)
+            
+            # 3. Verificação
+            valor_atual = barra.get_attribute("value")
+            if not valor_atual:
+                campo_limpo = True
+                break
+            else:
+                logging.warning(f"⚠️ Campo de busca teimoso: '{valor_atual}'. Tentando limpar novamente...")
+                # Backspace agressivo se sobrar lixo
+                for _ in range(len(valor_atual) + 2):
+                    barra.send_keys(Keys.BACKSPACE)
+        except Exception as e_limpar:
+            logging.debug(f"Erro ao limpar campo (tentativa {tentativa_limpar+1}): {e_limpar}")
+            fechar_ui_flutuante(driver)
+            time.sleep(0.3)
+    
+    
+    if not campo_limpo:
+        logging.error("❌ Não foi possível limpar o campo de busca. Pulando variação.")
+        return False
+    # --------------------------------
+    
+    # Digitação
+    delay = DELAY_DIGITACAO_CURTA if len(nome_busca) <= 5 else DELAY_DIGITACAO_MEDIA
+    for char in nome_busca:
+        barra.send_keys(char)
+        time.sleep(delay)
+    
+    # Validação final antes do ENTER
+    if barra.get_attribute("value").strip() != nome_busca:
+        # Se o JS do site sobrescreveu, forçamos de novo
+        driver.execute_script("arguments[0].value = arguments[1];", barra, nome_busca)
+    
+    barra.send_keys(Keys.ENTER)
+    return True
+
+
+def iniciar_busca(driver, cliente_input):
+    """
+    Dispara a primeira busca de um cliente sem esperar os resultados
+    (pré-carregamento em outra aba; ver buscar_e_abrir_cliente(busca_iniciada=...)).
+    
+    Returns:
+        Termo digitado, ou None se não disparou (cliente com mapeamento aprendido,
+        no diretório local, pulado pelo cache negativo, ou falha)
+    """
+    try:
+        dados_cliente = cliente_input if not isinstance(cliente_input, str) else {'busca': cliente_input}
+        nome_cliente = dados_cliente.get('busca', '')
+        nome_norm = dados_cliente.get('nome_norm') or normalizar_nome(nome_cliente, remover_invalidos=True)
+        if nome_norm in _carregar_cache_decisoes() or _contato_do_diretorio(dados_cliente, guardar=True):
+            return None
+        if NAO_ENCONTRADO_MODO == "pular" and consultar_nao_encontrado(nome_norm):
+            return None
+        variacoes = dados_cliente.get('variacoes')
+        if variacoes is None:
+            variacoes = variacoes_para_cliente(nome_cliente, dados_cliente.get('tipo_busca', 'auto'))
+        if not variacoes:
+            return None
+        
+        fechar_ui_flutuante(driver)
+        time.sleep(0.3)
+        termo = variacoes[0]
+        if _digitar_busca(driver, WebDriverWait(driver, 15), WebDriverWait(driver, 5), termo):
+            return termo
+    except Exception as e:
+        logging.debug(f"Pré-carregamento da busca falhou: {e}")
+    return None
+
+
+def buscar_e_abrir_cliente(driver, cliente_input, busca_iniciada=None):
     """
     Lógica de busca idêntica ao V3.1: Coleta resultados, tenta match automático e fallback manual.
+    
+    busca_iniciada: termo já digitado nesta aba por iniciar_busca (os resultados
+    dele são aproveitados em vez de digitar de novo).
     """
-    # Suporta string ou dict (compatibilidade)
-    nome_cliente = cliente_input.get('busca', cliente_input) if isinstance(cliente_input, dict) else cliente_input
+    # Suporta string, dict ou Cliente (compatibilidade)
+    nome_cliente = cliente_input.get('busca', cliente_input) if not isinstance(cliente_input, str) else cliente_input
+    dados_cliente = cliente_input if not isinstance(cliente_input, str) else {}
     
     wait = WebDriverWait(driver, 15)
     short_wait = WebDriverWait(driver, 5)
     
     instabilidade_zoho = 0
+    ESTATISTICAS_ULTIMA_BUSCA["instabilidade"] = 0
+    ESTATISTICAS_ULTIMA_BUSCA["latencia_resultados"] = None
+    latencias = []
     
     # CRÍTICO: Limpar UI antes de começar qualquer busca
     # Isso fecha modais/overlays que podem ter ficado abertos de erros anteriores
-    fechar_ui_flutuante(driver)
-    time.sleep(0.3)
+    # (com busca pré-carregada a limpeza já foi feita antes de digitar)
+    if not busca_iniciada:
+        fechar_ui_flutuante(driver)
+        time.sleep(0.3)
 
     def calcular_timeout_adaptativo(base):
         return base * 2 if instabilidade_zoho >= 3 else base
 
     # Verifica Cache
-    nome_original_norm = normalizar_nome(nome_cliente, remover_invalidos=True)
+    nome_original_norm = dados_cliente.get('nome_norm') or normalizar_nome(nome_cliente, remover_invalidos=True)
     cache = _carregar_cache_decisoes()
     if nome_original_norm in cache:
         m = cache[nome_original_norm]
-        logging.info(f"💾 Usando mapeamento aprendido: '{m['nome_exibicao']}'")
-        if _executar_busca_e_clicar(driver, wait, m['via'], m['nome_exibicao']):
-            return True
-
-    # Geração de Variações
-    def gerar_variacoes_inteligentes(nome_original):
-        variacoes = []
-        nome_limpo_empresa = _limpa_sufixos_empresa(nome_original)
-        toks = _tokens_nome(nome_limpo_empresa)
-        
-        if not toks:
-            saneado = _sanear_termo_busca(normalizar_nome(nome_limpo_empresa, remover_invalidos=True))
-            return [saneado] if saneado else []
-
-        if len(toks) >= 2: variacoes.append(f"{toks[0]} {toks[1]}")
-        if len(toks) >= 2: variacoes.append(f"{toks[0]} {toks[-1]}")
-        
-        ultimo = toks[-1]
-        if len(ultimo) >= 3 and ultimo not in SOBRENOMES_COMUNS_IGNORAR:
-            variacoes.append(ultimo)
-            
-        if len(toks) >= 3: variacoes.append(" ".join(toks))
-        if len(toks[0]) >= 3: variacoes.append(toks[0])
-        if len(toks) >= 3: variacoes.append(f"{toks[-2]} {toks[-1]}")
-
-        saneado = _sanear_termo_busca(normalizar_nome(nome_limpo_empresa, remover_invalidos=True))
-        if saneado: variacoes.append(saneado)
-        
-        if len(ultimo) >= 3 and ultimo in SOBRENOMES_COMUNS_IGNORAR:
-            variacoes.append(ultimo)
-
-        uniq = list(dict.fromkeys(variacoes))
-        return [u for u in (_sanear_termo_busca(u) for u in uniq) if u and len(u) >= 3][:10]
-
-    # Lógica de seleção de variações baseada no tipo de busca
-    tipo_busca = cliente_input.get('tipo_busca') if isinstance(cliente_input, dict) else 'auto'
-    variacoes = []
-
-    if tipo_busca == 'uc':
-        # Para UCs (ex: 10/123456-7), usamos o valor EXATO e preservamos a barra
-        raw_uc = cliente_input.get('busca')
-        if raw_uc:
-            logging.info(f"🔢 Busca por UC detectada: {raw_uc}")
-            # Estratégia Dupla: 1. Exato, 2. Apenas Números (caso Zoho tenha cadastro sujo)
-            variacoes = [raw_uc]
-            numeros_apenas = re.sub(r"[^0-9]", "", raw_uc)
-            if numeros_apenas != raw_uc:
-                variacoes.append(numeros_apenas)
-    else:
-        # Busca padrão (Nome, Email, etc) com variações inteligentes
-        variacoes = gerar_variacoes_inteligentes(nome_cliente)
+        telefone_cliente = dados_cliente.get('telefone_norm') or normalizar_numero(dados_cliente.get('telefone_excel'))
+        if _telefone_diverge(m, telefone_cliente):
+            # Outro contato com o mesmo nome: nem a URL nem o nome_exibicao servem
+            logging.warning(f"⚠️ Contato aprendido '{m.get('nome_exibicao') or m.get('url')}' não tem o "
+                            f"telefone da planilha, refazendo a busca")
+            _cache_decisoes.remover(nome_original_norm)
+        else:
+            if _url_aprendida_valida(m):
+                logging.info(f"💾 Abrindo contato aprendido direto: '{m.get('nome_exibicao') or m['url']}'")
+                if _abrir_pagina_contato(driver, m['url']) and str(m.get('contato_id')) in driver.current_url:
+                    _marcar_uso_contato_aprendido(nome_original_norm)
+                    return True
+                logging.warning("⚠️ URL aprendida não abriu o contato, refazendo a busca")
+                _invalidar_url_aprendida(nome_original_norm)
+            # URL vencida (TTL) ou que não abriu: refaz o caminho aprendido pela pesquisa
+            if m.get('via') and m.get('nome_exibicao'):
+                logging.info(f"💾 Usando mapeamento aprendido: '{m['nome_exibicao']}'")
+                if _executar_busca_e_clicar(driver, wait, m['via'], m['nome_exibicao']):
+                    return _aprender_contato(driver, nome_original_norm, m['via'], m['nome_exibicao'])
+
+    # Diretório local: abre a página do contato direto, sem a pesquisa global
+    contato = _contato_do_diretorio(dados_cliente)
+    if contato and _abrir_contato_direto(driver, contato):
+        return _aprender_contato(driver, nome_original_norm, nome_exibicao=contato['nome'])
+
+    # Campos pré-calculados (core/preprocessamento.py) ou cálculo na hora
+    tipo_busca = dados_cliente.get('tipo_busca', 'auto')
+    variacoes = dados_cliente.get('variacoes')
+    if variacoes is None:
+        variacoes = variacoes_para_cliente(nome_cliente, tipo_busca)
+    variacoes = list(variacoes)
+    if tipo_busca == 'uc' and variacoes:
+        logging.info(f"🔢 Busca por UC detectada: {nome_cliente}")
+    tipo_pessoa = dados_cliente.get('tipo_pessoa') or classificar_pf_ou_pj(nome_original_norm)
+    
+    # Cache negativo: não encontrado há pouco -> pula ou só uma sondagem
+    negativo = consultar_nao_encontrado(nome_original_norm)
+    if negativo:
+        quando = time.strftime('%d/%m %H:%M', time.localtime(negativo.get('registrado_em', 0)))
+        if NAO_ENCONTRADO_MODO == "pular":
+            logging.info(f"⏭️ '{nome_cliente}' não encontrado em {quando}, pulando a busca")
+            return False
+        variacoes = variacoes[:1]
+        logging.info(f"⏭️ '{nome_cliente}' não encontrado em {quando} "
+                     f"({len(negativo.get('variacoes') or [])} variações), só uma sondagem")
     
     logging.info(f"🔍 Buscando '{nome_cliente}' com {len(variacoes)} variações: {variacoes}")
     
     todos_resultados = {}
+    tentadas = []
+    busca_incompleta = False
 
     for tentativa, nome_busca in enumerate(variacoes, 1):
         try:
-            # 1. Interação com Barra de Pesquisa
-            barra = None
-            for tentativa_barra in range(3):
-                try:
-                    barra = short_wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, SELETORES["barra_pesquisa"])))
-                    # Tenta clicar para verificar se está acessível
-                    barra.click()
-                    break
-                except Exception as e:
-                    err_str = str(e).lower()
-                    if "intercepted" in err_str or "not clickable" in err_str:
-                        # Overlay está bloqueando - tenta fechar
-                        logging.warning(f"⚠️ Overlay detectado bloqueando busca. Tentando fechar...")
-                        fechar_ui_flutuante(driver)
-                        time.sleep(0.5)
-                        # Tenta remover overlays específicos do Zoho
-                        try:
-                            overlays = driver.find_elements(By.XPATH, 
-                                "//div[contains(@class, 'lookupheadercommon-title')] | "
-                                "//div[contains(@class, 'zd_v2-lookup-box')] | "
-                                "//div[contains(@class, 'modal') and contains(@style, 'display: block')]"
-                            )
-                            for overlay in overlays:
-                                try:
-                                    driver.execute_script("arguments[0].style.display='none';", overlay)
-                                except:
-                                    pass
-                        except:
-                            pass
-                        continue
-                    else:
-                        # Outro tipo de erro - tenta abrir a barra via ícone
-                        if not clicar_seguro(driver, wait, By.CSS_SELECTOR, SELETORES["icone_pesquisa"]): 
-                            break
-                        try:
-                            barra = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, SELETORES["barra_pesquisa"])))
-                        except:
-                            break
-            
-            if not barra:
-                logging.error(f"❌ Não foi possível acessar a barra de busca. Pulando '{nome_busca}'.")
+            t_enter = None
+            if tentativa == 1 and busca_iniciada == nome_busca:
+                # Termo já digitado nesta aba enquanto o cliente anterior era enviado
+                logging.info(f"⏩ Busca por '{nome_busca}' já disparada (pré-carregamento)")
+            elif not _digitar_busca(driver, wait, short_wait, nome_busca):
                 continue
-
-            # --- LIMPEZA NUCLEAR DE CAMPO ---
-            # Garante que o campo esteja realmente vazio antes de digitar
-            campo_limpo = False
-            for tentativa_limpar in range(3): # Tenta até 3 vezes limpar se falhar
-                try:
-                    # Só clica se não for a primeira tentativa (já clicamos acima)
-                    if tentativa_limpar > 0:
-                        try:
-                            barra.click()
-                        except:
-                            fechar_ui_flutuante(driver)
-                            time.sleep(0.3)
-                            barra.click()
-                    time.sleep(0.1)
-                    
-                    # 1. JS Force Clear + Event Dispatch (Crucial para React/Zoho)
-                    driver.execute_script("""
-                        arguments[0].value = '';
-                        arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
-                        arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
-                    """, barra)
-                    
-                    # 2. Teclado Físico (Redundância)
-                    barra.send_keys(Keys.CONTROL, "a")
-                    barra.send_keys(Keys.DELETE)
-                    
-                    # 3. Verificação
-                    valor_atual = barra.get_attribute("value")
-                    if not valor_atual:
-                        campo_limpo = True
-                        break
-                    else:
-                        logging.warning(f"⚠️ Campo de busca teimoso: '{valor_atual}'. Tentando limpar novamente...")
-                        # Backspace agressivo se sobrar lixo
-                        for _ in range(len(valor_atual) + 2):
-                            barra.send_keys(Keys.BACKSPACE)
-                except Exception as e_limpar:
-                    logging.debug(f"Erro ao limpar campo (tentativa {tentativa_limpar+1}): {e_limpar}")
-                    fechar_ui_flutuante(driver)
-                    time.sleep(0.3)
-
-            
-            if not campo_limpo:
-                logging.error("❌ Não foi possível limpar o campo de busca. Pulando variação.")
-                continue
-            # --------------------------------
-
-            # Digitação
-            delay = DELAY_DIGITACAO_CURTA if len(nome_busca) <= 5 else DELAY_DIGITACAO_MEDIA
-            for char in nome_busca:
-                barra.send_keys(char)
-                time.sleep(delay)
-            
-            # Validação final antes do ENTER
-            if barra.get_attribute("value").strip() != nome_busca:
-                # Se o JS do site sobrescreveu, forçamos de novo
-                driver.execute_script("arguments[0].value = arguments[1];", barra, nome_busca)
-            
-            barra.send_keys(Keys.ENTER)
+            else:
+                t_enter = time.monotonic()
+            tentadas.append(nome_busca)
             
             # Fechar alerta termo curto
             try:
@@ -388,8 +701,14 @@ def buscar_e_abrir_cliente(driver, cliente_input):
                 )
             except TimeoutException:
                 instabilidade_zoho += 1
+                ESTATISTICAS_ULTIMA_BUSCA["instabilidade"] = instabilidade_zoho
                 continue
 
+            # Latência do Zoho: do Enter até a lista (ou "sem resultados") desta variação
+            if t_enter is not None:
+                latencias.append(time.monotonic() - t_enter)
+                ESTATISTICAS_ULTIMA_BUSCA["latencia_resultados"] = sum(latencias) / len(latencias)
+
             # 3. Processar Resultados
             lista_res = driver.find_elements(By.CSS_SELECTOR, "a[data-title]")
             if not lista_res: continue
@@ -408,7 +727,7 @@ def buscar_e_abrir_cliente(driver, cliente_input):
                         if nome_busca in nome_res:
                             logging.info(f"✅ Match de UC encontrado: '{nome_res}'")
                             clicar_resultado(driver, link)
-                            return True
+                            return _aprender_contato(driver, nome_original_norm, nome_busca, nome_res)
                     # ----------------------------------
 
                     nome_res_norm = normalizar_nome(nome_res, remover_invalidos=True)
@@ -417,17 +736,16 @@ def buscar_e_abrir_cliente(driver, cliente_input):
                     if nome_res_norm == nome_original_norm:
                         logging.info(f"✅ Match EXATO: '{nome_res}'")
                         clicar_resultado(driver, link)
-                        return True
+                        return _aprender_contato(driver, nome_original_norm, nome_busca, nome_res)
                     
                     # Match Fuzzy
                     fuzzy = calcular_fuzzy_score(nome_res_norm, nome_original_norm)
-                    tipo = classificar_pf_ou_pj(nome_original_norm)
-                    thr = _limiar_dinamico_auto(tipo, len(todos_resultados), fuzzy['ratio'], nome_busca_norm, nome_res_norm)
+                    thr = _limiar_dinamico_auto(tipo_pessoa, len(todos_resultados), fuzzy['ratio'], nome_busca_norm, nome_res_norm)
                     
                     if fuzzy['ratio'] >= thr:
                         logging.info(f"✅ Match FUZZY ({fuzzy['ratio']:.2f}): '{nome_res}'")
                         clicar_resultado(driver, link)
-                        return True
+                        return _aprender_contato(driver, nome_original_norm, nome_busca, nome_res)
                     
                     # Coleta parcial (apenas se não for busca por UC, para evitar falso positivo)
                     if tipo_busca != 'uc':
@@ -444,22 +762,35 @@ def buscar_e_abrir_cliente(driver, cliente_input):
 
         except Exception as e:
             logging.error(f"Erro na busca '{nome_busca}': {e}")
+            busca_incompleta = True
             fechar_ui_flutuante(driver)
 
+    def registrar_falha():
+        # Com timeouts/erros ou variação que nem foi digitada a falha pode ser do Zoho, não do cliente
+        if negativo:
+            _registrar_sondagem_falha(nome_original_norm)
+        elif tentadas and len(tentadas) == len(variacoes) and instabilidade_zoho == 0 and not busca_incompleta:
+            candidatos = [v['nome_exibicao'] for v in sorted(todos_resultados.values(),
+                                                             key=lambda x: x['score'], reverse=True)]
+            _registrar_nao_encontrado(nome_original_norm, nome_cliente, tentadas, candidatos)
+        return False
+
     # Fallback Manual
     if not todos_resultados:
         logging.warning(f"❌ Cliente '{nome_cliente}' não encontrado.")
-        return False
+        return registrar_falha()
 
     # Se não rodar headless, poderia perguntar ao usuário aqui.
     # Como é automação, pegamos o melhor score se for alto o suficiente
     melhor = max(todos_resultados.values(), key=lambda x: x['score'])
     if melhor['score'] > 0.8:
         logging.info(f"⚠️ Usando melhor match parcial: '{melhor['nome_exibicao']}'")
-        return _executar_busca_e_clicar(driver, wait, melhor['busca_origem'], melhor['nome_exibicao'])
+        if _executar_busca_e_clicar(driver, wait, melhor['busca_origem'], melhor['nome_exibicao']):
+            return _aprender_contato(driver, nome_original_norm, melhor['busca_origem'], melhor['nome_exibicao'])
+        return False
     
     logging.warning(f"❌ Nenhum match confiável. Melhores candidatos: {[v['nome_exibicao'] for v in list(todos_resultados.values())[:3]]}")
-    return False
+    return registrar_falha()
 
 def clicar_resultado(driver, elemento):
     """
@@ -38,15 +38,18 @@ def select_mode():
         print("\n⚙️   Passo 2: MODO DE OPERAÇÃO")
         print("    [1] Modo Padrão (Recomendado - Auto detecção)")
         print("    [2] Modo Avançado (Configurar Workers / Simulação)")
+        print("    [3] Enviar para o Serviço (main_daemon.py já aberto e logado)")
         
-        choice = input("    >Escolha (1/2): ").strip()
+        choice = input("    >Escolha (1/2/3): ").strip()
         
         if choice == '1':
             return 'default'
         elif choice == '2':
             return 'advanced'
+        elif choice == '3':
+            return 'daemon'
         else:
-            print("\n❌  Opção inválida. Digite 1 ou 2.")
+            print("\n❌  Opção inválida. Digite 1, 2 ou 3.")
 
 def get_advanced_options():
     options = []
@@ -74,6 +77,32 @@ def get_advanced_options():
         
     return options
 
+def enviar_para_servico(file_path):
+    """Cria o job em jobs/pendentes/ para o serviço processar (sem abrir outro Edge)."""
+    from config.constants import TEMPLATES_DISPONIVEIS, DEPARTAMENTOS_DISPONIVEIS
+    from main_daemon import criar_job
+    
+    print("\n🏢  DEPARTAMENTO")
+    for k in sorted(DEPARTAMENTOS_DISPONIVEIS.keys(), key=int):
+        print(f"    [{k}] {DEPARTAMENTOS_DISPONIVEIS[k]}")
+    dept = input("    > ").strip()
+    
+    print("\n📝  TEMPLATE")
+    for k in sorted(TEMPLATES_DISPONIVEIS.keys(), key=int):
+        print(f"    [{k}] {TEMPLATES_DISPONIVEIS[k]['nome']}")
+    template = input("    > ").strip()
+    
+    if dept not in DEPARTAMENTOS_DISPONIVEIS or template not in TEMPLATES_DISPONIVEIS:
+        print("\n❌  Departamento ou template inválido.")
+        return
+    
+    print("\n    [Simulação] Ativar modo DRY-RUN (Não envia mensagens)? (s/N)")
+    dry = input("    > ").strip().lower() == 's'
+    
+    job_path = criar_job(file_path, template, dept, dry_run=dry)
+    print(f"\n✅  Campanha enviada ao serviço: {job_path.name}")
+    print("    Acompanhe em jobs/concluidos/ e reports/.")
+
 def main():
     clear_screen()
     print_header()
@@ -86,6 +115,10 @@ def main():
         # 2. Select Mode
         mode = select_mode()
         
+        if mode == 'daemon':
+            enviar_para_servico(file_path)
+            return
+        
         if mode == 'advanced':
             # Modo avançado: usa main_parallel.py com workers
             cmd_args = [sys.executable, "main_parallel.py", f"--arquivo={file_path}"]
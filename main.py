@@ -17,14 +17,13 @@ from selenium.webdriver import ActionChains
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import (
     TimeoutException,
-    InvalidSessionIdException
+    InvalidSessionIdException,
+    WebDriverException
 )
 
 # --- IMPORTAÇÕES MODULARES ---
 try:
     from config.constants import TEMPLATES_DISPONIVEIS, DEPARTAMENTOS_DISPONIVEIS, URL_ZOHO_DESK
-    COOLDOWN_INTERVALO_CLIENTES = 20
-    COOLDOWN_DURACAO_SEGUNDOS = 60
     
     # --- CONFIGURAÇÃO DE VELOCIDADE ---
     DELAY_DIGITACAO_CURTA = 0.005
@@ -39,9 +38,12 @@ except ImportError:
 
 # Core (Lógica Principal)
 from core.login import fazer_login
-from core.search import buscar_e_abrir_cliente
+from core.search import (
+    buscar_e_abrir_cliente, configurar_nao_encontrados, listar_nao_encontrados, NAO_ENCONTRADO_TTL_DIAS
+)
+from core.preprocessamento import preprocessar_clientes
 from core.departments import trocar_departamento_zoho
-from core.processing import processar_pagina_cliente, fechar_modal_robusto
+from core.processing import processar_pagina_cliente, fechar_modal_robusto, registrar_saude_zoho
 from core.messaging import fechar_ui_flutuante
 
 # Utils (Ferramentas)
@@ -49,11 +51,15 @@ from utils.files import carregar_lista_clientes
 from utils.webdriver import iniciar_driver
 from utils.screenshots import take_screenshot
 from utils.session import (
-    gerar_hash_arquivo, gerar_session_id,
+    gerar_hash_arquivo, gerar_session_id, gerar_session_id_campanha,
+    gerar_fingerprint_cliente, atualizar_total_clientes,
     sessao_existe, carregar_sessao, criar_sessao,
-    salvar_progresso, cliente_ja_processado,
+    salvar_progresso, obter_store,
     apagar_sessao, resumo_sessao, contar_processados
 )
+from utils.historico_envios import enviados_recentemente, registrar_envio, JANELA_DEDUPE_DIAS
+from utils.rate_limiter import LimitadorEnvios, ControladorAIMD, aguardar_vez_de_enviar
+from config.constants import ENVIOS_POR_MINUTO
 
 # Logging
 try:
@@ -79,6 +85,12 @@ def main():
     parser.add_argument("--keep-open", action="store_true", default=True, help="Manter navegador aberto no final.")
     parser.add_argument("--resume", action="store_true", help="Retomar sessão anterior automaticamente.")
     parser.add_argument("--force", action="store_true", help="Forçar nova sessão, ignorando progresso anterior.")
+    parser.add_argument("--sessao-campanha", action="store_true", help="Sessão por campanha (lista+template+dept): ao editar a planilha, só linhas novas/alteradas ficam pendentes.")
+    parser.add_argument("--envios-por-minuto", type=float, default=ENVIOS_POR_MINUTO, help=f"Limite de envios por minuto (0 = sem limite). Padrão: {ENVIOS_POR_MINUTO}.")
+    parser.add_argument("--ritmo-fixo", action="store_true", help="Mantém --envios-por-minuto fixo (desliga o ajuste adaptativo pela saúde do Zoho).")
+    parser.add_argument("--janela-dias", type=int, default=JANELA_DEDUPE_DIAS, help="Pula clientes que já receberam o mesmo template nos últimos N dias, em qualquer campanha (0 = desativa).")
+    parser.add_argument("--ttl-nao-encontrados", type=int, default=NAO_ENCONTRADO_TTL_DIAS, help=f"Clientes não encontrados nos últimos N dias fazem só uma busca rápida (0 = busca completa sempre). Padrão: {NAO_ENCONTRADO_TTL_DIAS}.")
+    parser.add_argument("--pular-nao-encontrados", action="store_true", help="Clientes não encontrados dentro do --ttl-nao-encontrados nem são pesquisados.")
 
     args = parser.parse_args()
 
@@ -114,13 +126,22 @@ def main():
         return
 
     # === SISTEMA DE SESSÕES (PERSISTENTE) ===
-    # Calcula hash do arquivo para identificar mudanças no conteúdo
-    hash_arquivo = gerar_hash_arquivo(args.arquivo)
-    session_id = gerar_session_id(hash_arquivo, NOME_TEMPLATE, NOME_DEPARTAMENTO)
+    if args.sessao_campanha:
+        # Sessão por campanha: não lê o arquivo, retoma por fingerprint de linha
+        hash_arquivo = ""
+        session_id = gerar_session_id_campanha(args.arquivo, NOME_TEMPLATE, NOME_DEPARTAMENTO)
+    else:
+        # Calcula hash do arquivo para identificar mudanças no conteúdo
+        hash_arquivo = gerar_hash_arquivo(args.arquivo)
+        session_id = gerar_session_id(hash_arquivo, NOME_TEMPLATE, NOME_DEPARTAMENTO)
     
     logging.info(f"Session ID: {session_id}")
     logging.info(f"Total carregado do arquivo: {len(todos_clientes)}")
     
+    # Normalização e variações de busca calculadas uma vez (cache por hash do
+    # arquivo, ou por linha no modo campanha, que não lê o arquivo inteiro de novo)
+    preprocessar_clientes(todos_clientes, args.arquivo, hash_arquivo or None, por_fingerprint=args.sessao_campanha)
+    
     # Verifica se existe sessão anterior com mesma combinação
     retomar_sessao = False
     
@@ -151,7 +172,38 @@ def main():
     # Cria nova sessão se não existe ou se for recomeçar
     if not sessao_existe(session_id):
         criar_sessao(session_id, args.arquivo, hash_arquivo, 
-                     NOME_TEMPLATE, NOME_DEPARTAMENTO, len(todos_clientes))
+                     NOME_TEMPLATE, NOME_DEPARTAMENTO, len(todos_clientes), dry_run=args.dry_run)
+    elif args.sessao_campanha:
+        atualizar_total_clientes(session_id, len(todos_clientes))
+    
+    # Clientes ainda pendentes na sessão (calculado uma vez, em lote)
+    pendentes_sessao = set()
+    if retomar_sessao:
+        pendentes_sessao = {
+            c.get('busca') for c in
+            obter_store(session_id).pendentes(todos_clientes, por_fingerprint=args.sessao_campanha)
+        }
+    
+    # Clientes que já receberam este template em outra campanha (consulta única);
+    # --force reenvia para todos, inclusive quem recebeu há pouco
+    if args.force and args.janela_dias > 0:
+        logging.warning("--force: histórico de envios ignorado, quem já recebeu o template recebe de novo")
+    recentes = enviados_recentemente(todos_clientes, NOME_TEMPLATE, 0 if args.force else args.janela_dias)
+    if recentes:
+        logging.warning(f"{len(recentes)} clientes já receberam '{NOME_TEMPLATE}' nos últimos {args.janela_dias} dias e serão pulados "
+                        f"(--janela-dias 0 ou --force para reenviar)")
+    
+    # Clientes não encontrados em campanhas recentes (cache negativo)
+    configurar_nao_encontrados(args.ttl_nao_encontrados, "pular" if args.pular_nao_encontrados else "sondar")
+    nao_encontrados_antes = listar_nao_encontrados(todos_clientes)
+    if nao_encontrados_antes:
+        logging.info(f"{len(nao_encontrados_antes)} clientes não foram encontrados nos últimos {args.ttl_nao_encontrados} dias "
+                     f"({'serão pulados' if args.pular_nao_encontrados else 'só uma busca rápida'}): "
+                     f"{[c['busca'] for c, _ in nao_encontrados_antes]}")
+    
+    # Ritmo de envios (token bucket) ajustado pela saúde do Zoho (AIMD)
+    limitador = LimitadorEnvios(args.envios_por_minuto)
+    controlador = None if args.ritmo_fixo else ControladorAIMD(limitador)
     
     # Controle de duplicatas dentro da sessão atual (memória)
     vistos_na_sessao = set()
@@ -196,6 +248,7 @@ def main():
 
             termo_busca = cliente_dict.get('busca', 'Desconhecido')
             tipo_busca = cliente_dict.get('tipo_busca', 'auto')
+            fingerprint = gerar_fingerprint_cliente(cliente_dict)
             logging.info(f"Processando Cliente: '{termo_busca}' (Método: {tipo_busca.upper()})")
             
             # --- VERIFICAÇÃO DE DUPLICIDADE NA SESSÃO ---
@@ -205,20 +258,22 @@ def main():
                 continue
             
             # --- VERIFICAÇÃO DE CLIENTE JÁ PROCESSADO (SESSÃO PERSISTENTE) ---
-            if retomar_sessao and cliente_ja_processado(session_id, termo_busca):
+            if retomar_sessao and termo_busca not in pendentes_sessao:
                 pbar.set_postfix_str(f"✅ Já processado: {termo_busca[:15]}")
                 logging.debug(f"Pulando cliente já processado: {termo_busca}")
                 continue
             
+            # --- VERIFICAÇÃO DE ENVIO RECENTE (HISTÓRICO ENTRE CAMPANHAS) ---
+            if termo_busca in recentes:
+                pbar.set_postfix_str(f"📬 Enviado recentemente: {termo_busca[:15]}")
+                logging.debug(f"Pulando cliente com envio em {recentes[termo_busca]:%d/%m %H:%M}: {termo_busca}")
+                continue
+            
             # Marca como visto AGORA
             vistos_na_sessao.add(termo_busca)
             
             pbar.set_postfix_str(f"{termo_busca[:20]}...")
             
-            # Cooldown (Pausa para evitar bloqueio)
-            if i > 0 and i % COOLDOWN_INTERVALO_CLIENTES == 0:
-                logging.info(f"Pausa de {COOLDOWN_DURACAO_SEGUNDOS}s para resfriamento...")
-                time.sleep(COOLDOWN_DURACAO_SEGUNDOS)
 
             # Garante que estamos na home
             if "desk.zoho.com/agent/" not in driver.current_url:
@@ -231,9 +286,13 @@ def main():
                 
                 if not encontrado:
                     nao_encontrados.append(termo_busca)
-                    salvar_progresso(session_id, termo_busca, "NAO_ENCONTRADO")
+                    salvar_progresso(session_id, termo_busca, "NAO_ENCONTRADO", fingerprint)
+                    registrar_saude_zoho(controlador, houve_busca=True)
                     continue
 
+                # Ritmo de envios (evita bloqueio sem pausas fixas)
+                aguardar_vez_de_enviar(limitador)
+                
                 # Processa (Envia Mensagem)
                 resultado = processar_pagina_cliente(
                     driver=driver,
@@ -243,19 +302,24 @@ def main():
                     ancoras=ANCORAS,
                     dry_run=args.dry_run
                 )
+                registrar_saude_zoho(controlador, houve_busca=True, houve_envio=True)
 
                 if resultado:
                     sucesso.append(termo_busca)
-                    salvar_progresso(session_id, termo_busca, "SUCESSO")
+                    salvar_progresso(session_id, termo_busca, "SUCESSO", fingerprint)
+                    if not args.dry_run:
+                        registrar_envio(termo_busca, NOME_TEMPLATE, cliente_dict.get('telefone_excel'), session_id)
                 else:
                     erros.append(termo_busca)
-                    salvar_progresso(session_id, termo_busca, "ERRO")
+                    salvar_progresso(session_id, termo_busca, "ERRO", fingerprint)
 
             except Exception as e:
                 logging.error(f"Erro ao processar '{termo_busca}': {e}")
+                if isinstance(e, (WebDriverException, ConnectionError)):
+                    registrar_saude_zoho(controlador, falha_driver=True)
                 take_screenshot(driver, f"erro_loop_{termo_busca}")
                 erros.append(termo_busca)
-                salvar_progresso(session_id, termo_busca, "ERRO")
+                salvar_progresso(session_id, termo_busca, "ERRO", fingerprint)
                 # Tenta recuperar indo para home
                 try: driver.get(URL_ZOHO_DESK) 
                 except: pass
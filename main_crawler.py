@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+AutoZoho - Crawler da lista de contatos
+Percorre a lista de contatos do Zoho Desk com vários navegadores e mantém o
+diretório local (cache/diretorio_contatos.db) atualizado: nome, e-mail,
+telefones e URL de cada contato. A busca usa esse diretório para abrir os
+clientes direto, sem a pesquisa global.
+
+Rodadas interrompidas continuam de onde pararam (cache/crawler_contatos.json);
+numa rodada nova só as páginas que mudaram são regravadas.
+
+Uso:
+    python main_crawler.py --workers 3
+    python main_crawler.py --parar-apos-iguais 5   (lista ordenada por modificação)
+"""
+
+import os
+import sys
+import argparse
+import logging
+from datetime import datetime
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.crawler_contatos import executar_crawler, CHECKPOINT_PATH
+from utils.diretorio_contatos import DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="AutoZoho - Copia a lista de contatos do Zoho para o diretório local."
+    )
+    parser.add_argument("--workers", type=int, choices=[1, 2, 3, 4], default=2,
+                        help="Navegadores em paralelo (1-4). Padrão: 2.")
+    parser.add_argument("--recomecar", action="store_true",
+                        help="Ignora a rodada interrompida e começa uma nova do início.")
+    parser.add_argument("--parar-apos-iguais", type=int, default=0, metavar="N",
+                        help="Encerra após N páginas seguidas sem mudança desde a última rodada "
+                             "(para listas ordenadas por data de modificação). Padrão: 0 (percorre tudo).")
+    parser.add_argument("--max-paginas", type=int, default=None, help="Limite de páginas.")
+    parser.add_argument("--perfil-temporario", action="store_true",
+                        help="Não usa os perfis persistentes profiles/worker_<n>.")
+    parser.add_argument("-l", "--loglevel", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Nível de log.")
+    args = parser.parse_args()
+
+    os.makedirs('logging', exist_ok=True)
+    logging.basicConfig(
+        level=getattr(logging, args.loglevel),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join('logging', 'automacao_crawler.log'), encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+
+    inicio = datetime.now()
+    try:
+        resumo = executar_crawler(
+            num_workers=args.workers,
+            retomar=not args.recomecar,
+            parar_apos_iguais=max(0, args.parar_apos_iguais),
+            max_paginas=args.max_paginas,
+            perfil_dedicado=not args.perfil_temporario
+        )
+    except KeyboardInterrupt:
+        logging.warning(f"Interrompido pelo usuário. Rode de novo para continuar ({CHECKPOINT_PATH}).")
+        return
+
+    print("=" * 60)
+    print("CRAWLER DA LISTA DE CONTATOS")
+    print(f"  Páginas lidas...: {resumo['paginas']} ({resumo['alteradas']} alteradas, {resumo['iguais']} sem mudança)")
+    print(f"  Contatos gravados: {resumo['contatos']} em {DB_PATH}")
+    print(f"  Última página...: {resumo['fim'] or 'não encontrada'}")
+    print(f"  Rodada..........: {'concluída' if resumo['concluida'] else 'incompleta (rode de novo para continuar)'}")
+    print(f"  Duração.........: {datetime.now() - inicio}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# Arquivo: main_daemon.py
+# -*- coding: utf-8 -*-
+"""
+AutoZoho - Modo Serviço
+Mantém uma frota de navegadores logados e processa as campanhas deixadas em
+jobs/pendentes/ (um .json por campanha), sem pagar abertura do Edge, login/OTP
+e troca de departamento a cada arquivo.
+
+Formato do job (template/departamento por número ou nome, como no main_parallel):
+    {"arquivo": "C:/listas/clientes.xlsx", "template": "1", "departamento": "3",
+     "dry_run": false, "workers": 2, "envios_por_minuto": 12, "janela_dias": 7,
+     "ttl_nao_encontrados": 7, "pular_nao_encontrados": false}
+
+Ciclo: pendentes/ -> em_andamento/ -> concluidos/ (com o resumo) ou falhos/ (com o erro).
+Todos os jobs pendentes entram juntos num lote: a frota agrupa as campanhas por
+departamento, para cada navegador trocar de departamento o mínimo possível.
+Cada campanha usa sessão por campanha (arquivo+template+departamento): reenviar
+o mesmo job retoma de onde parou. Para parar: Ctrl+C ou criar jobs/PARAR.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Imports do projeto
+from utils.files import carregar_lista_clientes
+from utils.session import (
+    gerar_session_id_campanha, atualizar_total_clientes,
+    sessao_existe, criar_sessao, apagar_sessao, obter_store
+)
+from utils.historico_envios import enviados_recentemente, JANELA_DEDUPE_DIAS
+from core.preprocessamento import preprocessar_clientes
+from core.search import listar_nao_encontrados, NAO_ENCONTRADO_TTL_DIAS
+from core.parallel import Frota, salvar_relatorio_consolidado, MAX_ABAS_POR_WORKER
+from main_parallel import resolver_template, resolver_departamento
+from config.constants import ENVIOS_POR_MINUTO
+
+JOBS_DIR = Path(__file__).parent / "jobs"
+PENDENTES_DIR = JOBS_DIR / "pendentes"
+EM_ANDAMENTO_DIR = JOBS_DIR / "em_andamento"
+CONCLUIDOS_DIR = JOBS_DIR / "concluidos"
+FALHOS_DIR = JOBS_DIR / "falhos"
+ARQUIVO_PARAR = JOBS_DIR / "PARAR"
+
+INTERVALO_VERIFICACAO_SEGUNDOS = 5
+
+
+def criar_job(arquivo: str, template: str, departamento: str, **opcoes) -> Path:
+    """
+    Enfileira uma campanha para o serviço (usado pelo launcher).
+
+    Returns:
+        Caminho do job criado em jobs/pendentes/
+    """
+    PENDENTES_DIR.mkdir(parents=True, exist_ok=True)
+    job = {"arquivo": os.path.abspath(arquivo), "template": template, "departamento": departamento}
+    job.update(opcoes)
+    nome = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json"
+    tmp_path = PENDENTES_DIR / f".{nome}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False, indent=2)
+    # Rename atômico: o serviço nunca lê um job pela metade
+    os.replace(tmp_path, PENDENTES_DIR / nome)
+    return PENDENTES_DIR / nome
+
+
+def _mover_job(job_path: Path, destino: Path, dados: dict = None) -> Path:
+    """Move o job de pasta; com `dados`, regrava o conteúdo (resumo/erro)."""
+    destino.mkdir(parents=True, exist_ok=True)
+    novo = destino / job_path.name
+    if dados is not None:
+        with open(novo, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2, default=str)
+        job_path.unlink()
+    else:
+        os.replace(job_path, novo)
+    return novo
+
+
+def recuperar_jobs_interrompidos() -> int:
+    """Jobs que ficaram em andamento (serviço caiu) voltam para pendentes."""
+    if not EM_ANDAMENTO_DIR.exists():
+        return 0
+    jobs = list(EM_ANDAMENTO_DIR.glob("*.json"))
+    for job_path in jobs:
+        _mover_job(job_path, PENDENTES_DIR)
+        logging.warning(f"Job interrompido devolvido à fila: {job_path.name}")
+    return len(jobs)
+
+
+def jobs_pendentes() -> list:
+    """Jobs pendentes, do mais antigo para o mais novo."""
+    if not PENDENTES_DIR.exists():
+        return []
+    return sorted(PENDENTES_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+
+
+def preparar_campanha(job: dict, padroes: dict):
+    """
+    Resolve template/departamento, carrega a planilha e aplica sessão,
+    pré-processamento e histórico de envios (sem nenhuma pergunta interativa).
+
+    Returns:
+        (clientes pendentes, config para a Frota)
+
+    Raises:
+        ValueError: job inválido
+    """
+    arquivo = job.get("arquivo")
+    if not arquivo or not os.path.isfile(arquivo):
+        raise ValueError(f"Arquivo não encontrado: {arquivo}")
+
+    template_nome, ancoras = resolver_template(str(job.get("template", "")))
+    departamento = resolver_departamento(str(job.get("departamento", "")))
+    if not template_nome or not departamento:
+        raise ValueError(f"Template/departamento inválido: {job.get('template')} / {job.get('departamento')}")
+
+    clientes = carregar_lista_clientes(arquivo)
+    if not clientes:
+        raise ValueError("Lista de clientes vazia")
+    total_original = len(clientes)
+
+    session_id = gerar_session_id_campanha(arquivo, template_nome, departamento)
+    if job.get("force") and sessao_existe(session_id):
+        apagar_sessao(session_id)
+    preprocessar_clientes(clientes, arquivo, por_fingerprint=True)
+
+    if not sessao_existe(session_id):
+        criar_sessao(session_id, arquivo, "", template_nome, departamento, total_original,
+                     dry_run=bool(job.get("dry_run", False)))
+    else:
+        atualizar_total_clientes(session_id, total_original)
+        clientes = obter_store(session_id).pendentes(clientes, por_fingerprint=True)
+        logging.info(f"Sessão {session_id}: {total_original - len(clientes)} clientes já processados")
+
+    # "force" no job também reenvia para quem recebeu o template há pouco
+    janela_dias = 0 if job.get("force") else job.get("janela_dias", padroes["janela_dias"])
+    recentes = enviados_recentemente(clientes, template_nome, janela_dias)
+    if recentes:
+        logging.warning(f"Filtrados {len(recentes)} clientes pelo histórico de envios (janela de {janela_dias} dias)")
+        clientes = [c for c in clientes if c['busca'] not in recentes]
+
+    ttl_nao_encontrados = job.get("ttl_nao_encontrados", padroes["ttl_nao_encontrados"])
+    pular_nao_encontrados = bool(job.get("pular_nao_encontrados", padroes["pular_nao_encontrados"]))
+    nao_encontrados = listar_nao_encontrados(clientes, ttl_nao_encontrados)
+    if nao_encontrados:
+        logging.info(f"{len(nao_encontrados)} clientes não foram encontrados nos últimos {ttl_nao_encontrados} dias "
+                     f"({'serão pulados' if pular_nao_encontrados else 'só uma busca rápida'}): "
+                     f"{[c['busca'] for c, _ in nao_encontrados]}")
+
+    config = {
+        'template_nome': template_nome,
+        'ancoras': ancoras,
+        'departamento': departamento,
+        'dry_run': bool(job.get("dry_run", False)),
+        'session_id': session_id,
+        # Sem valor no job: a frota mantém a taxa base/AIMD
+        'envios_por_minuto': job.get("envios_por_minuto"),
+        'abas_por_worker': job.get("abas_por_worker") or (2 if job.get("prefetch_aba") else padroes["abas_por_worker"]),
+        'ttl_nao_encontrados_dias': ttl_nao_encontrados,
+        'modo_nao_encontrados': "pular" if pular_nao_encontrados else "sondar",
+    }
+    return clientes, config
+
+
+def processar_jobs(frota: Frota, job_paths: list, padroes: dict) -> None:
+    """
+    Executa juntos todos os jobs pendentes e arquiva o resultado de cada um.
+    A Frota agrupa as campanhas por departamento (cada navegador troca de
+    departamento o mínimo possível).
+    """
+    inicio = datetime.now()
+    lote = []  # (job_path, job, clientes, config)
+    for job_path in job_paths:
+        job_path = _mover_job(job_path, EM_ANDAMENTO_DIR)
+        job = None
+        try:
+            with open(job_path, encoding='utf-8') as f:
+                job = json.load(f)
+            clientes, config = preparar_campanha(job, padroes)
+        except Exception as e:
+            logging.error(f"Job {job_path.name} inválido: {e}")
+            _mover_job(job_path, FALHOS_DIR, {"job": job, "erro": str(e)})
+            continue
+        if not clientes:
+            logging.info(f"Job {job_path.name}: nenhum cliente pendente")
+            _mover_job(job_path, CONCLUIDOS_DIR, {"job": job, "resumo": {
+                "inicio": inicio.isoformat(), "session_id": config['session_id'], "pendentes": 0
+            }})
+            continue
+        lote.append((job_path, job, clientes, config))
+
+    if not lote:
+        return
+    logging.info(f"=== Lote com {len(lote)} campanha(s): {', '.join(p.name for p, _, _, _ in lote)} ===")
+
+    # Limite de workers do job só vale quando ele roda sozinho
+    num_workers = lote[0][1].get("workers") if len(lote) == 1 else None
+    try:
+        todos = frota.executar_campanhas([(clientes, config) for _, _, clientes, config in lote], num_workers)
+    except Exception as e:
+        logging.error(f"Erro executando o lote: {e}")
+        for job_path, job, clientes, config in lote:
+            _mover_job(job_path, FALHOS_DIR, {"job": job, "erro": str(e)})
+        return
+
+    duracao = round((datetime.now() - inicio).total_seconds())
+    for (job_path, job, clientes, config), resultados in zip(lote, todos):
+        resumo = {
+            "inicio": inicio.isoformat(),
+            "session_id": config['session_id'],
+            "pendentes": len(clientes),
+            "sucesso": len(resultados['sucesso']),
+            "nao_encontrados": len(resultados['nao_encontrados']),
+            "erros": len(resultados['erros']),
+            "nao_processados": resultados.get('nao_processados', 0),
+            "relatorio": salvar_relatorio_consolidado(resultados, job["arquivo"], f"_{job_path.stem}"),
+            "duracao_lote_s": duracao,
+        }
+        _mover_job(job_path, CONCLUIDOS_DIR, {"job": job, "resumo": resumo})
+        logging.info(f"Job {job_path.name} concluído: {resumo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="AutoZoho - Serviço com navegadores logados que processa campanhas de jobs/pendentes."
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Tamanho da frota (navegadores abertos). Padrão: 4.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_VERIFICACAO_SEGUNDOS,
+                        help=f"Segundos entre verificações de novos jobs. Padrão: {INTERVALO_VERIFICACAO_SEGUNDOS}.")
+    parser.add_argument("--envios-por-minuto", type=float, default=ENVIOS_POR_MINUTO,
+                        help=f"Limite padrão de envios por minuto da frota (o job pode sobrescrever). Padrão: {ENVIOS_POR_MINUTO}.")
+    parser.add_argument("--ritmo-fixo", action="store_true", help="Desliga o ajuste adaptativo do ritmo de envios.")
+    parser.add_argument("--perfil-temporario", action="store_true", help="Não usa os perfis persistentes profiles/worker_<n>.")
+    parser.add_argument("--prefetch-aba", action="store_true",
+                        help="Busca do próximo cliente carrega numa segunda aba durante o envio atual (o job pode sobrescrever).")
+    parser.add_argument("--abas", type=int, default=None,
+                        help=f"Abas por navegador, cada uma um worker lógico (1-{MAX_ABAS_POR_WORKER}, o job pode sobrescrever). "
+                             f"Padrão: 1 (2 com --prefetch-aba).")
+    parser.add_argument("--janela-dias", type=int, default=JANELA_DEDUPE_DIAS,
+                        help=f"Janela padrão do histórico de envios (o job pode sobrescrever). Padrão: {JANELA_DEDUPE_DIAS}.")
+    parser.add_argument("--ttl-nao-encontrados", type=int, default=NAO_ENCONTRADO_TTL_DIAS,
+                        help=f"Dias em que um cliente não encontrado faz só uma busca rápida (0 = desativa, o job pode sobrescrever). "
+                             f"Padrão: {NAO_ENCONTRADO_TTL_DIAS}.")
+    parser.add_argument("--pular-nao-encontrados", action="store_true",
+                        help="Clientes não encontrados dentro do TTL nem são pesquisados (o job pode sobrescrever).")
+    parser.add_argument("-l", "--loglevel", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Nível de log.")
+    args = parser.parse_args()
+
+    os.makedirs('logging', exist_ok=True)
+    logging.basicConfig(
+        level=getattr(logging, args.loglevel),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join('logging', 'automacao_daemon.log'), encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+
+    for pasta in (PENDENTES_DIR, EM_ANDAMENTO_DIR, CONCLUIDOS_DIR, FALHOS_DIR):
+        pasta.mkdir(parents=True, exist_ok=True)
+    recuperar_jobs_interrompidos()
+
+    padroes = {"janela_dias": args.janela_dias,
+               "abas_por_worker": args.abas or (2 if args.prefetch_aba else 1),
+               "ttl_nao_encontrados": args.ttl_nao_encontrados,
+               "pular_nao_encontrados": args.pular_nao_encontrados}
+    frota = Frota(max(1, args.workers), {
+        'envios_por_minuto': args.envios_por_minuto,
+        'ritmo_adaptativo': not args.ritmo_fixo,
+        'perfil_por_worker': not args.perfil_temporario,
+    })
+
+    print("=" * 60)
+    print("AUTOZOHO - MODO SERVIÇO")
+    print(f"  Frota...........: {args.workers} navegadores")
+    print(f"  Jobs............: {PENDENTES_DIR}")
+    print(f"  Parar...........: Ctrl+C ou criar {ARQUIVO_PARAR}")
+    print("=" * 60)
+
+    try:
+        frota.iniciar()
+        while not ARQUIVO_PARAR.exists():
+            job_paths = jobs_pendentes()
+            if not job_paths:
+                time.sleep(args.intervalo)
+                continue
+            processar_jobs(frota, job_paths, padroes)
+        logging.info(f"{ARQUIVO_PARAR.name} encontrado, encerrando serviço")
+        ARQUIVO_PARAR.unlink()
+    except KeyboardInterrupt:
+        logging.warning("Serviço interrompido pelo usuário.")
+    finally:
+        frota.encerrar()
+
+
+if __name__ == "__main__":
+    main()
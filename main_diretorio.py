@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+AutoZoho - Diretório local de contatos
+Importa uma exportação de contatos do Zoho Desk (CSV/xlsx) para o diretório
+usado pela busca (cache/diretorio_contatos.db). Com o diretório carregado, os
+clientes encontrados nele são abertos direto pela URL do contato, sem a
+pesquisa global do Zoho.
+
+Uso:
+    python main_diretorio.py -a contatos_exportados.csv [--substituir]
+    python main_diretorio.py --consultar "Maria da Silva"
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.cliente import Cliente
+from utils.diretorio_contatos import importar_exportacao, consultar_diretorio, DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="AutoZoho - Diretório local de contatos (abre clientes direto, sem pesquisa no Zoho)."
+    )
+    parser.add_argument("-a", "--arquivo", help="Exportação de contatos do Zoho (.csv ou .xlsx).")
+    parser.add_argument("--substituir", action="store_true", help="Apaga o diretório antes de importar.")
+    parser.add_argument("--consultar", help="Mostra os candidatos do diretório para um nome, e-mail, telefone ou UC.")
+    parser.add_argument("-l", "--loglevel", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Nível de log.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.loglevel),
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+
+    if not args.arquivo and not args.consultar:
+        parser.error("informe -a/--arquivo ou --consultar")
+
+    if args.arquivo:
+        if not os.path.exists(args.arquivo):
+            logging.error(f"Arquivo não encontrado: {args.arquivo}")
+            sys.exit(1)
+        total = importar_exportacao(args.arquivo, substituir=args.substituir)
+        print(f"{total} contatos no diretório ({DB_PATH})")
+
+    if args.consultar:
+        termo = args.consultar.strip()
+        if "@" in termo:
+            cliente = Cliente(busca=termo, tipo_busca="email", email_excel=termo)
+        elif "/" in termo:
+            cliente = Cliente(busca=termo, tipo_busca="uc", uc_excel=termo)
+        elif sum(ch.isdigit() for ch in termo) >= 8:
+            cliente = Cliente(busca=termo, tipo_busca="telefone", telefone_excel=termo)
+        else:
+            cliente = Cliente(busca=termo, tipo_busca="nome", nome_excel=termo)
+        candidatos = consultar_diretorio(cliente)
+        if not candidatos:
+            print("Nenhum contato parecido no diretório")
+        for c in candidatos:
+            print(f"  [{c['via']} {c['score']:.2f}] {c['nome']} | {c['email'] or '-'} | "
+                  f"{', '.join(c['telefones']) or '-'} | {c['url'] or c['id']}")
+
+
+if __name__ == "__main__":
+    main()
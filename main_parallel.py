@@ -17,16 +17,23 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 # Imports do projeto
 from utils.files import carregar_lista_clientes
 from utils.session import (
-    gerar_hash_arquivo, gerar_session_id,
+    gerar_hash_arquivo, gerar_session_id, gerar_session_id_campanha,
+    atualizar_total_clientes,
     sessao_existe, carregar_sessao, criar_sessao,
-    salvar_progresso, cliente_ja_processado,
-    apagar_sessao, resumo_sessao, contar_processados
+    salvar_progresso,
+    apagar_sessao, resumo_sessao, contar_processados,
+    obter_store
 )
+from utils.historico_envios import enviados_recentemente, JANELA_DEDUPE_DIAS
+from core.preprocessamento import preprocessar_clientes
+from core.search import configurar_nao_encontrados, listar_nao_encontrados, NAO_ENCONTRADO_TTL_DIAS
 from core.parallel import (
     calcular_workers_ideais,
     executar_paralelo,
     salvar_relatorio_consolidado,
-    imprimir_resumo_paralelo
+    imprimir_resumo_paralelo,
+    RESERVAS_AQUECIDAS,
+    MAX_ABAS_POR_WORKER
 )
 
 try:
@@ -35,6 +42,8 @@ except ImportError:
     TEMPLATES_DISPONIVEIS = {}
     DEPARTAMENTOS_DISPONIVEIS = {}
 
+from config.constants import ENVIOS_POR_MINUTO
+
 
 def resolver_template(entrada):
     """Resolve template por número ou nome."""
@@ -133,6 +142,64 @@ def main():
         action="store_true",
         help="Forçar nova sessão, ignorando progresso anterior."
     )
+    parser.add_argument(
+        "--sessao-campanha",
+        action="store_true",
+        help="Sessão por campanha (lista+template+dept): ao editar a planilha, só linhas novas/alteradas ficam pendentes."
+    )
+    parser.add_argument(
+        "--envios-por-minuto",
+        type=float,
+        default=ENVIOS_POR_MINUTO,
+        help=f"Limite de envios por minuto somando todos os workers (0 = sem limite). Padrão: {ENVIOS_POR_MINUTO}."
+    )
+    parser.add_argument(
+        "--ritmo-fixo",
+        action="store_true",
+        help="Mantém --envios-por-minuto fixo (desliga o ajuste adaptativo pela saúde do Zoho)."
+    )
+    parser.add_argument(
+        "--perfil-temporario",
+        action="store_true",
+        help="Não usa os perfis persistentes profiles/worker_<n> (clonados de profiles/modelo, se existir)."
+    )
+    parser.add_argument(
+        "--reservas",
+        type=int,
+        default=RESERVAS_AQUECIDAS,
+        help=f"Navegadores reserva já logados que assumem na hora o lugar de um worker com falha (0 = desativa). Padrão: {RESERVAS_AQUECIDAS}."
+    )
+    parser.add_argument(
+        "--prefetch-aba",
+        action="store_true",
+        help="Cada worker usa duas abas: a busca do próximo cliente carrega numa enquanto o envio atual acontece na outra."
+    )
+    parser.add_argument(
+        "--abas",
+        type=int,
+        choices=range(1, MAX_ABAS_POR_WORKER + 1),
+        default=None,
+        metavar="N",
+        help=f"Abas por navegador (1-{MAX_ABAS_POR_WORKER}), cada uma um worker lógico com o mesmo login: "
+             f"mais envios simultâneos sem abrir outro Edge. Padrão: 1 (2 com --prefetch-aba)."
+    )
+    parser.add_argument(
+        "--janela-dias",
+        type=int,
+        default=JANELA_DEDUPE_DIAS,
+        help=f"Pula clientes que já receberam o mesmo template nos últimos N dias, em qualquer campanha (0 = desativa). Padrão: {JANELA_DEDUPE_DIAS}."
+    )
+    parser.add_argument(
+        "--ttl-nao-encontrados",
+        type=int,
+        default=NAO_ENCONTRADO_TTL_DIAS,
+        help=f"Clientes não encontrados nos últimos N dias fazem só uma busca rápida (0 = busca completa sempre). Padrão: {NAO_ENCONTRADO_TTL_DIAS}."
+    )
+    parser.add_argument(
+        "--pular-nao-encontrados",
+        action="store_true",
+        help="Clientes não encontrados dentro do --ttl-nao-encontrados nem são pesquisados."
+    )
     
     args = parser.parse_args()
     
@@ -180,11 +247,20 @@ def main():
     logging.info(f"Total de clientes carregados: {total_original}")
     
     # === SISTEMA DE SESSÕES (PERSISTENTE) ===
-    hash_arquivo = gerar_hash_arquivo(args.arquivo)
-    session_id = gerar_session_id(hash_arquivo, template_nome, departamento)
+    if args.sessao_campanha:
+        hash_arquivo = ""
+        session_id = gerar_session_id_campanha(args.arquivo, template_nome, departamento)
+    else:
+        hash_arquivo = gerar_hash_arquivo(args.arquivo)
+        session_id = gerar_session_id(hash_arquivo, template_nome, departamento)
     
     logging.info(f"Session ID: {session_id}")
     
+    # Normalização e variações de busca calculadas uma vez (cache por hash do arquivo,
+    # ou por linha no modo campanha, sem reler o arquivo);
+    # os campos prontos seguem para os workers junto com cada Cliente
+    preprocessar_clientes(clientes, args.arquivo, hash_arquivo or None, por_fingerprint=args.sessao_campanha)
+    
     retomar_sessao = False
     
     if sessao_existe(session_id):
@@ -211,20 +287,32 @@ def main():
     # Cria nova sessão se não existe
     if not sessao_existe(session_id):
         criar_sessao(session_id, args.arquivo, hash_arquivo, 
-                     template_nome, departamento, total_original)
+                     template_nome, departamento, total_original, dry_run=args.dry_run)
+    elif args.sessao_campanha:
+        atualizar_total_clientes(session_id, total_original)
     
     # Filtrar clientes já processados se estiver retomando
     if retomar_sessao:
-        clientes_pendentes = [
-            c for c in clientes 
-            if not cliente_ja_processado(session_id, c.get('busca', ''))
-        ]
+        clientes_pendentes = obter_store(session_id).pendentes(
+            clientes, por_fingerprint=args.sessao_campanha
+        )
         filtrados = total_original - len(clientes_pendentes)
         if filtrados > 0:
             print(f"\n✅ Pulando {filtrados} clientes já processados...")
             logging.info(f"Filtrados {filtrados} clientes já processados")
         clientes = clientes_pendentes
     
+    # Filtrar clientes que já receberam o template em outra campanha
+    # (--force reenvia para todos, inclusive quem recebeu há pouco)
+    if args.force and args.janela_dias > 0:
+        logging.warning("--force: histórico de envios ignorado, quem já recebeu o template recebe de novo")
+    recentes = enviados_recentemente(clientes, template_nome, 0 if args.force else args.janela_dias)
+    if recentes:
+        print(f"\n✅ Pulando {len(recentes)} clientes que já receberam '{template_nome}' nos últimos {args.janela_dias} dias "
+              f"(--janela-dias 0 ou --force para reenviar)...")
+        logging.warning(f"Filtrados {len(recentes)} clientes pelo histórico de envios")
+        clientes = [c for c in clientes if c['busca'] not in recentes]
+    
     total = len(clientes)
     
     if total == 0:
@@ -232,12 +320,28 @@ def main():
         logging.info("Nenhum cliente pendente para processar")
         return
     
-    # Determinar número de workers
+    # Clientes não encontrados em campanhas recentes (cache negativo)
+    modo_nao_encontrados = "pular" if args.pular_nao_encontrados else "sondar"
+    configurar_nao_encontrados(args.ttl_nao_encontrados, modo_nao_encontrados)
+    nao_encontrados = listar_nao_encontrados(clientes)
+    if nao_encontrados:
+        print(f"\n🔍 {len(nao_encontrados)} clientes não foram encontrados nos últimos {args.ttl_nao_encontrados} dias "
+              f"({'serão pulados' if args.pular_nao_encontrados else 'só uma busca rápida'}):")
+        for c, item in nao_encontrados[:20]:
+            print(f"   - {c['busca']} ({len(item.get('variacoes') or [])} variações em "
+                  f"{datetime.fromtimestamp(item['registrado_em']):%d/%m})")
+        if len(nao_encontrados) > 20:
+            print(f"   ... e mais {len(nao_encontrados) - 20}")
+        for c, item in nao_encontrados:
+            logging.info(f"Não encontrado recentemente: {c['busca']} | variações: {item.get('variacoes')}")
+    
+    # Determinar número de workers (navegadores); cada um atende `abas` workers lógicos
+    abas = args.abas or (2 if args.prefetch_aba else 1)
     if args.workers:
         num_workers = args.workers
         logging.info(f"Usando {num_workers} workers (especificado pelo usuário)")
     else:
-        num_workers = calcular_workers_ideais(total)
+        num_workers = calcular_workers_ideais(-(-total // abas))
         logging.info(f"Auto-scaling: {total} clientes → {num_workers} worker(s)")
     
     # Mostrar configuração
@@ -246,9 +350,14 @@ def main():
     print("=" * 60)
     print(f"  Arquivo.........: {args.arquivo}")
     print(f"  Total Clientes..: {total}")
-    print(f"  Workers.........: {num_workers}")
+    print(f"  Workers.........: {num_workers}"
+          + (f" x {abas} abas = {num_workers * abas} lógicos" if abas > 1 else ""))
     print(f"  Departamento....: {departamento}")
     print(f"  Template........: {template_nome}")
+    print(f"  Envios/min......: {args.envios_por_minuto:g} ({'fixo' if args.ritmo_fixo else 'adaptativo'})"
+          if args.envios_por_minuto > 0 else "  Envios/min......: sem limite")
+    print(f"  Não encontrados.: {len(nao_encontrados)} ({'pular' if args.pular_nao_encontrados else 'busca rápida'})"
+          if nao_encontrados else "  Não encontrados.: nenhum recente")
     print(f"  Dry-Run.........: {'SIM' if args.dry_run else 'NÃO'}")
     print("=" * 60)
     
@@ -265,7 +374,14 @@ def main():
         'ancoras': ancoras,
         'departamento': departamento,
         'dry_run': args.dry_run,
-        'session_id': session_id  # Para salvar progresso
+        'session_id': session_id,  # Para salvar progresso
+        'envios_por_minuto': args.envios_por_minuto,
+        'ritmo_adaptativo': not args.ritmo_fixo,
+        'perfil_por_worker': not args.perfil_temporario,
+        'reservas_aquecidas': max(0, args.reservas),
+        'abas_por_worker': abas,
+        'ttl_nao_encontrados_dias': args.ttl_nao_encontrados,
+        'modo_nao_encontrados': modo_nao_encontrados
     }
     
     # Executar em paralelo
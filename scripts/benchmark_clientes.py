@@ -0,0 +1,99 @@
+# Arquivo: scripts/benchmark_clientes.py
+# -*- coding: utf-8 -*-
+"""
+BENCHMARK: dict por cliente x registro compacto (Cliente / ListaClientes)
+
+Compara dict, Cliente e ListaClientes (bloco como enviado aos workers)
+para uma lista sintética de clientes:
+- memória ocupada pela lista (tracemalloc)
+- tamanho e tempo do pickle
+
+Referência (100k linhas): Cliente ocupa ~57% da memória do dict; o pickle
+fica do mesmo tamanho e mais lento que o do dict (ListaClientes ~1.5x,
+Cliente avulso ~3.5x), por isso os workers não recebem a lista por pickle.
+
+Uso (da raiz do projeto):
+    python scripts/benchmark_clientes.py [--linhas 100000]
+"""
+import os
+import sys
+import time
+import pickle
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cliente import Cliente, ListaClientes
+
+
+def gerar_registros(n: int) -> list:
+    """Registros parecidos com os de uma exportação real (nem toda linha tem todos os campos)."""
+    registros = []
+    for i in range(n):
+        r = {
+            'busca': f'cliente{i}@exemplo.com.br',
+            'tipo_busca': 'email',
+            'email_excel': f'cliente{i}@exemplo.com.br',
+            'telefone_excel': f'(11) 9{i:04d}-{i % 10000:04d}',
+            'nome_excel': f'CLIENTE TESTE NUMERO {i} LTDA',
+        }
+        if i % 5 == 0:
+            r['uc_excel'] = f'10/{i:07d}-{i % 10}'
+        registros.append(r)
+    return registros
+
+
+def medir(nome: str, construir) -> dict:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    lista = construir()
+    t_criar = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    dados = pickle.dumps(lista, protocol=pickle.HIGHEST_PROTOCOL)
+    t_dumps = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pickle.loads(dados)
+    t_loads = time.perf_counter() - inicio
+
+    return {
+        "nome": nome,
+        "memoria_mb": memoria / 1024 / 1024,
+        "pickle_mb": len(dados) / 1024 / 1024,
+        "criar_s": t_criar,
+        "dumps_s": t_dumps,
+        "loads_s": t_loads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da representação dos clientes.")
+    parser.add_argument("--linhas", type=int, default=100_000, help="Quantidade de clientes sintéticos.")
+    args = parser.parse_args()
+
+    registros = gerar_registros(args.linhas)
+    # As strings já existem em todos os casos: mede só o custo do contêiner
+    resultados = [
+        medir("dict", lambda: [dict(r) for r in registros]),
+        medir("Cliente", lambda: [Cliente(**r) for r in registros]),
+        medir("ListaClientes", lambda: ListaClientes(Cliente(**r) for r in registros)),
+    ]
+
+    print(f"\n{args.linhas} clientes")
+    print(f"{'Representação':<14}{'Memória MB':>12}{'Pickle MB':>11}{'Criar s':>9}{'dumps s':>9}{'loads s':>9}")
+    for r in resultados:
+        print(f"{r['nome']:<14}{r['memoria_mb']:>12.1f}{r['pickle_mb']:>11.1f}"
+              f"{r['criar_s']:>9.3f}{r['dumps_s']:>9.3f}{r['loads_s']:>9.3f}")
+
+    base = resultados[0]
+    for r in resultados[1:]:
+        print(f"{r['nome']}: memória {r['memoria_mb'] / base['memoria_mb']:.0%} do dict | "
+              f"pickle {r['pickle_mb'] / base['pickle_mb']:.0%} do dict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em memória com gravação adiada (write-behind) em arquivo JSON - AutoZoho
+
+O arquivo é lido uma única vez por processo; leituras vêm da memória e
+escritas só marcam a chave como suja. Uma thread grava as chaves sujas a
+cada `intervalo` segundos (e no encerramento do processo / descarregar()).
+
+Vários processos (workers) podem usar o mesmo arquivo:
+- a gravação é feita sob um arquivo de trava (<arquivo>.lock, criado com
+  O_EXCL; trava abandonada há mais de TRAVA_EXPIRA_SEGUNDOS é descartada)
+- sob a trava, o arquivo atual é relido e recebe só as chaves sujas deste
+  processo (merge), então um worker não apaga o que outro aprendeu
+- o arquivo novo é escrito num temporário e trocado com os.replace (atômico)
+- dentro do processo, uma gravação por vez: descarregar() explícito espera a
+  da thread terminar, em vez de disputar a trava com ela
+
+Processos de multiprocessing saem com os._exit (sem atexit): quem usa o cache
+num worker deve chamar encerrar() antes de terminar.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+
+TRAVA_EXPIRA_SEGUNDOS = 30
+TRAVA_ESPERA_MAX_SEGUNDOS = 10
+
+
+class CacheArquivoJSON:
+    """Dict persistente {chave: valor JSON} com write-behind e merge entre processos."""
+
+    def __init__(self, caminho: str, intervalo: float = 5.0, max_itens: int = None, campo_lru: str = None):
+        """
+        Args:
+            caminho: Arquivo JSON
+            intervalo: Segundos entre gravações automáticas (<= 0 = só em descarregar()/saída)
+            max_itens: Limite de itens (None = sem limite); acima dele saem os de menor campo_lru
+            campo_lru: Campo numérico dos valores usado para escolher quem sai (ex: último uso)
+        """
+        self.caminho = str(caminho)
+        self.intervalo = intervalo
+        self.max_itens = max_itens
+        self.campo_lru = campo_lru
+        self._dados = None
+        self._sujos = {}        # chave -> valor (None = removida)
+        self._pid = None
+        self._lock = None
+        self._gravando = None   # serializa descarregar() (thread x chamada explícita)
+        self._thread = None
+        self._parar = None
+
+    # --- Estado por processo (após fork, o filho recomeça do arquivo) ---
+
+    def _garantir_processo(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._gravando = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._sujos = {}
+        self._dados = self._ler_arquivo()
+        atexit.register(self.encerrar)
+
+    def _ler_arquivo(self) -> dict:
+        try:
+            if os.path.exists(self.caminho):
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+                return dados if isinstance(dados, dict) else {}
+        except Exception as e:
+            logging.warning(f"Cache {os.path.basename(self.caminho)} ilegível: {e}")
+        return {}
+
+    # --- Interface de dict ---
+
+    def get(self, chave, padrao=None):
+        self._garantir_processo()
+        return self._dados.get(chave, padrao)
+
+    def __getitem__(self, chave):
+        self._garantir_processo()
+        return self._dados[chave]
+
+    def __contains__(self, chave):
+        self._garantir_processo()
+        return chave in self._dados
+
+    def __len__(self):
+        self._garantir_processo()
+        return len(self._dados)
+
+    def definir(self, chave, valor) -> None:
+        """Grava na memória e agenda a gravação em disco."""
+        self._garantir_processo()
+        if isinstance(valor, dict):
+            valor = dict(valor)  # quem chamou pode continuar mexendo no seu dict
+        with self._lock:
+            self._dados[chave] = valor
+            self._sujos[chave] = valor
+        self._agendar()
+
+    def remover(self, chave) -> None:
+        self._garantir_processo()
+        with self._lock:
+            if self._dados.pop(chave, None) is not None:
+                self._sujos[chave] = None
+        self._agendar()
+
+    # --- Gravação ---
+
+    def _agendar(self):
+        if self.intervalo <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop_gravacao, daemon=True,
+                                        name=f"cache-{os.path.basename(self.caminho)}")
+        self._thread.start()
+
+    def _loop_gravacao(self):
+        while not self._parar.wait(self.intervalo):
+            self.descarregar()
+
+    def _travar(self) -> bool:
+        trava = self.caminho + ".lock"
+        limite = time.monotonic() + TRAVA_ESPERA_MAX_SEGUNDOS
+        while True:
+            try:
+                os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(trava) > TRAVA_EXPIRA_SEGUNDOS:
+                        os.remove(trava)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > limite:
+                    return False
+                time.sleep(0.05)
+            except OSError as e:
+                logging.debug(f"Sem trava para {self.caminho}: {e}")
+                return False
+
+    def _destravar(self):
+        try:
+            os.remove(self.caminho + ".lock")
+        except OSError:
+            pass
+
+    def _aparar(self, dados: dict) -> dict:
+        if not self.max_itens or len(dados) <= self.max_itens:
+            return dados
+        campo = self.campo_lru
+
+        def uso(chave):
+            valor = dados[chave]
+            return valor.get(campo, 0) if campo and isinstance(valor, dict) else 0
+        ordem = sorted(dados, key=uso, reverse=True)
+        return {k: dados[k] for k in ordem[:self.max_itens]}
+
+    def descarregar(self) -> bool:
+        """
+        Grava agora as chaves sujas (merge com o que está no disco) e traz para
+        a memória o que outros processos gravaram.
+
+        Returns:
+            False se não conseguiu gravar (as chaves continuam sujas)
+        """
+        if self._pid != os.getpid():
+            return True
+        with self._gravando:
+            return self._gravar_sujos()
+
+    def encerrar(self) -> bool:
+        """Para a thread de gravação (esperando a gravação em curso) e grava o que falta."""
+        if self._pid != os.getpid():
+            return True
+        self._parar.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=TRAVA_ESPERA_MAX_SEGUNDOS + 5)
+        return self.descarregar()
+
+    def _gravar_sujos(self) -> bool:
+        with self._lock:
+            if not self._sujos:
+                return True
+            sujos = dict(self._sujos)
+            self._sujos.clear()
+
+        if not self._travar():
+            self._devolver_sujos(sujos)
+            logging.warning(f"Cache {os.path.basename(self.caminho)} travado por outro processo, gravação adiada")
+            return False
+        tmp_path = f"{self.caminho}.{os.getpid()}.tmp"
+        try:
+            dados = self._ler_arquivo()
+            for chave, valor in sujos.items():
+                if valor is None:
+                    dados.pop(chave, None)
+                else:
+                    dados[chave] = valor
+            dados = self._aparar(dados)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.caminho)
+        except Exception as e:
+            logging.warning(f"Falha ao salvar cache {os.path.basename(self.caminho)}: {e}")
+            self._devolver_sujos(sujos)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        finally:
+            self._destravar()
+
+        with self._lock:
+            # Mantém o que foi alterado na memória enquanto gravava
+            for chave, valor in self._sujos.items():
+                if valor is None:
+                    dados.pop(chave, None)
+                else:
+                    dados[chave] = valor
+            self._dados = dados
+        return True
+
+    def _devolver_sujos(self, sujos: dict):
+        with self._lock:
+            for chave, valor in sujos.items():
+                self._sujos.setdefault(chave, valor)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Registro compacto de cliente - AutoZoho
+
+Substitui o dict por linha da planilha por um objeto com __slots__: sem
+__dict__ por instância, a lista ocupa cerca de 57% da memória da lista de
+dicts (scripts/benchmark_clientes.py, 100k linhas). O pickle não fica menor
+nem mais rápido que o do dict (o pickle já memoriza as chaves repetidas);
+para os workers o ganho vem de não mandar a lista (ver core/parallel.py).
+
+Mantém a interface de leitura de dict usada no projeto:
+cliente.get('busca'), cliente['tipo_busca'], 'email_excel' in cliente.
+Como no dict do carregador, 'busca' e 'tipo_busca' sempre existem (mesmo
+None); os demais campos só existem quando preenchidos.
+
+ListaClientes serializa um bloco inteiro como uma tupla de linhas: bem mais
+rápido que o pickle Cliente a Cliente, ainda um pouco mais lento que dicts.
+"""
+
+CAMPOS_CLIENTE = ("busca", "tipo_busca", "uc_excel", "email_excel", "telefone_excel", "nome_excel")
+
+# Preenchidos por core/preprocessamento.py (None = calcular na hora)
+CAMPOS_PREPROCESSADOS = ("nome_norm", "tipo_pessoa", "variacoes", "telefone_norm")
+
+_TODOS_CAMPOS = CAMPOS_CLIENTE + CAMPOS_PREPROCESSADOS
+
+# Chaves que o dict do carregador sempre tinha, mesmo com valor None
+_CAMPOS_SEMPRE_PRESENTES = ("busca", "tipo_busca")
+
+
+def _cliente_de_tupla(valores):
+    """Reconstrução usada pelo pickle (ver Cliente.__reduce__)."""
+    c = Cliente.__new__(Cliente)
+    for campo, valor in zip(_TODOS_CAMPOS, valores):
+        setattr(c, campo, valor)
+    return c
+
+
+class Cliente:
+    """Um cliente da lista. Campos ausentes ficam como None."""
+
+    __slots__ = _TODOS_CAMPOS
+
+    def __init__(self, busca=None, tipo_busca="auto", uc_excel=None,
+                 email_excel=None, telefone_excel=None, nome_excel=None):
+        self.busca = busca
+        self.tipo_busca = tipo_busca
+        self.uc_excel = uc_excel
+        self.email_excel = email_excel
+        self.telefone_excel = telefone_excel
+        self.nome_excel = nome_excel
+        self.nome_norm = None
+        self.tipo_pessoa = None
+        self.variacoes = None
+        self.telefone_norm = None
+
+    # --- Interface de dict (somente leitura + atribuição de campos conhecidos) ---
+
+    def get(self, chave, padrao=None):
+        if chave in _CAMPOS_SEMPRE_PRESENTES:
+            return getattr(self, chave)
+        valor = getattr(self, chave, None) if chave in _TODOS_CAMPOS else None
+        return padrao if valor is None else valor
+
+    def __getitem__(self, chave):
+        if chave in _CAMPOS_SEMPRE_PRESENTES:
+            return getattr(self, chave)
+        valor = getattr(self, chave, None) if chave in _TODOS_CAMPOS else None
+        if valor is None:
+            raise KeyError(chave)
+        return valor
+
+    def __setitem__(self, chave, valor):
+        if chave not in _TODOS_CAMPOS:
+            raise KeyError(chave)
+        setattr(self, chave, valor)
+
+    def __contains__(self, chave):
+        return chave in _CAMPOS_SEMPRE_PRESENTES or self.get(chave) is not None
+
+    def keys(self):
+        return [campo for campo in CAMPOS_CLIENTE
+                if campo in _CAMPOS_SEMPRE_PRESENTES or getattr(self, campo) is not None]
+
+    def to_dict(self) -> dict:
+        return {campo: getattr(self, campo) for campo in self.keys()}
+
+    def __eq__(self, outro):
+        # Compara só os dados da planilha (os pré-calculados derivam deles)
+        if isinstance(outro, Cliente):
+            return all(getattr(self, c) == getattr(outro, c) for c in CAMPOS_CLIENTE)
+        if isinstance(outro, dict):
+            return self.to_dict() == outro
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Cliente({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (_cliente_de_tupla, (tuple(getattr(self, campo) for campo in _TODOS_CAMPOS),))
+
+
+def _lista_de_linhas(linhas):
+    """Reconstrução usada pelo pickle (ver ListaClientes.__reduce__)."""
+    lista = ListaClientes()
+    novo = Cliente.__new__
+    for valores in linhas:
+        c = novo(Cliente)
+        (c.busca, c.tipo_busca, c.uc_excel, c.email_excel, c.telefone_excel, c.nome_excel,
+         c.nome_norm, c.tipo_pessoa, c.variacoes, c.telefone_norm) = valores
+        lista.append(c)
+    return lista
+
+
+class ListaClientes(list):
+    """
+    Lista de Cliente que se serializa como uma única tupla de linhas
+    (o pickle não chama __reduce__ cliente a cliente).
+    """
+
+    def __reduce__(self):
+        return (_lista_de_linhas, (tuple(
+            (c.busca, c.tipo_busca, c.uc_excel, c.email_excel, c.telefone_excel, c.nome_excel,
+             c.nome_norm, c.tipo_pessoa, c.variacoes, c.telefone_norm)
+            if isinstance(c, Cliente) else tuple(c.get(campo) for campo in _TODOS_CAMPOS)
+            for c in self
+        ),))
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+Diretório local de contatos do Zoho - AutoZoho
+
+Cópia offline dos contatos (ID/URL, nome, e-mail, telefones, UC) montada a
+partir de uma exportação de contatos do Zoho Desk (CSV/xlsx). Com ela a busca
+resolve a maior parte dos clientes sem a pesquisa global do Zoho: acha o
+contato aqui e abre a página dele direto pela URL.
+
+Índices (SQLite, cache/diretorio_contatos.db):
+- invertido: chaves exatas ('email:', 'tel:', 'uc:') e cada palavra do
+  nome ('p:', sem STOPWORDS_NOME nem palavras de menos de 3 letras) -> contatos
+- trigramas do nome -> contatos (tolera abreviação e erro de digitação)
+
+Este módulo só devolve candidatos; quem decide se um deles é o cliente é a
+busca (core/search.py), com os critérios de match dela.
+"""
+import re
+import csv
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+
+from utils.telefone import normalizar_numero
+from config.constants import STOPWORDS_NOME
+
+DIRETORIO_DIR = Path(__file__).parent.parent / "cache"
+DB_PATH = DIRETORIO_DIR / "diretorio_contatos.db"
+
+# Candidatos devolvidos por consulta (o match final é feito na busca)
+LIMITE_CANDIDATOS = 10
+
+# UC no formato da EGS (ex: 10/532723-4), também aparece no nome do contato
+_RE_UC = re.compile(r"\b\d{1,3}/\d{4,}-?\d?\b")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contatos (
+    id            TEXT PRIMARY KEY,
+    url           TEXT,
+    nome          TEXT,
+    nome_norm     TEXT,
+    email         TEXT,
+    telefones     TEXT,
+    uc            TEXT,
+    trigramas     INTEGER NOT NULL DEFAULT 0,
+    atualizado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contatos_nome ON contatos (nome_norm);
+CREATE TABLE IF NOT EXISTS termos (
+    termo      TEXT NOT NULL,
+    contato_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_termos_termo ON termos (termo);
+CREATE INDEX IF NOT EXISTS idx_termos_contato ON termos (contato_id);
+CREATE TABLE IF NOT EXISTS trigramas (
+    tri        TEXT NOT NULL,
+    contato_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trigramas_tri ON trigramas (tri);
+CREATE INDEX IF NOT EXISTS idx_trigramas_contato ON trigramas (contato_id);
+"""
+
+_lock = threading.Lock()
+
+# Nomes de coluna aceitos na exportação (português e inglês)
+_COLUNAS_EXPORTACAO = {
+    'id': ("ID DO CONTATO", "CONTACT ID", "ID"),
+    'url': ("URL", "LINK"),
+    'nome': ("NOME DO CONTATO", "NOME COMPLETO", "CONTACT NAME", "FULL NAME", "NOME"),
+    'primeiro_nome': ("PRIMEIRO NOME", "FIRST NAME"),
+    'sobrenome': ("SOBRENOME", "ÚLTIMO NOME", "LAST NAME"),
+    'email': ("E-MAIL", "EMAIL"),
+    'uc': ("INSTALAÇÃO", "INSTALACAO", "UC"),
+}
+_COLUNAS_TELEFONE = ("TELEFONE", "CELULAR", "PHONE", "MOBILE", "WHATSAPP")
+
+
+def _conectar() -> sqlite3.Connection:
+    DIRETORIO_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(str(DB_PATH), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def normalizar_texto(valor) -> str:
+    """Sem acentos, minúsculo, só letras/dígitos e espaços simples."""
+    if not valor:
+        return ""
+    nfkd = unicodedata.normalize("NFKD", str(valor)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^\w\s]", " ", nfkd).lower().split())
+
+
+def _trigramas(texto_norm: str) -> set:
+    if not texto_norm:
+        return set()
+    t = f"  {texto_norm} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+def _palavras(texto_norm: str) -> set:
+    # Mesma regra das variações da busca: "da", "de", "ltda"... teriam listas
+    # enormes no índice e não distinguem ninguém
+    return {p for p in texto_norm.split() if len(p) >= 3 and p not in STOPWORDS_NOME}
+
+
+def _chave_uc(valor) -> str:
+    digitos = re.sub(r"\D", "", str(valor or ""))
+    return f"uc:{digitos}" if len(digitos) >= 5 else ""
+
+
+def _telefones(valores) -> list:
+    telefones = []
+    for v in valores:
+        for parte in re.split(r"[;,/]", str(v or "")):
+            norm = normalizar_numero(parte)
+            if norm and norm not in telefones:
+                telefones.append(norm)
+    return telefones
+
+
+def _termos_do_contato(contato: dict, nome_norm: str) -> set:
+    termos = {f"p:{p}" for p in _palavras(nome_norm)}
+    if contato.get('email'):
+        termos.add(f"email:{contato['email'].strip().lower()}")
+    for tel in contato.get('telefones') or []:
+        termos.add(f"tel:{tel}")
+    ucs = [contato.get('uc')] + _RE_UC.findall(contato.get('nome') or "")
+    termos.update(k for k in (_chave_uc(uc) for uc in ucs) if k)
+    return termos
+
+
+def registrar_contatos(contatos, conn: sqlite3.Connection = None) -> int:
+    """
+    Insere/atualiza contatos no diretório, refazendo os índices de cada um.
+
+    Args:
+        contatos: Iterável de dicts com id, url, nome, email, telefones (lista) e uc
+        conn: Conexão já aberta (None = abre e fecha aqui)
+
+    Returns:
+        Quantidade gravada
+    """
+    agora = time.time()
+    linhas, termos, trigramas = [], [], []
+    for c in contatos:
+        contato_id = str(c.get('id') or c.get('url') or "").strip()
+        if not contato_id:
+            continue
+        nome_norm = normalizar_texto(c.get('nome'))
+        telefones = _telefones(c.get('telefones') or [])
+        tris = _trigramas(nome_norm)
+        linhas.append((contato_id, c.get('url'), c.get('nome'), nome_norm, c.get('email'),
+                       ";".join(telefones), c.get('uc'), len(tris), agora))
+        termos += [(t, contato_id) for t in _termos_do_contato(dict(c, telefones=telefones), nome_norm)]
+        trigramas += [(t, contato_id) for t in tris]
+    if not linhas:
+        return 0
+
+    fechar = conn is None
+    try:
+        with _lock:
+            conn = conn or _conectar()
+            with conn:
+                ids = [(l[0],) for l in linhas]
+                conn.executemany("DELETE FROM termos WHERE contato_id = ?", ids)
+                conn.executemany("DELETE FROM trigramas WHERE contato_id = ?", ids)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO contatos (id, url, nome, nome_norm, email, telefones, uc, "
+                    "trigramas, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas
+                )
+                conn.executemany("INSERT INTO termos VALUES (?, ?)", termos)
+                conn.executemany("INSERT INTO trigramas VALUES (?, ?)", trigramas)
+            if fechar:
+                conn.close()
+        return len(linhas)
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao gravar diretório de contatos: {e}")
+        return 0
+
+
+def remover_contato(contato_id: str) -> None:
+    """Tira do diretório um contato cuja página não abriu mais (apagado/mesclado no Zoho)."""
+    try:
+        with _lock:
+            conn = _conectar()
+            with conn:
+                for tabela in ("termos", "trigramas"):
+                    conn.execute(f"DELETE FROM {tabela} WHERE contato_id = ?", (contato_id,))
+                conn.execute("DELETE FROM contatos WHERE id = ?", (contato_id,))
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning(f"Erro ao remover contato {contato_id} do diretório: {e}")
+
+
+# --- Importação da exportação do Zoho ---
+
+def _mapear_colunas_exportacao(headers) -> dict:
+    m = {'telefones': []}
+    for i, h in enumerate(headers):
+        if not h:
+            continue
+        h_upper = str(h).upper().strip()
+        if any(x in h_upper for x in _COLUNAS_TELEFONE):
+            m['telefones'].append(i)
+            continue
+        for campo, nomes in _COLUNAS_EXPORTACAO.items():
+            if campo not in m and h_upper in nomes:
+                m[campo] = i
+                break
+    return m
+
+
+def _contato_de_linha(row, col_map) -> dict:
+    def valor(campo):
+        i = col_map.get(campo)
+        if i is None or i >= len(row) or row[i] is None:
+            return None
+        return str(row[i]).strip() or None
+
+    nome = valor('nome')
+    if not nome:
+        nome = " ".join(p for p in (valor('primeiro_nome'), valor('sobrenome')) if p) or None
+    return {
+        'id': valor('id'),
+        'url': valor('url'),
+        'nome': nome,
+        'email': valor('email'),
+        'telefones': [row[i] for i in col_map['telefones'] if i < len(row) and row[i]],
+        'uc': valor('uc'),
+    }
+
+
+def _iterar_exportacao(caminho: str):
+    if caminho.lower().endswith('.xlsx'):
+        import openpyxl
+        wb = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            sheet = wb.active
+            sheet.reset_dimensions()
+            linhas = sheet.iter_rows(values_only=True)
+            headers = next(linhas, None)
+            if headers is None:
+                return
+            col_map = _mapear_colunas_exportacao(headers)
+            for row in linhas:
+                if any(row):
+                    yield _contato_de_linha(row, col_map)
+        finally:
+            wb.close()
+    else:
+        with open(caminho, newline='', encoding='utf-8-sig') as f:
+            # Exportação do Zoho usa vírgula; planilhas do projeto usam ponto e vírgula
+            delimitador = ';' if f.readline().count(';') > 0 else ','
+            f.seek(0)
+            reader = csv.reader(f, delimiter=delimitador)
+            headers = next(reader, None)
+            if headers is None:
+                return
+            col_map = _mapear_colunas_exportacao(headers)
+            for row in reader:
+                if any(row):
+                    yield _contato_de_linha(row, col_map)
+
+
+def importar_exportacao(caminho: str, substituir: bool = False, lote: int = 5000) -> int:
+    """
+    Carrega no diretório uma exportação de contatos do Zoho (CSV ou xlsx).
+
+    Args:
+        caminho: Arquivo exportado (precisa de ID do contato ou URL em cada linha)
+        substituir: Apaga o diretório antes (senão atualiza/acrescenta)
+        lote: Contatos gravados por transação
+
+    Returns:
+        Quantidade de contatos importados
+    """
+    conn = _conectar()
+    try:
+        if substituir:
+            with conn:
+                conn.executescript("DELETE FROM termos; DELETE FROM trigramas; DELETE FROM contatos;")
+        total = 0
+        bloco = []
+        for contato in _iterar_exportacao(caminho):
+            bloco.append(contato)
+            if len(bloco) >= lote:
+                total += registrar_contatos(bloco, conn)
+                bloco = []
+        total += registrar_contatos(bloco, conn)
+    finally:
+        conn.close()
+    logging.info(f"Diretório de contatos: {total} contatos importados de {caminho}")
+    return total
+
+
+# --- Consulta ---
+
+def diretorio_disponivel() -> bool:
+    """Existe diretório com contatos?"""
+    if not DB_PATH.exists():
+        return False
+    try:
+        conn = sqlite3.connect(str(DB_PATH), timeout=30)
+        try:
+            return conn.execute("SELECT 1 FROM contatos LIMIT 1").fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+def _linhas_para_candidatos(rows, via: str, scores: dict = None) -> list:
+    return [{
+        'id': r[0], 'url': r[1], 'nome': r[2], 'email': r[3],
+        'telefones': r[4].split(";") if r[4] else [], 'uc': r[5],
+        'via': via, 'score': (scores or {}).get(r[0], 1.0),
+    } for r in rows]
+
+
+def _buscar_contatos(conn, ids) -> list:
+    ids = list(ids)
+    if not ids:
+        return []
+    marcas = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT id, url, nome, email, telefones, uc FROM contatos WHERE id IN ({marcas})", ids
+    ).fetchall()
+    ordem = {contato_id: i for i, contato_id in enumerate(ids)}
+    return sorted(rows, key=lambda r: ordem[r[0]])
+
+
+def _ids_por_termos(conn, termos: list) -> list:
+    """Contatos que têm TODOS os termos (interseção no índice invertido)."""
+    if not termos:
+        return []
+    marcas = ",".join("?" * len(termos))
+    return [r[0] for r in conn.execute(
+        f"SELECT contato_id FROM termos WHERE termo IN ({marcas}) "
+        f"GROUP BY contato_id HAVING COUNT(DISTINCT termo) = ? LIMIT ?",
+        termos + [len(termos), LIMITE_CANDIDATOS + 1]
+    )]
+
+
+def _ids_por_trigramas(conn, nome_norm: str) -> dict:
+    """Candidatos por similaridade de trigramas (Jaccard), melhores primeiro."""
+    tris = _trigramas(nome_norm)
+    if not tris:
+        return {}
+    marcas = ",".join("?" * len(tris))
+    rows = conn.execute(
+        f"SELECT t.contato_id, COUNT(*), c.trigramas FROM trigramas t "
+        f"JOIN contatos c ON c.id = t.contato_id "
+        f"WHERE t.tri IN ({marcas}) GROUP BY t.contato_id "
+        f"ORDER BY COUNT(*) DESC LIMIT ?",
+        list(tris) + [LIMITE_CANDIDATOS * 5]
+    ).fetchall()
+    scores = {cid: comuns / (len(tris) + total - comuns) for cid, comuns, total in rows}
+    melhores = sorted(scores, key=scores.get, reverse=True)[:LIMITE_CANDIDATOS]
+    return {cid: scores[cid] for cid in melhores}
+
+
+def consultar_diretorio(cliente) -> list:
+    """
+    Candidatos do diretório para um cliente da lista.
+
+    Ordem: chave exata (e-mail, telefone, UC) > todas as palavras do nome
+    (índice invertido) > trigramas do nome.
+
+    Args:
+        cliente: Cliente ou dict no formato de carregar_lista_clientes
+
+    Returns:
+        Lista de dicts (id, url, nome, email, telefones, uc, via, score);
+        vazia se não há diretório ou nada parecido
+    """
+    if not DB_PATH.exists():
+        return []
+    busca = cliente.get('busca') or ""
+    tipo = cliente.get('tipo_busca', 'auto')
+
+    chaves = []
+    email = cliente.get('email_excel') or (busca if tipo == 'email' else None)
+    if email and "@" in email:
+        chaves.append(f"email:{email.strip().lower()}")
+    telefone = cliente.get('telefone_norm') or normalizar_numero(
+        cliente.get('telefone_excel') or (busca if tipo == 'telefone' else None))
+    if telefone:
+        chaves.append(f"tel:{telefone}")
+    uc = _chave_uc(cliente.get('uc_excel') or (busca if tipo == 'uc' else None))
+    if uc:
+        chaves.append(uc)
+
+    nome = cliente.get('nome_excel') or (busca if tipo in ('nome', 'auto', 'doc') else None)
+    nome_norm = normalizar_texto(nome)
+
+    try:
+        conn = sqlite3.connect(str(DB_PATH), timeout=30)
+        try:
+            for chave in chaves:
+                ids = _ids_por_termos(conn, [chave])
+                if ids:
+                    return _linhas_para_candidatos(_buscar_contatos(conn, ids), "chave")
+            if not nome_norm:
+                return []
+            ids = _ids_por_termos(conn, sorted(f"p:{p}" for p in _palavras(nome_norm)))
+            if ids:
+                return _linhas_para_candidatos(_buscar_contatos(conn, ids), "palavras")
+            scores = _ids_por_trigramas(conn, nome_norm)
+            return _linhas_para_candidatos(_buscar_contatos(conn, scores), "trigramas", scores)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.debug(f"Diretório de contatos indisponível: {e}")
+        return []
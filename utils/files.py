@@ -6,10 +6,168 @@ import tkinter as tk
 from tkinter import filedialog
 import logging
 
+from utils.cliente import Cliente
+
+def _mapear_colunas(headers):
+    """Identifica as colunas de interesse pelo cabeçalho da planilha."""
+    m = {}
+    for i, h in enumerate(headers):
+        if not h: continue
+        h_upper = str(h).upper().strip()
+        
+        # Mapeamento com prioridades ajustadas
+        if any(x in h_upper for x in ['INSTALAÇÃO', 'INSTALACAO', 'UC']): m['uc'] = i
+        elif 'EMAIL' in h_upper or 'E-MAIL' in h_upper: m['email'] = i
+        elif any(x in h_upper for x in ['TELEFONE', 'CELULAR', 'WHATSAPP']): m['telefone'] = i
+        elif any(x in h_upper for x in ['NOME', 'CLIENTE', 'RAZÃO', 'RAZAO']): m['nome'] = i
+        elif any(x in h_upper for x in ['CNPJ', 'CPF', 'DOCUMENTO']): m['doc'] = i
+    return m
+
+
+def _cliente_de_linha_xlsx(row, col_map):
+    """Monta o registro do cliente a partir de uma linha da planilha."""
+    def valor(chave):
+        i = col_map.get(chave)
+        # Em modo read_only as linhas podem vir mais curtas que o cabeçalho
+        if i is None or i >= len(row) or not row[i]:
+            return None
+        return str(row[i]).strip()
+    
+    cli = {}
+    
+    # Extrai dados brutos (se a coluna existir)
+    val_uc = valor('uc')
+    val_email = valor('email')
+    val_tel = valor('telefone')
+    val_nome = valor('nome')
+    val_doc = valor('doc')
+    
+    # --- LÓGICA DE PRIORIDADE ---
+    # 1. UC (Instalação) - Prioridade Máxima para EGS
+    if val_uc and len(val_uc) > 5 and ('/' in val_uc or val_uc.startswith('10')):
+         cli['busca'] = val_uc
+         cli['tipo_busca'] = 'uc'
+    # 2. Email
+    elif val_email and '@' in val_email:
+        cli['busca'] = val_email
+        cli['tipo_busca'] = 'email'
+    # 3. Telefone
+    elif val_tel and len(val_tel) >= 8:
+        cli['busca'] = val_tel
+        cli['tipo_busca'] = 'telefone'
+    # 4. Nome
+    elif val_nome and len(val_nome) > 2:
+        cli['busca'] = val_nome
+        cli['tipo_busca'] = 'nome'
+    # 5. Documento
+    elif val_doc: 
+        cli['busca'] = val_doc
+        cli['tipo_busca'] = 'doc'
+    else:
+        # Se não achou nada específico, usa a primeira coluna
+        cli['busca'] = str(row[0]).strip()
+        cli['tipo_busca'] = 'auto'
+
+    # Guarda dados auxiliares para validação
+    if val_uc: cli['uc_excel'] = val_uc
+
+    # Guarda dados auxiliares para validação
+    if val_email: cli['email_excel'] = val_email
+    if val_tel: cli['telefone_excel'] = val_tel
+    if val_nome: cli['nome_excel'] = val_nome
+    
+    return Cliente(**cli)
+
+
+def _cliente_de_linha_csv(row):
+    """Monta o registro do cliente a partir de uma linha do CSV."""
+    # Normaliza chaves do CSV
+    r = {k.upper(): v for k, v in row.items() if k}
+    
+    val_email = next((v for k,v in r.items() if 'EMAIL' in k), None)
+    val_tel = next((v for k,v in r.items() if 'TEL' in k or 'CEL' in k), None)
+    val_nome = next((v for k,v in r.items() if 'NOME' in k or 'RAZ' in k), None)
+    
+    cli = {}
+    if val_email and '@' in val_email:
+        cli['busca'] = val_email
+        cli['tipo_busca'] = 'email'
+    elif val_tel:
+        cli['busca'] = val_tel
+        cli['tipo_busca'] = 'telefone'
+    elif val_nome:
+        cli['busca'] = val_nome
+        cli['tipo_busca'] = 'nome'
+    else:
+        cli['busca'] = list(row.values())[0]
+        cli['tipo_busca'] = 'auto'
+        
+    if val_email: cli['email_excel'] = val_email
+    if val_tel: cli['telefone_excel'] = val_tel
+    if val_nome: cli['nome_excel'] = val_nome
+    
+    return Cliente(**cli)
+
+
+def _iterar_linhas_xlsx(caminho_arquivo):
+    """Lê a planilha em modo streaming (read_only): uma linha por vez."""
+    wb = openpyxl.load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        sheet = wb.active
+        # Planilhas exportadas às vezes declaram dimensões erradas; ignora e lê até o fim
+        sheet.reset_dimensions()
+        linhas = sheet.iter_rows(values_only=True)
+        
+        # Lê cabeçalhos
+        headers = next(linhas, None)
+        if headers is None:
+            return
+        col_map = _mapear_colunas(headers)
+        
+        for row in linhas:
+            if not any(row): continue
+            yield _cliente_de_linha_xlsx(row, col_map)
+    finally:
+        wb.close()
+
+
+def _iterar_linhas_csv(caminho_arquivo):
+    with open(caminho_arquivo, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f, delimiter=';')
+        for row in reader:
+            yield _cliente_de_linha_csv(row)
+
+
+def iterar_clientes(caminho_arquivo):
+    """
+    Gerador: lê o arquivo de forma incremental e entrega cada Cliente assim
+    que a linha é lida (prioridade de busca: UC > Email > Telefone > Nome).
+    Duplicados (mesmo termo de busca) são descartados à medida que aparecem.
+    
+    O xlsx é lido em modo read_only (sem montar o modelo de células do
+    openpyxl). carregar_lista_clientes materializa a lista inteira de Cliente,
+    que sessão, pré-processamento e fila precisam de uma vez; o pico de
+    memória é o dessa lista, não o da planilha.
+    """
+    if caminho_arquivo.lower().endswith('.xlsx'):
+        linhas = _iterar_linhas_xlsx(caminho_arquivo)
+    elif caminho_arquivo.lower().endswith('.csv'):
+        linhas = _iterar_linhas_csv(caminho_arquivo)
+    else:
+        return
+    
+    # Remove duplicados
+    seen = set()
+    for c in linhas:
+        if c['busca'] not in seen:
+            seen.add(c['busca'])
+            yield c
+
+
 def carregar_lista_clientes(caminho_arquivo):
     """
     Lê o arquivo e define a prioridade de busca: Email > Telefone > Nome.
-    Retorna lista de dicionários completos.
+    Retorna lista de Cliente (registro compacto com interface de dict).
     """
     if not caminho_arquivo:
         root = tk.Tk()
@@ -24,119 +182,8 @@ def carregar_lista_clientes(caminho_arquivo):
         logging.warning("Nenhum arquivo selecionado.")
         return []
 
-    clientes = []
     try:
-        # Função auxiliar para identificar colunas
-        def mapear_colunas(headers):
-            m = {}
-            for i, h in enumerate(headers):
-                if not h: continue
-                h_upper = str(h).upper().strip()
-                
-                # Mapeamento com prioridades ajustadas
-                if any(x in h_upper for x in ['INSTALAÇÃO', 'INSTALACAO', 'UC']): m['uc'] = i
-                elif 'EMAIL' in h_upper or 'E-MAIL' in h_upper: m['email'] = i
-                elif any(x in h_upper for x in ['TELEFONE', 'CELULAR', 'WHATSAPP']): m['telefone'] = i
-                elif any(x in h_upper for x in ['NOME', 'CLIENTE', 'RAZÃO', 'RAZAO']): m['nome'] = i
-                elif any(x in h_upper for x in ['CNPJ', 'CPF', 'DOCUMENTO']): m['doc'] = i
-            return m
-
-        if caminho_arquivo.lower().endswith('.xlsx'):
-            wb = openpyxl.load_workbook(caminho_arquivo, data_only=True)
-            sheet = wb.active
-            
-            # Lê cabeçalhos
-            headers = [c.value for c in sheet[1]]
-            col_map = mapear_colunas(headers)
-            
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if not any(row): continue
-                
-                cli = {}
-                
-                # Extrai dados brutos (se a coluna existir)
-                val_uc = str(row[col_map['uc']]).strip() if 'uc' in col_map and row[col_map['uc']] else None
-                val_email = str(row[col_map['email']]).strip() if 'email' in col_map and row[col_map['email']] else None
-                val_tel = str(row[col_map['telefone']]).strip() if 'telefone' in col_map and row[col_map['telefone']] else None
-                val_nome = str(row[col_map['nome']]).strip() if 'nome' in col_map and row[col_map['nome']] else None
-                val_doc = str(row[col_map['doc']]).strip() if 'doc' in col_map and row[col_map['doc']] else None
-                
-                # --- LÓGICA DE PRIORIDADE ---
-                # 1. UC (Instalação) - Prioridade Máxima para EGS
-                if val_uc and len(val_uc) > 5 and ('/' in val_uc or val_uc.startswith('10')):
-                     cli['busca'] = val_uc
-                     cli['tipo_busca'] = 'uc'
-                # 2. Email
-                elif val_email and '@' in val_email:
-                    cli['busca'] = val_email
-                    cli['tipo_busca'] = 'email'
-                # 3. Telefone
-                elif val_tel and len(val_tel) >= 8:
-                    cli['busca'] = val_tel
-                    cli['tipo_busca'] = 'telefone'
-                # 4. Nome
-                elif val_nome and len(val_nome) > 2:
-                    cli['busca'] = val_nome
-                    cli['tipo_busca'] = 'nome'
-                # 5. Documento
-                elif val_doc: 
-                    cli['busca'] = val_doc
-                    cli['tipo_busca'] = 'doc'
-                else:
-                    # Se não achou nada específico, usa a primeira coluna
-                    cli['busca'] = str(row[0]).strip()
-                    cli['tipo_busca'] = 'auto'
-
-                # Guarda dados auxiliares para validação
-                if val_uc: cli['uc_excel'] = val_uc
-
-                # Guarda dados auxiliares para validação
-                if val_email: cli['email_excel'] = val_email
-                if val_tel: cli['telefone_excel'] = val_tel
-                if val_nome: cli['nome_excel'] = val_nome
-                
-                clientes.append(cli)
-
-        elif caminho_arquivo.lower().endswith('.csv'):
-            with open(caminho_arquivo, newline='', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f, delimiter=';')
-                for row in reader:
-                    # Normaliza chaves do CSV
-                    r = {k.upper(): v for k, v in row.items() if k}
-                    
-                    val_email = next((v for k,v in r.items() if 'EMAIL' in k), None)
-                    val_tel = next((v for k,v in r.items() if 'TEL' in k or 'CEL' in k), None)
-                    val_nome = next((v for k,v in r.items() if 'NOME' in k or 'RAZ' in k), None)
-                    
-                    cli = {}
-                    if val_email and '@' in val_email:
-                        cli['busca'] = val_email
-                        cli['tipo_busca'] = 'email'
-                    elif val_tel:
-                        cli['busca'] = val_tel
-                        cli['tipo_busca'] = 'telefone'
-                    elif val_nome:
-                        cli['busca'] = val_nome
-                        cli['tipo_busca'] = 'nome'
-                    else:
-                        cli['busca'] = list(row.values())[0]
-                        cli['tipo_busca'] = 'auto'
-                        
-                    if val_email: cli['email_excel'] = val_email
-                    if val_tel: cli['telefone_excel'] = val_tel
-                    if val_nome: cli['nome_excel'] = val_nome
-                    
-                    clientes.append(cli)
-
-        # Remove duplicados
-        seen = set()
-        unicos = []
-        for c in clientes:
-            if c['busca'] not in seen:
-                unicos.append(c)
-                seen.add(c['busca'])
-        return unicos
-
+        return list(iterar_clientes(caminho_arquivo))
     except Exception as e:
         logging.error(f"Erro ao ler arquivo: {e}")
         return []
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico de envios entre campanhas - AutoZoho
+
+Registro persistente e indexado de (contato normalizado, telefone, template,
+data) de todos os envios com sucesso, independente da sessão/arquivo.
+
+Permite responder em uma única consulta, para a lista inteira:
+"este cliente já recebeu este template nos últimos N dias?"
+evitando gastar crédito e tempo de navegador com quem outra campanha já cobriu.
+
+Armazenado em sessions/historico_envios.db (SQLite, WAL).
+"""
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from datetime import datetime
+
+from utils.session import SESSIONS_DIR
+from utils.telefone import normalizar_numero
+
+DB_PATH = SESSIONS_DIR / "historico_envios.db"
+
+# Janela padrão para considerar um envio como recente (0 = desativado)
+JANELA_DEDUPE_DIAS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS envios (
+    contato    TEXT NOT NULL,
+    telefone   TEXT,
+    template   TEXT NOT NULL,
+    enviado_em REAL NOT NULL,
+    session_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_envios_contato ON envios (template, contato, enviado_em);
+CREATE INDEX IF NOT EXISTS idx_envios_telefone ON envios (template, telefone, enviado_em);
+"""
+
+_lock = threading.Lock()
+
+# Uma conexão por processo (após fork o filho abre a sua); usar sob _lock
+_conn = None
+_conn_pid = None
+
+
+def _conectar() -> sqlite3.Connection:
+    global _conn, _conn_pid
+    if _conn is not None and _conn_pid == os.getpid():
+        return _conn
+    SESSIONS_DIR.mkdir(exist_ok=True)
+    novo = not DB_PATH.exists()
+    conn = sqlite3.connect(str(DB_PATH), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    if novo:
+        _importar_sessoes_existentes(conn)
+    _conn, _conn_pid = conn, os.getpid()
+    return conn
+
+
+def normalizar_contato(valor) -> str:
+    """
+    Chave estável para um contato, independente de formatação:
+    - e-mail: minúsculo, sem espaços
+    - número (telefone/UC/documento): apenas dígitos
+    - nome: sem acentos, minúsculo, espaços simples
+    """
+    if not valor:
+        return ""
+    texto = str(valor).strip()
+    if "@" in texto:
+        return texto.lower().replace(" ", "")
+    digitos = re.sub(r"\D", "", texto)
+    if digitos and len(digitos) >= len(re.sub(r"[\W_]", "", texto)) * 0.8:
+        return digitos
+    nfkd = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^\w\s]", " ", nfkd).lower().split())
+
+
+def _normalizar_telefone(valor) -> str:
+    if not valor:
+        return None
+    return normalizar_numero(valor) or re.sub(r"\D", "", str(valor)) or None
+
+
+def registrar_envios(registros: list, template: str, session_id: str = None) -> int:
+    """
+    Registra envios com sucesso.
+
+    Args:
+        registros: Lista de tuplas (contato, telefone) — telefone pode ser None
+        template: Nome do template enviado
+        session_id: Sessão de origem (informativo)
+
+    Returns:
+        Quantidade registrada
+    """
+    agora = time.time()
+    linhas = [
+        (normalizar_contato(contato), _normalizar_telefone(telefone), template, agora, session_id)
+        for contato, telefone in registros if contato
+    ]
+    if not linhas:
+        return 0
+    try:
+        with _lock:
+            conn = _conectar()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO envios (contato, telefone, template, enviado_em, session_id) "
+                    "VALUES (?, ?, ?, ?, ?)", linhas
+                )
+        return len(linhas)
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao registrar histórico de envios: {e}")
+        return 0
+
+
+def registrar_envio(contato: str, template: str, telefone: str = None, session_id: str = None) -> bool:
+    """Registra um envio com sucesso."""
+    return registrar_envios([(contato, telefone)], template, session_id) == 1
+
+
+def enviados_recentemente(clientes: list, template: str, dias: int = JANELA_DEDUPE_DIAS) -> dict:
+    """
+    Verifica, em uma única consulta, quais clientes da lista já receberam o
+    template dentro da janela (por contato normalizado ou por telefone).
+
+    Args:
+        clientes: Lista de dicts no formato de carregar_lista_clientes
+        template: Nome do template
+        dias: Tamanho da janela em dias (<= 0 desativa)
+
+    Returns:
+        dict {busca: datetime do último envio}
+    """
+    if dias <= 0 or not clientes:
+        return {}
+
+    limite = time.time() - dias * 86400
+    chaves = []
+    for c in clientes:
+        busca = c.get('busca')
+        if not busca:
+            continue
+        telefone = c.get('telefone_norm') or _normalizar_telefone(c.get('telefone_excel'))
+        chaves.append((busca, normalizar_contato(busca), telefone))
+
+    try:
+        with _lock:
+            conn = _conectar()
+            conn.execute("DROP TABLE IF EXISTS temp.consulta")
+            conn.execute("CREATE TEMP TABLE consulta (busca TEXT, contato TEXT, telefone TEXT)")
+            conn.executemany("INSERT INTO consulta VALUES (?, ?, ?)", chaves)
+            rows = conn.execute(
+                """
+                SELECT q.busca, MAX(e.enviado_em)
+                FROM consulta q
+                JOIN envios e
+                  ON e.template = ?
+                 AND e.enviado_em >= ?
+                 AND (e.contato = q.contato OR (q.telefone IS NOT NULL AND e.telefone = q.telefone))
+                GROUP BY q.busca
+                """,
+                (template, limite)
+            ).fetchall()
+            conn.execute("DROP TABLE temp.consulta")
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar histórico de envios: {e}")
+        return {}
+
+    return {busca: datetime.fromtimestamp(ts) for busca, ts in rows}
+
+
+def _importar_sessoes_existentes(conn: sqlite3.Connection) -> None:
+    """
+    Na criação do histórico (primeira consulta ou primeiro registro), aproveita
+    os SUCESSOs já gravados nas sessões do backend ativo. Sessões marcadas como
+    dry_run ficam de fora: o SUCESSO delas não foi um envio.
+    """
+    from utils.session import carregar_sessao, listar_sessoes_ativas
+
+    linhas = []
+    for resumo in listar_sessoes_ativas():
+        sessao = carregar_sessao(resumo["id"])
+        if not sessao or not sessao.get("template") or sessao.get("dry_run"):
+            continue
+        for cliente, dados in sessao.get("processados", {}).items():
+            if dados.get("status") != "SUCESSO":
+                continue
+            try:
+                ts = datetime.fromisoformat(dados["timestamp"]).timestamp()
+            except (KeyError, ValueError):
+                continue
+            linhas.append((normalizar_contato(cliente), None, sessao["template"], ts, sessao.get("session_id")))
+
+    if linhas:
+        with conn:
+            conn.executemany(
+                "INSERT INTO envios (contato, telefone, template, enviado_em, session_id) "
+                "VALUES (?, ?, ?, ?, ?)", linhas
+            )
+        logging.info(f"Histórico de envios iniciado com {len(linhas)} envios de sessões anteriores")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Limitador de envios (token bucket) compartilhado entre processos - AutoZoho
+
+Substitui as pausas fixas por worker (60s a cada 20 clientes) por um único
+balde de fichas para a frota inteira:
+- o balde reabastece continuamente a `envios_por_minuto / 60` fichas por segundo
+- cada envio consome uma ficha; sem ficha, o worker espera só o necessário
+- `rajada` limita quantos envios podem sair em sequência após um período ocioso
+
+O estado fica em multiprocessing.Value + Lock, então o mesmo objeto pode ser
+passado nos args do Process (fork ou spawn) e todos os workers disputam as
+mesmas fichas.
+
+ControladorAIMD ajusta essa taxa em tempo real pela saúde observada do Zoho.
+"""
+import time
+import logging
+import multiprocessing
+
+from config.constants import (
+    ENVIOS_POR_MINUTO, ENVIOS_RAJADA,
+    AIMD_ENVIOS_MIN, AIMD_ENVIOS_MAX, AIMD_INCREMENTO, AIMD_FATOR_REDUCAO,
+    AIMD_JANELA, AIMD_LATENCIA_BUSCA_ALVO
+)
+
+
+class LimitadorEnvios:
+    """Token bucket entre processos. envios_por_minuto <= 0 desativa."""
+
+    def __init__(self, envios_por_minuto: float = ENVIOS_POR_MINUTO, rajada: int = ENVIOS_RAJADA):
+        self._lock = multiprocessing.Lock()
+        self._taxa = multiprocessing.Value('d', max(0.0, envios_por_minuto) / 60, lock=False)
+        self._capacidade = multiprocessing.Value('d', float(max(1, rajada)), lock=False)
+        self._fichas = multiprocessing.Value('d', float(max(1, rajada)), lock=False)
+        # time.monotonic() é o mesmo relógio do sistema para todos os processos
+        self._ultimo = multiprocessing.Value('d', time.monotonic(), lock=False)
+
+    @property
+    def envios_por_minuto(self) -> float:
+        return self._taxa.value * 60
+
+    def ajustar_taxa(self, envios_por_minuto: float) -> None:
+        """Muda a taxa da frota inteira (vale para todos os processos)."""
+        with self._lock:
+            self._reabastecer(time.monotonic())
+            self._taxa.value = max(0.0, envios_por_minuto) / 60
+
+    def _reabastecer(self, agora: float) -> None:
+        decorrido = max(0.0, agora - self._ultimo.value)
+        self._fichas.value = min(self._capacidade.value, self._fichas.value + decorrido * self._taxa.value)
+        self._ultimo.value = agora
+
+    def adquirir(self, timeout: float = None) -> float:
+        """
+        Bloqueia até conseguir uma ficha.
+
+        Args:
+            timeout: Espera máxima em segundos (None = sem limite)
+
+        Returns:
+            Segundos esperados, ou -1 se estourou o timeout
+        """
+        inicio = time.monotonic()
+        while True:
+            with self._lock:
+                if self._taxa.value <= 0:
+                    return 0.0
+                agora = time.monotonic()
+                self._reabastecer(agora)
+                if self._fichas.value >= 1:
+                    self._fichas.value -= 1
+                    return agora - inicio
+                espera = (1 - self._fichas.value) / self._taxa.value
+
+            if timeout is not None:
+                restante = timeout - (time.monotonic() - inicio)
+                if restante <= 0:
+                    return -1
+                espera = min(espera, restante)
+            # Acorda pelo menos a cada segundo: a taxa pode ter sido ajustada
+            time.sleep(min(espera, 1.0))
+
+
+def aguardar_vez_de_enviar(limitador: LimitadorEnvios, logger=logging) -> None:
+    """Pega uma ficha antes do envio, registrando no log esperas longas."""
+    if limitador is None:
+        return
+    esperado = limitador.adquirir()
+    if esperado >= 1:
+        logger.info(f"Limitador de envios: aguardou {esperado:.1f}s "
+                    f"({limitador.envios_por_minuto:.0f} envios/min na frota)")
+
+
+class ControladorAIMD:
+    """
+    Ajusta a taxa do LimitadorEnvios pelo que a frota observa no Zoho
+    (aumento aditivo / redução multiplicativa, como o controle de congestionamento do TCP).
+
+    Cada worker chama registrar() depois de cada cliente. A cada AIMD_JANELA
+    observações (somando todos os processos) o controlador decide:
+    - houve timeout de busca, modal que não abriu ou erro de driver, ou a
+      tempo médio até os resultados da busca passou do alvo -> taxa * AIMD_FATOR_REDUCAO
+    - tudo saudável -> taxa + AIMD_INCREMENTO
+    sempre dentro de [AIMD_ENVIOS_MIN, AIMD_ENVIOS_MAX].
+    """
+
+    def __init__(self, limitador: LimitadorEnvios,
+                 envios_min: float = AIMD_ENVIOS_MIN, envios_max: float = AIMD_ENVIOS_MAX,
+                 incremento: float = AIMD_INCREMENTO, fator_reducao: float = AIMD_FATOR_REDUCAO,
+                 janela: int = AIMD_JANELA, latencia_alvo: float = AIMD_LATENCIA_BUSCA_ALVO):
+        self.limitador = limitador
+        self.envios_min = envios_min
+        self.envios_max = max(envios_max, limitador.envios_por_minuto)
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.janela = max(1, janela)
+        self.latencia_alvo = latencia_alvo
+        self._lock = multiprocessing.Lock()
+        self._observacoes = multiprocessing.Value('i', 0, lock=False)
+        self._com_latencia = multiprocessing.Value('i', 0, lock=False)
+        self._soma_latencia = multiprocessing.Value('d', 0.0, lock=False)
+        self._falhas = multiprocessing.Value('i', 0, lock=False)
+
+    def registrar(self, latencia_busca: float = None, falhas: int = 0, logger=logging) -> None:
+        """
+        Registra o resultado de um cliente.
+
+        Args:
+            latencia_busca: Tempo médio do Enter até os resultados de cada variação,
+                em segundos (None se nenhuma variação foi digitada)
+            falhas: Sinais de degradação (timeouts de busca, modal que não abriu, erro de driver)
+        """
+        if self.limitador.envios_por_minuto <= 0:
+            return
+        with self._lock:
+            self._observacoes.value += 1
+            if latencia_busca is not None:
+                self._com_latencia.value += 1
+                self._soma_latencia.value += latencia_busca
+            self._falhas.value += falhas
+            if self._observacoes.value < self.janela:
+                return
+
+            latencia_media = (self._soma_latencia.value / self._com_latencia.value
+                              if self._com_latencia.value else 0.0)
+            qtd_falhas = self._falhas.value
+            observadas = self._observacoes.value
+            self._observacoes.value = self._com_latencia.value = self._falhas.value = 0
+            self._soma_latencia.value = 0.0
+
+            atual = self.limitador.envios_por_minuto
+            if qtd_falhas or latencia_media > self.latencia_alvo:
+                nova = max(self.envios_min, atual * self.fator_reducao)
+            else:
+                nova = min(self.envios_max, atual + self.incremento)
+            if nova != atual:
+                self.limitador.ajustar_taxa(nova)
+
+        if nova != atual:
+            logger.info(f"Ritmo AIMD: {atual:.1f} -> {nova:.1f} envios/min "
+                        f"(busca média {latencia_media:.1f}s, falhas {qtd_falhas} em {observadas} clientes)")
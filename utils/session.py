@@ -4,17 +4,27 @@ Módulo de Gerenciamento de Sessões - AutoZoho
 
 Permite retomar execuções interrompidas, identificando campanhas únicas
 através de hash do arquivo + template + departamento.
+
+Modo campanha (alternativo): a sessão é identificada por lista + template +
+departamento e cada cliente guarda a impressão digital (fingerprint) da sua
+linha; editar a planilha só torna pendentes as linhas novas ou alteradas.
+
+A persistência fica num backend escolhido por AUTOZOHO_SESSION_BACKEND:
+- json (padrão): snapshot + journal por sessão (utils/session_json.py)
+- sqlite: banco WAL compartilhado (utils/session_sqlite.py)
+As funções públicas daqui delegam para obter_backend().
 """
 import os
-import json
 import hashlib
 import logging
-from datetime import datetime
 from pathlib import Path
 
 # Diretório onde as sessões são armazenadas
 SESSIONS_DIR = Path(__file__).parent.parent / "sessions"
 
+# Backend de persistência: "json" ou "sqlite"
+SESSION_BACKEND = os.environ.get("AUTOZOHO_SESSION_BACKEND", "json").strip().lower()
+
 
 def gerar_hash_arquivo(caminho_arquivo: str) -> str:
     """
@@ -48,64 +58,96 @@ def gerar_session_id(hash_arquivo: str, template: str, departamento: str) -> str
     return hashlib.md5(combo.encode()).hexdigest()[:12]
 
 
-def get_session_path(session_id: str) -> Path:
-    """Retorna o caminho do arquivo de sessão."""
-    return SESSIONS_DIR / f"session_{session_id}.json"
+# Campos do registro de cliente (carregar_lista_clientes) que compõem o fingerprint
+CAMPOS_FINGERPRINT = ("busca", "tipo_busca", "uc_excel", "email_excel", "telefone_excel", "nome_excel")
+
+
+def gerar_fingerprint_cliente(cliente: dict) -> str:
+    """
+    Gera um hash curto do registro normalizado de um cliente.
+    Espaços e caixa não contam como alteração.
+    """
+    partes = []
+    for campo in CAMPOS_FINGERPRINT:
+        valor = cliente.get(campo)
+        partes.append(" ".join(str(valor).split()).lower() if valor else "")
+    return hashlib.md5("\x1f".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+def caminho_lista_normalizado(caminho_arquivo: str) -> str:
+    """Caminho absoluto da lista, comparável entre execuções (identifica a lista sem ler o arquivo)."""
+    return os.path.normcase(str(Path(caminho_arquivo).resolve()))
+
+
+def gerar_session_id_campanha(caminho_arquivo: str, template: str, departamento: str) -> str:
+    """
+    Gera o ID da sessão pela campanha (caminho da lista + template + departamento),
+    sem ler o conteúdo do arquivo. Usado com o fingerprint por linha.
+    """
+    combo = f"campanha:{caminho_lista_normalizado(caminho_arquivo)}:{template}:{departamento}"
+    return hashlib.md5(combo.encode()).hexdigest()[:12]
+
+
+def filtrar_pendentes(processados: dict, clientes: list, status_concluidos=None,
+                      por_fingerprint: bool = False) -> list:
+    """
+    Retorna os clientes que ainda não constam como concluídos em `processados`.
+    Com por_fingerprint, um cliente concluído cuja linha mudou (fingerprint
+    diferente do gravado) também volta a ser pendente.
+    """
+    concluidos = set(status_concluidos) if status_concluidos is not None else None
+    return [c for c in clientes
+            if registro_pendente(processados.get(c.get('busca', '')), c, concluidos, por_fingerprint)]
+
+
+def registro_pendente(dados: dict, cliente: dict, status_concluidos=None,
+                      por_fingerprint: bool = False) -> bool:
+    """Regra de filtrar_pendentes para um cliente e o seu registro na sessão (ou None)."""
+    if dados is None:
+        return True
+    if status_concluidos is not None and dados.get("status") not in status_concluidos:
+        return True
+    return bool(por_fingerprint and dados.get("fp") and dados["fp"] != gerar_fingerprint_cliente(cliente))
+
+
+# ---------- Persistência (delegada ao backend) ----------
+
+def obter_backend():
+    """Módulo que implementa a persistência das sessões (AUTOZOHO_SESSION_BACKEND)."""
+    if SESSION_BACKEND == "sqlite":
+        from utils import session_sqlite
+        return session_sqlite
+    from utils import session_json
+    return session_json
 
 
 def sessao_existe(session_id: str) -> bool:
     """Verifica se uma sessão existe."""
-    return get_session_path(session_id).exists()
+    return obter_backend().sessao_existe(session_id)
 
 
 def carregar_sessao(session_id: str) -> dict:
     """
-    Carrega uma sessão existente do disco.
+    Carrega uma sessão existente.
     
     Returns:
         dict com dados da sessão ou None se não existir
     """
-    session_path = get_session_path(session_id)
-    
-    if not session_path.exists():
-        return None
-    
-    try:
-        with open(session_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        logging.error(f"Erro ao carregar sessão {session_id}: {e}")
-        return None
+    return obter_backend().carregar_sessao(session_id)
 
 
-def criar_sessao(session_id: str, arquivo: str, hash_arquivo: str, 
-                 template: str, departamento: str, total_clientes: int) -> dict:
+def criar_sessao(session_id: str, arquivo: str, hash_arquivo: str,
+                 template: str, departamento: str, total_clientes: int,
+                 dry_run: bool = False) -> dict:
     """
-    Cria uma nova sessão e salva no disco.
+    Cria uma nova sessão (substitui qualquer progresso anterior com o mesmo ID).
+    dry_run marca a sessão como simulação: os SUCESSOs dela não são envios reais.
     """
-    # Garante que o diretório existe
-    SESSIONS_DIR.mkdir(exist_ok=True)
-    
-    sessao = {
-        "session_id": session_id,
-        "arquivo": os.path.basename(arquivo),
-        "arquivo_path": arquivo,
-        "hash": hash_arquivo,
-        "template": template,
-        "departamento": departamento,
-        "iniciado_em": datetime.now().isoformat(),
-        "atualizado_em": datetime.now().isoformat(),
-        "total_clientes": total_clientes,
-        "processados": {}
-    }
-    
-    _salvar_sessao(session_id, sessao)
-    logging.info(f"Nova sessão criada: {session_id}")
-    
-    return sessao
+    return obter_backend().criar_sessao(session_id, arquivo, hash_arquivo,
+                                        template, departamento, total_clientes, dry_run)
 
 
-def salvar_progresso(session_id: str, cliente: str, status: str) -> bool:
+def salvar_progresso(session_id: str, cliente: str, status: str, fingerprint: str = None) -> bool:
     """
     Salva o progresso de um cliente na sessão.
     
@@ -113,128 +155,71 @@ def salvar_progresso(session_id: str, cliente: str, status: str) -> bool:
         session_id: ID da sessão
         cliente: Termo de busca do cliente
         status: SUCESSO, NAO_ENCONTRADO, ERRO
+        fingerprint: Hash da linha do cliente (gerar_fingerprint_cliente)
     
     Returns:
         True se salvou com sucesso
     """
-    sessao = carregar_sessao(session_id)
-    
-    if not sessao:
-        logging.error(f"Sessão {session_id} não encontrada para salvar progresso")
-        return False
-    
-    sessao["processados"][cliente] = {
-        "status": status,
-        "timestamp": datetime.now().isoformat()
-    }
-    sessao["atualizado_em"] = datetime.now().isoformat()
-    
-    return _salvar_sessao(session_id, sessao)
+    return obter_backend().salvar_progresso(session_id, cliente, status, fingerprint)
 
 
-def cliente_ja_processado(session_id: str, cliente: str) -> bool:
-    """
-    Verifica se um cliente já foi processado na sessão.
+def salvar_progresso_lote(session_id: str, registros: list) -> bool:
     """
-    sessao = carregar_sessao(session_id)
-    
-    if not sessao:
-        return False
+    Salva o progresso de vários clientes de uma vez.
     
-    return cliente in sessao.get("processados", {})
+    Args:
+        session_id: ID da sessão
+        registros: Lista de tuplas (cliente, status) ou (cliente, status, fingerprint),
+                   em ordem cronológica
+    """
+    return obter_backend().salvar_progresso_lote(session_id, registros)
+
+
+def compactar_sessao(session_id: str) -> bool:
+    """Consolida o progresso pendente da sessão no armazenamento principal."""
+    return obter_backend().compactar_sessao(session_id)
+
+
+def atualizar_total_clientes(session_id: str, total_clientes: int) -> bool:
+    """Atualiza o total de clientes da sessão (modo campanha)."""
+    return obter_backend().atualizar_total_clientes(session_id, total_clientes)
+
+
+def cliente_ja_processado(session_id: str, cliente: str) -> bool:
+    """Verifica se um cliente já foi processado na sessão."""
+    return obter_backend().cliente_ja_processado(session_id, cliente)
 
 
 def obter_status_cliente(session_id: str, cliente: str) -> str:
-    """
-    Retorna o status de processamento de um cliente.
-    """
-    sessao = carregar_sessao(session_id)
-    
-    if not sessao:
-        return None
-    
-    proc = sessao.get("processados", {}).get(cliente)
-    return proc.get("status") if proc else None
+    """Retorna o status de processamento de um cliente."""
+    return obter_backend().obter_status_cliente(session_id, cliente)
 
 
 def contar_processados(session_id: str) -> dict:
-    """
-    Retorna contagem de clientes por status.
-    """
-    sessao = carregar_sessao(session_id)
-    
-    if not sessao:
-        return {"SUCESSO": 0, "NAO_ENCONTRADO": 0, "ERRO": 0}
-    
-    contagem = {"SUCESSO": 0, "NAO_ENCONTRADO": 0, "ERRO": 0}
-    
-    for cliente, dados in sessao.get("processados", {}).items():
-        status = dados.get("status", "ERRO")
-        if status in contagem:
-            contagem[status] += 1
-    
-    return contagem
+    """Retorna contagem de clientes por status."""
+    return obter_backend().contar_processados(session_id)
+
+
+def obter_store(session_id: str):
+    """Store da sessão (status, registro, pendentes, registrar) do backend ativo."""
+    return obter_backend().obter_store(session_id)
 
 
 def apagar_sessao(session_id: str) -> bool:
-    """
-    Remove uma sessão do disco.
-    """
-    session_path = get_session_path(session_id)
-    
-    try:
-        if session_path.exists():
-            session_path.unlink()
-            logging.info(f"Sessão {session_id} removida")
-        return True
-    except Exception as e:
-        logging.error(f"Erro ao remover sessão {session_id}: {e}")
-        return False
+    """Remove uma sessão e todo o seu progresso."""
+    return obter_backend().apagar_sessao(session_id)
 
 
 def listar_sessoes_ativas() -> list:
-    """
-    Lista todas as sessões no diretório.
-    """
-    if not SESSIONS_DIR.exists():
-        return []
-    
-    sessoes = []
-    for f in SESSIONS_DIR.glob("session_*.json"):
-        try:
-            with open(f, 'r', encoding='utf-8') as fp:
-                data = json.load(fp)
-                contagem = contar_processados(data["session_id"])
-                sessoes.append({
-                    "id": data["session_id"],
-                    "arquivo": data.get("arquivo", "?"),
-                    "template": data.get("template", "?"),
-                    "departamento": data.get("departamento", "?"),
-                    "iniciado_em": data.get("iniciado_em", "?"),
-                    "total": data.get("total_clientes", 0),
-                    "processados": sum(contagem.values()),
-                    "sucesso": contagem["SUCESSO"]
-                })
-        except Exception as e:
-            logging.warning(f"Erro ao ler sessão {f.name}: {e}")
-    
-    return sessoes
+    """Lista todas as sessões com seus contadores."""
+    return obter_backend().listar_sessoes_ativas()
 
 
-def _salvar_sessao(session_id: str, sessao: dict) -> bool:
-    """
-    Função interna para salvar sessão no disco.
-    """
-    session_path = get_session_path(session_id)
-    
-    try:
-        SESSIONS_DIR.mkdir(exist_ok=True)
-        with open(session_path, 'w', encoding='utf-8') as f:
-            json.dump(sessao, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        logging.error(f"Erro ao salvar sessão {session_id}: {e}")
-        return False
+def descarregar_catalogo() -> None:
+    """Grava as atualizações pendentes do índice de sessões deste processo (backend JSON)."""
+    descarregar = getattr(obter_backend(), "descarregar_catalogo", None)
+    if descarregar is not None:
+        descarregar()
 
 
 def resumo_sessao(session_id: str) -> str:
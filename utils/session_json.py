@@ -0,0 +1,713 @@
+# -*- coding: utf-8 -*-
+"""
+Backend JSON do gerenciamento de sessões - AutoZoho (padrão)
+
+Implementa a API de persistência de utils/session.py em arquivos:
+- session_<id>.json  -> snapshot compactado (cabeçalho + processados)
+- session_<id>.jsonl -> journal append-only, uma linha por mudança de status
+
+O estado é reconstruído no carregamento (snapshot + replay do journal) e o
+journal é compactado no snapshot periodicamente.
+
+sessions/catalogo.json guarda o cabeçalho e os contadores de cada sessão;
+listar sessões lê só esse índice (e um stat por sessão para detectar entradas
+desatualizadas). Cada entrada traz a assinatura dos arquivos tirada antes de
+contar, então vale por si só: gravação perdida (processos concorrentes,
+processo que saiu sem gravar o catálogo) só faz a entrada ser recontada.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from utils.session import SESSIONS_DIR, filtrar_pendentes
+
+# Compacta o journal no snapshot quando ele passar deste tamanho (~2.500 registros)
+JOURNAL_COMPACTAR_BYTES = 256 * 1024
+
+# Arquivo de compactação mais antigo que isso é considerado resto de um crash
+COMPACTACAO_ORFA_SEGUNDOS = 60
+
+# Índice com o resumo de todas as sessões
+CATALOGO_PATH = SESSIONS_DIR / "catalogo.json"
+
+# Progresso chega ao catálogo no máximo a cada N segundos por processo (e na saída)
+CATALOGO_INTERVALO_SEGUNDOS = 5
+
+
+def get_session_path(session_id: str) -> Path:
+    """Retorna o caminho do arquivo de sessão."""
+    return SESSIONS_DIR / f"session_{session_id}.json"
+
+
+def get_journal_path(session_id: str) -> Path:
+    """Retorna o caminho do journal de progresso da sessão."""
+    return SESSIONS_DIR / f"session_{session_id}.jsonl"
+
+
+def _get_compactando_path(session_id: str) -> Path:
+    """Journal congelado durante uma compactação em andamento."""
+    return SESSIONS_DIR / f"session_{session_id}.jsonl.compactando"
+
+
+def sessao_existe(session_id: str) -> bool:
+    """Verifica se uma sessão existe."""
+    return get_session_path(session_id).exists()
+
+
+def carregar_sessao(session_id: str) -> dict:
+    """
+    Carrega uma sessão existente do disco.
+    Lê o snapshot e aplica os registros do journal por cima.
+    
+    Returns:
+        dict com dados da sessão ou None se não existir
+    """
+    sessao = _carregar_snapshot(session_id)
+    
+    if sessao is None:
+        return None
+    
+    # Ordem importa: o journal congelado é sempre anterior ao journal ativo
+    _aplicar_journal(sessao, _get_compactando_path(session_id))
+    _aplicar_journal(sessao, get_journal_path(session_id))
+    return sessao
+
+
+def _carregar_snapshot(session_id: str) -> dict:
+    """Lê apenas o snapshot (sem replay do journal)."""
+    session_path = get_session_path(session_id)
+    
+    if not session_path.exists():
+        return None
+    
+    try:
+        with open(session_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"Erro ao carregar sessão {session_id}: {e}")
+        return None
+
+
+def _aplicar_journal(sessao: dict, journal_path: Path) -> int:
+    """
+    Aplica os registros de um journal sobre a sessão (último registro vence).
+    
+    Returns:
+        Quantidade de registros aplicados
+    """
+    registros, _ = _ler_journal(journal_path)
+    _aplicar_registros(sessao, registros)
+    return len(registros)
+
+
+def _ler_journal(journal_path: Path, offset: int = 0) -> tuple:
+    """
+    Lê os registros completos de um journal a partir de um offset em bytes.
+    Linhas truncadas (ex: processo morto no meio da escrita) são ignoradas e
+    uma linha final ainda sem '\\n' fica para a próxima leitura.
+    
+    Returns:
+        (lista de registros, offset após a última linha completa)
+    """
+    registros = []
+    try:
+        with open(journal_path, 'rb') as f:
+            f.seek(offset)
+            dados = f.read()
+    except FileNotFoundError:
+        return registros, offset
+    except Exception as e:
+        logging.error(f"Erro ao ler journal {journal_path.name}: {e}")
+        return registros, offset
+    
+    fim = dados.rfind(b"\n") + 1
+    for linha in dados[:fim].splitlines():
+        try:
+            reg = json.loads(linha.decode('utf-8'))
+            registros.append((reg["cliente"], reg["status"], reg["timestamp"], reg.get("fp")))
+        except (ValueError, KeyError, TypeError):
+            logging.debug(f"Linha inválida ignorada em {journal_path.name}")
+    
+    return registros, offset + fim
+
+
+def _aplicar_registros(sessao: dict, registros: list) -> None:
+    """Aplica registros (cliente, status, timestamp, fp) em ordem sobre a sessão."""
+    processados = sessao.setdefault("processados", {})
+    for cliente, status, timestamp, fp in registros:
+        dados = {"status": status, "timestamp": timestamp}
+        if fp:
+            dados["fp"] = fp
+        processados[cliente] = dados
+        sessao["atualizado_em"] = timestamp
+
+
+def criar_sessao(session_id: str, arquivo: str, hash_arquivo: str, 
+                 template: str, departamento: str, total_clientes: int,
+                 dry_run: bool = False) -> dict:
+    """
+    Cria uma nova sessão e salva no disco.
+    """
+    # Garante que o diretório existe
+    SESSIONS_DIR.mkdir(exist_ok=True)
+    
+    sessao = {
+        "session_id": session_id,
+        "arquivo": os.path.basename(arquivo),
+        "arquivo_path": arquivo,
+        "hash": hash_arquivo,
+        "template": template,
+        "departamento": departamento,
+        "iniciado_em": datetime.now().isoformat(),
+        "atualizado_em": datetime.now().isoformat(),
+        "total_clientes": total_clientes,
+        "dry_run": bool(dry_run),
+        "processados": {}
+    }
+    
+    # Journal de uma sessão anterior com o mesmo ID não pode ser reaplicado
+    for antigo in (get_journal_path(session_id), _get_compactando_path(session_id)):
+        try:
+            antigo.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Não foi possível remover journal antigo {antigo.name}: {e}")
+    
+    _salvar_sessao(session_id, sessao)
+    _atualizar_catalogo(session_id, _entrada_catalogo(sessao))
+    logging.info(f"Nova sessão criada: {session_id}")
+    
+    return sessao
+
+
+def salvar_progresso(session_id: str, cliente: str, status: str, fingerprint: str = None) -> bool:
+    """
+    Salva o progresso de um cliente na sessão.
+    Acrescenta uma linha ao journal (custo constante, sem reescrever o snapshot).
+    
+    Args:
+        session_id: ID da sessão
+        cliente: Termo de busca do cliente
+        status: SUCESSO, NAO_ENCONTRADO, ERRO
+        fingerprint: Hash da linha do cliente (gerar_fingerprint_cliente)
+    
+    Returns:
+        True se salvou com sucesso
+    """
+    return salvar_progresso_lote(session_id, [(cliente, status, fingerprint)])
+
+
+def salvar_progresso_lote(session_id: str, registros: list) -> bool:
+    """
+    Salva o progresso de vários clientes com uma única escrita no journal.
+    
+    Args:
+        session_id: ID da sessão
+        registros: Lista de tuplas (cliente, status) ou (cliente, status, fingerprint),
+                   em ordem cronológica
+    
+    Returns:
+        True se salvou com sucesso
+    """
+    if not registros:
+        return True
+    
+    if not sessao_existe(session_id):
+        logging.error(f"Sessão {session_id} não encontrada para salvar progresso")
+        return False
+    
+    agora = datetime.now().isoformat()
+    linhas = []
+    for cliente, status, *extra in registros:
+        reg = {"cliente": cliente, "status": status, "timestamp": agora}
+        if extra and extra[0]:
+            reg["fp"] = extra[0]
+        linhas.append(json.dumps(reg, ensure_ascii=False) + "\n")
+    linhas = "".join(linhas)
+    
+    try:
+        # Uma única escrita por lote: appends concorrentes não se intercalam
+        with open(get_journal_path(session_id), 'a', encoding='utf-8') as f:
+            f.write(linhas)
+            tamanho = f.tell()
+    except Exception as e:
+        logging.error(f"Erro ao salvar progresso da sessão {session_id}: {e}")
+        return False
+    
+    if tamanho >= JOURNAL_COMPACTAR_BYTES:
+        compactar_sessao(session_id)
+    
+    _atualizar_catalogo(session_id, campos={"atualizado_em": agora}, adiar=True)
+    return True
+
+
+def compactar_sessao(session_id: str) -> bool:
+    """
+    Incorpora o journal ao snapshot e descarta os registros já aplicados.
+    
+    O journal ativo é renomeado antes da leitura, de forma que appends de
+    outros workers durante a compactação vão para um journal novo e não se
+    perdem. Um append que já tinha aberto o journal antigo cai no arquivo
+    congelado e é relido antes de ele ser apagado. Se a compactação for
+    interrompida, o arquivo congelado continua sendo aplicado por carregar_sessao().
+    
+    Returns:
+        True se compactou (ou não havia nada a compactar)
+    """
+    journal = get_journal_path(session_id)
+    compactando = _get_compactando_path(session_id)
+    
+    if compactando.exists():
+        try:
+            idade = time.time() - compactando.stat().st_mtime
+        except FileNotFoundError:
+            idade = 0
+        if idade < COMPACTACAO_ORFA_SEGUNDOS:
+            logging.debug(f"Compactação da sessão {session_id} já em andamento")
+            return False
+        logging.warning(f"Retomando compactação interrompida da sessão {session_id}")
+    else:
+        try:
+            os.replace(journal, compactando)
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            # Windows: outro processo está com o journal aberto, tenta depois
+            logging.debug(f"Journal da sessão {session_id} ocupado: {e}")
+            return False
+    
+    sessao = _carregar_snapshot(session_id)
+    if sessao is None:
+        return False
+    
+    registros, offset = _ler_journal(compactando)
+    aplicados = 0
+    while True:
+        _aplicar_registros(sessao, registros)
+        aplicados += len(registros)
+        if not _salvar_sessao(session_id, sessao):
+            return False
+        # Quem abriu o journal pouco antes do os.replace escreve no arquivo
+        # congelado: o que chegou depois da leitura entra antes de apagá-lo
+        registros, offset = _ler_journal(compactando, offset)
+        if not registros:
+            break
+    
+    try:
+        compactando.unlink()
+    except FileNotFoundError:
+        pass
+    
+    # Contadores não mudam, só a assinatura dos arquivos
+    _atualizar_catalogo(session_id)
+    
+    logging.info(f"Sessão {session_id} compactada ({aplicados} registros do journal)")
+    return True
+
+
+def cliente_ja_processado(session_id: str, cliente: str) -> bool:
+    """
+    Verifica se um cliente já foi processado na sessão.
+    """
+    return obter_store(session_id).ja_processado(cliente)
+
+
+def obter_status_cliente(session_id: str, cliente: str) -> str:
+    """
+    Retorna o status de processamento de um cliente.
+    """
+    return obter_store(session_id).status(cliente)
+
+
+def contar_processados(session_id: str) -> dict:
+    """
+    Retorna contagem de clientes por status.
+    """
+    return obter_store(session_id).contagem()
+
+
+class SessionStore:
+    """
+    Mantém o mapa `processados` de uma sessão em memória.
+    
+    Antes de cada consulta faz apenas um stat() nos arquivos da sessão:
+    - snapshot ou journal congelado mudou (mtime/inode/tamanho) -> recarrega tudo
+    - journal ativo cresceu -> lê só os bytes novos
+    - journal ativo trocou de inode ou encolheu -> recarrega tudo
+    
+    Assim o progresso gravado por outros processos (workers) é enxergado sem
+    reparsear a sessão inteira a cada cliente.
+    """
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._sessao = None
+        self._assinatura = None
+        self._journal_ino = None
+        self._journal_offset = 0
+    
+    @staticmethod
+    def _stat(path: Path):
+        try:
+            st = path.stat()
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+    
+    def _recarregar(self, assinatura):
+        self._assinatura = assinatura
+        self._journal_ino = None
+        self._journal_offset = 0
+        self._sessao = _carregar_snapshot(self.session_id)
+        if self._sessao is None:
+            return
+        _aplicar_journal(self._sessao, _get_compactando_path(self.session_id))
+        self._ler_journal_ativo()
+    
+    def _ler_journal_ativo(self):
+        journal = get_journal_path(self.session_id)
+        st = self._stat(journal)
+        if st is None:
+            return
+        self._journal_ino = st[0]
+        registros, self._journal_offset = _ler_journal(journal, self._journal_offset)
+        _aplicar_registros(self._sessao, registros)
+    
+    def sincronizar(self) -> None:
+        """Atualiza o cache com o que outros processos gravaram no disco."""
+        assinatura = (
+            self._stat(get_session_path(self.session_id)),
+            self._stat(_get_compactando_path(self.session_id)),
+        )
+        if assinatura != self._assinatura or self._sessao is None:
+            self._recarregar(assinatura)
+            return
+        
+        st = self._stat(get_journal_path(self.session_id))
+        if st is None:
+            if self._journal_offset:
+                self._recarregar(assinatura)
+            return
+        
+        ino, _, tamanho = st
+        if self._journal_ino is not None and (ino != self._journal_ino or tamanho < self._journal_offset):
+            self._recarregar(assinatura)
+        elif tamanho > self._journal_offset or self._journal_ino is None:
+            self._ler_journal_ativo()
+    
+    def sessao(self) -> dict:
+        """Retorna o estado atual da sessão (ou None se não existir)."""
+        self.sincronizar()
+        return self._sessao
+    
+    def processados(self) -> dict:
+        """Mapa cliente -> {status, timestamp} atualizado."""
+        sessao = self.sessao()
+        return sessao.get("processados", {}) if sessao else {}
+    
+    def ja_processado(self, cliente: str) -> bool:
+        return cliente in self.processados()
+    
+    def status(self, cliente: str) -> str:
+        proc = self.processados().get(cliente)
+        return proc.get("status") if proc else None
+    
+    def registro(self, cliente: str) -> dict:
+        """{status, timestamp, fp} gravado para o cliente, ou None."""
+        return self.processados().get(cliente)
+    
+    def contagem(self) -> dict:
+        contagem = {"SUCESSO": 0, "NAO_ENCONTRADO": 0, "ERRO": 0}
+        for dados in self.processados().values():
+            status = dados.get("status", "ERRO")
+            if status in contagem:
+                contagem[status] += 1
+        return contagem
+    
+    def pendentes(self, clientes: list, status_concluidos=None, por_fingerprint: bool = False) -> list:
+        """
+        Filtra em lote os clientes que ainda precisam ser processados.
+        
+        Args:
+            clientes: Lista de dicts com a chave 'busca'
+            status_concluidos: Status que contam como concluído
+                               (None = qualquer status registrado)
+            por_fingerprint: Se True, linhas alteradas desde o processamento
+                             voltam a ficar pendentes
+        """
+        return filtrar_pendentes(self.processados(), clientes, status_concluidos, por_fingerprint)
+    
+    def registrar(self, cliente: str, status: str, fingerprint: str = None) -> bool:
+        """Grava o progresso no disco e já reflete no cache local."""
+        ok = salvar_progresso(self.session_id, cliente, status, fingerprint)
+        if ok and self._sessao is not None:
+            _aplicar_registros(self._sessao, [(cliente, status, datetime.now().isoformat(), fingerprint)])
+        return ok
+
+
+# Um store por sessão por processo
+_stores = {}
+
+
+def atualizar_total_clientes(session_id: str, total_clientes: int) -> bool:
+    """
+    Atualiza o total de clientes da sessão (modo campanha: a lista pode ter
+    crescido ou encolhido entre execuções).
+    """
+    sessao = _carregar_snapshot(session_id)
+    if sessao is None:
+        return False
+    sessao["total_clientes"] = total_clientes
+    if not _salvar_sessao(session_id, sessao):
+        return False
+    _atualizar_catalogo(session_id, campos={"total": total_clientes})
+    return True
+
+
+def obter_store(session_id: str) -> SessionStore:
+    """Retorna o SessionStore (cacheado) da sessão."""
+    store = _stores.get(session_id)
+    if store is None:
+        store = _stores[session_id] = SessionStore(session_id)
+    return store
+
+
+def apagar_sessao(session_id: str) -> bool:
+    """
+    Remove uma sessão do disco (snapshot e journals).
+    """
+    session_path = get_session_path(session_id)
+    _stores.pop(session_id, None)
+    _remover_do_catalogo(session_id)
+    
+    try:
+        for journal in (get_journal_path(session_id), _get_compactando_path(session_id)):
+            if journal.exists():
+                journal.unlink()
+        if session_path.exists():
+            session_path.unlink()
+            logging.info(f"Sessão {session_id} removida")
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao remover sessão {session_id}: {e}")
+        return False
+
+
+def listar_sessoes_ativas() -> list:
+    """
+    Lista todas as sessões no diretório.
+    Lê o catálogo; só sessões sem entrada ou com arquivos alterados por fora
+    do catálogo (assinatura diferente) são relidas e corrigidas.
+    """
+    if not SESSIONS_DIR.exists():
+        return []
+    
+    catalogo = _ler_catalogo()
+    alterado = False
+    sessoes = []
+    
+    ids_em_disco = {f.name[len("session_"):-len(".json")] for f in SESSIONS_DIR.glob("session_*.json")}
+    for session_id in set(catalogo) - ids_em_disco:
+        del catalogo[session_id]
+        alterado = True
+    
+    for session_id in sorted(ids_em_disco):
+        entrada = catalogo.get(session_id)
+        if entrada is None or entrada.get("assinatura") != _assinatura_arquivos(session_id):
+            sessao = carregar_sessao(session_id)
+            if sessao is None:
+                logging.warning(f"Erro ao ler sessão {session_id}")
+                continue
+            entrada = catalogo[session_id] = _entrada_catalogo(sessao)
+            alterado = True
+        
+        contagem = entrada["contagem"]
+        sessoes.append({
+            "id": session_id,
+            "arquivo": entrada.get("arquivo", "?"),
+            "template": entrada.get("template", "?"),
+            "departamento": entrada.get("departamento", "?"),
+            "iniciado_em": entrada.get("iniciado_em", "?"),
+            "total": entrada.get("total", 0),
+            "processados": sum(contagem.values()),
+            "sucesso": contagem.get("SUCESSO", 0)
+        })
+    
+    if alterado:
+        _gravar_catalogo(catalogo)
+    
+    return sessoes
+
+
+def _assinatura_arquivos(session_id: str) -> list:
+    """(mtime, tamanho) do snapshot e dos journals: muda a cada gravação."""
+    assinatura = []
+    for path in (get_session_path(session_id), get_journal_path(session_id),
+                 _get_compactando_path(session_id)):
+        st = SessionStore._stat(path)
+        assinatura.append(list(st[1:]) if st else None)
+    return assinatura
+
+
+def _entrada_catalogo(sessao: dict) -> dict:
+    """Monta a entrada do catálogo a partir da sessão completa."""
+    contagem = _contar_status(sessao.get("processados", {}))
+    return {
+        "arquivo": sessao.get("arquivo", "?"),
+        "template": sessao.get("template", "?"),
+        "departamento": sessao.get("departamento", "?"),
+        "iniciado_em": sessao.get("iniciado_em", "?"),
+        "atualizado_em": sessao.get("atualizado_em", "?"),
+        "total": sessao.get("total_clientes", 0),
+        "contagem": contagem,
+        "assinatura": _assinatura_arquivos(sessao["session_id"])
+    }
+
+
+def _contar_status(processados: dict) -> dict:
+    contagem = {}
+    for dados in processados.values():
+        status = dados.get("status", "ERRO")
+        contagem[status] = contagem.get(status, 0) + 1
+    return contagem
+
+
+def _ler_catalogo() -> dict:
+    try:
+        with open(CATALOGO_PATH, 'r', encoding='utf-8') as f:
+            catalogo = json.load(f)
+        return catalogo if isinstance(catalogo, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"Catálogo de sessões ilegível, será reconstruído: {e}")
+        return {}
+
+
+def _gravar_catalogo(catalogo: dict) -> bool:
+    tmp_path = CATALOGO_PATH.with_name(f"{CATALOGO_PATH.name}.{os.getpid()}.tmp")
+    try:
+        SESSIONS_DIR.mkdir(exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(catalogo, f, ensure_ascii=False)
+        os.replace(tmp_path, CATALOGO_PATH)
+        return True
+    except Exception as e:
+        logging.warning(f"Erro ao gravar catálogo de sessões: {e}")
+        try:
+            tmp_path.unlink()
+        except Exception:
+            pass
+        return False
+
+
+# Atualizações do catálogo ainda não gravadas por este processo
+_catalogo_pendente = {}     # session_id -> {"entrada": ...} ou campos do cabeçalho
+_catalogo_gravado_em = 0.0
+_catalogo_pid = None
+
+
+def _atualizar_catalogo(session_id: str, entrada: dict = None, campos: dict = None,
+                        adiar: bool = False) -> None:
+    """
+    Atualiza a entrada de uma sessão no catálogo.
+    
+    Args:
+        entrada: Entrada completa (substitui a existente)
+        campos: Campos do cabeçalho a sobrescrever
+        adiar: Acumula e grava só depois de CATALOGO_INTERVALO_SEGUNDOS
+               (ou na saída do processo)
+    
+    Os contadores não são somados por delta: ao gravar, são recontados do
+    SessionStore do processo (que só lê o que o journal ganhou desde a última
+    vez), com a assinatura dos arquivos tirada antes da contagem.
+    """
+    global _catalogo_pid
+    if _catalogo_pid != os.getpid():
+        _catalogo_pid = os.getpid()
+        _catalogo_pendente.clear()
+        atexit.register(descarregar_catalogo)
+    
+    if entrada is not None:
+        _catalogo_pendente[session_id] = {"entrada": entrada}
+    else:
+        pendente = _catalogo_pendente.setdefault(session_id, {})
+        if "entrada" in pendente:
+            pendente["entrada"].update(campos or {})
+        else:
+            pendente.update(campos or {})
+    
+    if adiar and time.monotonic() - _catalogo_gravado_em < CATALOGO_INTERVALO_SEGUNDOS:
+        return
+    descarregar_catalogo()
+
+
+def descarregar_catalogo() -> None:
+    """Grava no catálogo as atualizações pendentes deste processo."""
+    global _catalogo_gravado_em
+    if _catalogo_pid != os.getpid() or not _catalogo_pendente:
+        return
+    pendentes = dict(_catalogo_pendente)
+    _catalogo_pendente.clear()
+    _catalogo_gravado_em = time.monotonic()
+    
+    catalogo = _ler_catalogo()
+    alterado = False
+    for session_id, pendente in pendentes.items():
+        entrada = pendente.get("entrada")
+        if entrada is None:
+            entrada = _recontar_entrada(session_id, catalogo.get(session_id), pendente)
+        if entrada is not None:
+            catalogo[session_id] = entrada
+            alterado = True
+    if alterado:
+        _gravar_catalogo(catalogo)
+
+
+def _recontar_entrada(session_id: str, anterior: dict, campos: dict) -> dict:
+    """
+    Entrada atualizada a partir do store da sessão. Sem entrada prévia
+    (catálogo apagado, sessão antiga) retorna None: listar_sessoes_ativas()
+    a reconstrói na próxima leitura.
+    """
+    if anterior is None:
+        return None
+    # Assinatura antes da contagem: se outro processo gravar no meio, ela já
+    # não bate com os arquivos e a entrada é recontada na listagem
+    assinatura = _assinatura_arquivos(session_id)
+    store = _stores.get(session_id) or _stores.setdefault(session_id, SessionStore(session_id))
+    if store.sessao() is None:
+        return None
+    contagem = _contar_status(store.processados())
+    return dict(anterior, **campos, contagem=contagem, assinatura=assinatura)
+
+
+def _remover_do_catalogo(session_id: str) -> None:
+    _catalogo_pendente.pop(session_id, None)
+    catalogo = _ler_catalogo()
+    if catalogo.pop(session_id, None) is not None:
+        _gravar_catalogo(catalogo)
+
+
+def _salvar_sessao(session_id: str, sessao: dict) -> bool:
+    """
+    Função interna para salvar o snapshot da sessão no disco.
+    Escreve num arquivo temporário e renomeia (leitores nunca veem JSON pela metade).
+    """
+    session_path = get_session_path(session_id)
+    tmp_path = session_path.with_name(f"{session_path.name}.{os.getpid()}.tmp")
+    
+    try:
+        SESSIONS_DIR.mkdir(exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sessao, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, session_path)
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao salvar sessão {session_id}: {e}")
+        return False
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Backend SQLite do gerenciamento de sessões - AutoZoho
+
+Mesma API do backend JSON (utils/session_json.py), mas persistindo em sessions/sessoes.db:
+- Modo WAL: vários workers gravam progresso ao mesmo tempo sem perder updates
+  (cada gravação é um UPSERT isolado, não um read-modify-write do arquivo todo)
+- Tabela `processados` chaveada por (session_id, busca), com índice por status
+- Contagens e listagem de sessões viram uma única query agregada
+
+Ativação: AUTOZOHO_SESSION_BACKEND=sqlite
+Commits em lote: AUTOZOHO_SQLITE_LOTE=<N> (padrão 1 = commit a cada cliente)
+"""
+import os
+import atexit
+import sqlite3
+import logging
+import threading
+from multiprocessing import util as mp_util
+from datetime import datetime
+
+from utils.session import SESSIONS_DIR, filtrar_pendentes
+
+DB_PATH = SESSIONS_DIR / "sessoes.db"
+
+# Quantos registros acumular em memória antes de gravar/commitar
+SQLITE_LOTE_COMMIT = max(1, int(os.environ.get("AUTOZOHO_SQLITE_LOTE", "1")))
+
+# Tempo máximo esperando o lock de escrita de outro processo
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessoes (
+    session_id     TEXT PRIMARY KEY,
+    arquivo        TEXT,
+    arquivo_path   TEXT,
+    hash           TEXT,
+    template       TEXT,
+    departamento   TEXT,
+    iniciado_em    TEXT,
+    atualizado_em  TEXT,
+    total_clientes INTEGER,
+    dry_run        INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS processados (
+    session_id TEXT NOT NULL,
+    busca      TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    timestamp  TEXT NOT NULL,
+    fp         TEXT,
+    PRIMARY KEY (session_id, busca)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_processados_status ON processados (session_id, status);
+"""
+
+_conn = None
+_conn_pid = None
+_lock = threading.RLock()
+_buffer = []  # (session_id, busca, status, timestamp, fp) ainda não gravados
+
+
+def _conexao() -> sqlite3.Connection:
+    """Conexão única por processo (reaberta se o processo foi clonado)."""
+    global _conn, _conn_pid
+    if _conn is None or _conn_pid != os.getpid():
+        SESSIONS_DIR.mkdir(exist_ok=True)
+        _conn = sqlite3.connect(str(DB_PATH), timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                                check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        _conn.executescript(_SCHEMA)
+        colunas = {row[1] for row in _conn.execute("PRAGMA table_info(processados)")}
+        if "fp" not in colunas:
+            _conn.execute("ALTER TABLE processados ADD COLUMN fp TEXT")
+        colunas = {row[1] for row in _conn.execute("PRAGMA table_info(sessoes)")}
+        if "dry_run" not in colunas:
+            _conn.execute("ALTER TABLE sessoes ADD COLUMN dry_run INTEGER NOT NULL DEFAULT 0")
+        _conn_pid = os.getpid()
+        _buffer.clear()
+        # Processos filhos do multiprocessing não executam atexit; o registro
+        # de finalizadores é zerado no fork, então registra a cada conexão nova
+        mp_util.Finalize(None, _flush, exitpriority=10)
+    return _conn
+
+
+def _flush() -> bool:
+    """Grava o lote pendente numa única transação curta."""
+    with _lock:
+        if not _buffer:
+            return True
+        conn = _conexao()
+        lote = list(_buffer)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO processados (session_id, busca, status, timestamp, fp) "
+                    "VALUES (?, ?, ?, ?, ?)", lote
+                )
+                atualizados = {}
+                for session_id, _, _, ts, _ in lote:
+                    atualizados[session_id] = ts
+                conn.executemany(
+                    "UPDATE sessoes SET atualizado_em = ? WHERE session_id = ?",
+                    [(ts, sid) for sid, ts in atualizados.items()]
+                )
+            del _buffer[:len(lote)]
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao gravar lote de progresso ({len(lote)} registros): {e}")
+            return False
+
+
+atexit.register(_flush)
+
+
+def sessao_existe(session_id: str) -> bool:
+    """Verifica se uma sessão existe."""
+    with _lock:
+        row = _conexao().execute(
+            "SELECT 1 FROM sessoes WHERE session_id = ?", (session_id,)
+        ).fetchone()
+    return row is not None
+
+
+def carregar_sessao(session_id: str) -> dict:
+    """
+    Carrega uma sessão no mesmo formato do backend JSON.
+
+    Returns:
+        dict com dados da sessão ou None se não existir
+    """
+    _flush()
+    with _lock:
+        conn = _conexao()
+        row = conn.execute(
+            "SELECT session_id, arquivo, arquivo_path, hash, template, departamento, "
+            "iniciado_em, atualizado_em, total_clientes, dry_run FROM sessoes WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        processados = conn.execute(
+            "SELECT busca, status, timestamp, fp FROM processados WHERE session_id = ?",
+            (session_id,)
+        ).fetchall()
+
+    chaves = ("session_id", "arquivo", "arquivo_path", "hash", "template",
+              "departamento", "iniciado_em", "atualizado_em", "total_clientes", "dry_run")
+    sessao = dict(zip(chaves, row))
+    sessao["dry_run"] = bool(sessao["dry_run"])
+    sessao["processados"] = _montar_processados(processados)
+    return sessao
+
+
+def _montar_processados(rows) -> dict:
+    """Converte linhas (busca, status, timestamp, fp) no formato do backend JSON."""
+    processados = {}
+    for busca, status, ts, fp in rows:
+        dados = {"status": status, "timestamp": ts}
+        if fp:
+            dados["fp"] = fp
+        processados[busca] = dados
+    return processados
+
+
+def criar_sessao(session_id: str, arquivo: str, hash_arquivo: str,
+                 template: str, departamento: str, total_clientes: int,
+                 dry_run: bool = False) -> dict:
+    """
+    Cria uma nova sessão (substitui qualquer progresso anterior com o mesmo ID).
+    """
+    agora = datetime.now().isoformat()
+    _flush()
+    with _lock:
+        conn = _conexao()
+        with conn:
+            conn.execute("DELETE FROM processados WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessoes (session_id, arquivo, arquivo_path, hash, template, "
+                "departamento, iniciado_em, atualizado_em, total_clientes, dry_run) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, os.path.basename(arquivo), arquivo, hash_arquivo,
+                 template, departamento, agora, agora, total_clientes, int(bool(dry_run)))
+            )
+    logging.info(f"Nova sessão criada: {session_id}")
+    return carregar_sessao(session_id)
+
+
+def salvar_progresso(session_id: str, cliente: str, status: str, fingerprint: str = None) -> bool:
+    """
+    Registra o progresso de um cliente.
+    Grava imediatamente ou a cada SQLITE_LOTE_COMMIT registros.
+    """
+    with _lock:
+        _conexao()
+        _buffer.append((session_id, cliente, status, datetime.now().isoformat(), fingerprint))
+        if len(_buffer) < SQLITE_LOTE_COMMIT:
+            return True
+    return _flush()
+
+
+def salvar_progresso_lote(session_id: str, registros: list) -> bool:
+    """
+    Registra o progresso de vários clientes numa única transação.
+
+    Args:
+        registros: Lista de tuplas (cliente, status) ou (cliente, status, fingerprint),
+                   em ordem cronológica
+    """
+    agora = datetime.now().isoformat()
+    with _lock:
+        _conexao()
+        for cliente, status, *extra in registros:
+            _buffer.append((session_id, cliente, status, agora, extra[0] if extra else None))
+    return _flush()
+
+
+def atualizar_total_clientes(session_id: str, total_clientes: int) -> bool:
+    """Atualiza o total de clientes da sessão (modo campanha)."""
+    with _lock:
+        conn = _conexao()
+        with conn:
+            cur = conn.execute(
+                "UPDATE sessoes SET total_clientes = ? WHERE session_id = ?",
+                (total_clientes, session_id)
+            )
+    return cur.rowcount > 0
+
+
+def compactar_sessao(session_id: str) -> bool:
+    """Sem journal para compactar: apenas grava o lote pendente."""
+    return _flush()
+
+
+def cliente_ja_processado(session_id: str, cliente: str) -> bool:
+    """Verifica se um cliente já foi processado na sessão."""
+    return obter_status_cliente(session_id, cliente) is not None
+
+
+def obter_status_cliente(session_id: str, cliente: str) -> str:
+    """Retorna o status de processamento de um cliente."""
+    _flush()
+    with _lock:
+        row = _conexao().execute(
+            "SELECT status FROM processados WHERE session_id = ? AND busca = ?",
+            (session_id, cliente)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def contar_processados(session_id: str) -> dict:
+    """Retorna contagem de clientes por status (uma query agregada)."""
+    _flush()
+    contagem = {"SUCESSO": 0, "NAO_ENCONTRADO": 0, "ERRO": 0}
+    with _lock:
+        rows = _conexao().execute(
+            "SELECT status, COUNT(*) FROM processados WHERE session_id = ? GROUP BY status",
+            (session_id,)
+        ).fetchall()
+    for status, qtd in rows:
+        if status in contagem:
+            contagem[status] = qtd
+    return contagem
+
+
+def apagar_sessao(session_id: str) -> bool:
+    """Remove uma sessão e todo o seu progresso."""
+    _flush()
+    try:
+        with _lock:
+            conn = _conexao()
+            with conn:
+                conn.execute("DELETE FROM processados WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessoes WHERE session_id = ?", (session_id,))
+        logging.info(f"Sessão {session_id} removida")
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao remover sessão {session_id}: {e}")
+        return False
+
+
+def listar_sessoes_ativas() -> list:
+    """Lista todas as sessões com seus contadores (uma query agregada)."""
+    if not DB_PATH.exists():
+        return []
+    _flush()
+    with _lock:
+        rows = _conexao().execute(
+            "SELECT s.session_id, s.arquivo, s.template, s.departamento, s.iniciado_em, "
+            "       s.total_clientes, COUNT(p.busca), "
+            "       COALESCE(SUM(p.status = 'SUCESSO'), 0) "
+            "FROM sessoes s LEFT JOIN processados p ON p.session_id = s.session_id "
+            "GROUP BY s.session_id"
+        ).fetchall()
+
+    return [
+        {
+            "id": sid,
+            "arquivo": arquivo or "?",
+            "template": template or "?",
+            "departamento": dept or "?",
+            "iniciado_em": iniciado or "?",
+            "total": total or 0,
+            "processados": processados,
+            "sucesso": sucesso
+        }
+        for sid, arquivo, template, dept, iniciado, total, processados, sucesso in rows
+    ]
+
+
+class SessionStoreSQLite:
+    """
+    Equivalente ao SessionStore do backend JSON.
+    O SQLite já é o índice: status() é um lookup pela chave primária e
+    pendentes() lê o mapa da sessão uma única vez.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+
+    def sincronizar(self) -> None:
+        _flush()
+
+    def sessao(self) -> dict:
+        return carregar_sessao(self.session_id)
+
+    def processados(self) -> dict:
+        _flush()
+        with _lock:
+            rows = _conexao().execute(
+                "SELECT busca, status, timestamp, fp FROM processados WHERE session_id = ?",
+                (self.session_id,)
+            ).fetchall()
+        return _montar_processados(rows)
+
+    def ja_processado(self, cliente: str) -> bool:
+        return cliente_ja_processado(self.session_id, cliente)
+
+    def status(self, cliente: str) -> str:
+        return obter_status_cliente(self.session_id, cliente)
+
+    def registro(self, cliente: str) -> dict:
+        """{status, timestamp, fp} do cliente por lookup na chave primária, ou None."""
+        _flush()
+        with _lock:
+            row = _conexao().execute(
+                "SELECT busca, status, timestamp, fp FROM processados WHERE session_id = ? AND busca = ?",
+                (self.session_id, cliente)
+            ).fetchone()
+        return _montar_processados([row])[cliente] if row else None
+
+    def contagem(self) -> dict:
+        return contar_processados(self.session_id)
+
+    def pendentes(self, clientes: list, status_concluidos=None, por_fingerprint: bool = False) -> list:
+        return filtrar_pendentes(self.processados(), clientes, status_concluidos, por_fingerprint)
+
+    def registrar(self, cliente: str, status: str, fingerprint: str = None) -> bool:
+        return salvar_progresso(self.session_id, cliente, status, fingerprint)
+
+
+def obter_store(session_id: str) -> SessionStoreSQLite:
+    """Retorna o store da sessão (sem estado próprio: o cache é o SQLite)."""
+    return SessionStoreSQLite(session_id)
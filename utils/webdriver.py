@@ -1,10 +1,116 @@
 import os
+import shutil
+import socket
 import logging
+from pathlib import Path
+from typing import Optional
 from selenium import webdriver
 from selenium.webdriver.edge.service import Service
 from selenium.webdriver.edge.options import Options as EdgeOptions
 
-def iniciar_driver(headless=False, use_user_profile=False, instance_id=None):
+# Perfis dedicados por instância (um Edge por diretório; o perfil do usuário
+# não pode ser aberto por várias instâncias ao mesmo tempo)
+PROFILES_DIR = Path(__file__).parent.parent / "profiles"
+PERFIL_MODELO = PROFILES_DIR / "modelo"
+
+# Arquivos de trava/cache que não devem ser copiados do modelo nem sobrar de um crash
+_ARQUIVOS_TRAVA = ("SingletonLock", "SingletonCookie", "SingletonSocket", "lockfile")
+_IGNORAR_NA_COPIA = shutil.ignore_patterns(*_ARQUIVOS_TRAVA, "Cache", "Code Cache", "GPUCache",
+                                           "Crashpad", "ShaderCache", "GrShaderCache")
+
+
+def _pid_vivo(pid: int) -> bool:
+    """Indica se o processo pid ainda existe nesta máquina."""
+    if os.name == 'nt':
+        # os.kill no Windows encerra o processo; consulta pela API
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        codigo = ctypes.c_ulong()
+        try:
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo))
+        finally:
+            kernel32.CloseHandle(handle)
+        return codigo.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _perfil_em_uso(perfil: Path) -> bool:
+    """
+    Verifica se um Edge vivo ainda tem o perfil aberto (outro main_* com o
+    mesmo worker_<n>, por exemplo).
+
+    SingletonLock aponta para "<host>-<pid>" do dono; no Windows o "lockfile"
+    fica aberto pelo Edge e o sistema recusa removê-lo enquanto ele roda.
+    """
+    try:
+        alvo = os.readlink(perfil / "SingletonLock")
+    except OSError:
+        alvo = None
+    if alvo:
+        host, _, pid = alvo.rpartition('-')
+        if host != socket.gethostname() or not pid.isdigit() or _pid_vivo(int(pid)):
+            return True
+    
+    lockfile = perfil / "lockfile"
+    if os.name == 'nt' and lockfile.exists():
+        try:
+            lockfile.unlink()
+        except PermissionError:
+            return True
+        except OSError:
+            pass
+    return False
+
+
+def preparar_perfil_instancia(instance_id) -> Optional[str]:
+    """
+    Garante o diretório de perfil persistente da instância (profiles/worker_<n>).
+    
+    Na primeira vez o perfil é clonado de profiles/modelo (se existir); depois
+    ele é reaproveitado, então cookies/sessão do Zoho sobrevivem a reinícios
+    e à recuperação de um worker.
+    
+    As travas só são removidas quando o Edge dono delas já morreu; se o perfil
+    está aberto por outro processo (ex.: main_parallel e main_crawler ao mesmo
+    tempo) ele não é tocado.
+    
+    Returns:
+        Caminho absoluto do perfil, ou None se ele está em uso
+    """
+    perfil = PROFILES_DIR / f"worker_{instance_id}"
+    if not perfil.exists():
+        if PERFIL_MODELO.is_dir():
+            logging.info(f"Criando perfil {perfil.name} a partir de {PERFIL_MODELO.name}")
+            shutil.copytree(PERFIL_MODELO, perfil, ignore=_IGNORAR_NA_COPIA)
+        else:
+            perfil.mkdir(parents=True)
+    
+    if _perfil_em_uso(perfil):
+        logging.warning(f"Perfil {perfil.name} está aberto por outro Edge; não será reaproveitado")
+        return None
+    
+    # Trava deixada por um Edge que caiu impede abrir o perfil de novo
+    for nome in _ARQUIVOS_TRAVA:
+        try:
+            (perfil / nome).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.debug(f"Não foi possível remover {nome} de {perfil.name}: {e}")
+    
+    return str(perfil.resolve())
+
+
+def iniciar_driver(headless=False, use_user_profile=False, instance_id=None, perfil_dedicado=False):
     """
     Inicia uma instância do Microsoft Edge.
     
@@ -13,6 +119,8 @@ def iniciar_driver(headless=False, use_user_profile=False, instance_id=None):
         use_user_profile: Se True, usa o perfil do usuário para manter sessão
         instance_id: ID da instância (1-4) para posicionamento de janelas lado a lado
                     Se None, usa comportamento padrão (maximizado)
+        perfil_dedicado: Se True (e com instance_id), usa o perfil persistente
+                    profiles/worker_<instance_id>
     
     Returns:
         WebDriver instance ou None em caso de erro
@@ -37,6 +145,13 @@ def iniciar_driver(headless=False, use_user_profile=False, instance_id=None):
         logging.info(f"Usando perfil do usuário: {user_data_dir}")
         options.add_argument(f"user-data-dir={user_data_dir}")
         options.add_argument("profile-directory=Default")
+    elif perfil_dedicado and instance_id is not None:
+        perfil = preparar_perfil_instancia(instance_id)
+        if perfil:
+            logging.info(f"Usando perfil dedicado: {perfil}")
+            options.add_argument(f"user-data-dir={perfil}")
+        else:
+            logging.warning("Seguindo com perfil temporário")
     
     # Posicionamento para múltiplas instâncias
     # NOTA: Agora abre maximizado para melhor compatibilidade com interface do Zoho